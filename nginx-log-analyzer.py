@@ -16,11 +16,59 @@ ZEITFILTER: heute | diese_woche | dieser_monat | gesamter_zeitraum
 
 import re
 import sys
+import json
 import argparse
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta, date
+import contextlib
+import cProfile
+import functools
+import hashlib
+import heapq
+import math
+from collections import Counter, defaultdict, deque
+from itertools import compress
+from operator import add, itemgetter, methodcaller
+from datetime import datetime, timedelta, timezone, date
+from concurrent.futures import ProcessPoolExecutor
 import ipaddress
+import bisect
+import csv
+import socket
 import os
+import io
+import gzip
+import bz2
+import lzma
+import mmap
+import time
+import pickle
+import pstats
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None  # kein getrusage (Windows) - Profil ohne Spitzen-Speicher
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None  # Live-Modus fällt auf Polling zurück
 
 # ANSI Farbcodes für Terminal-Ausgabe
 class Colors:
@@ -60,42 +108,1647 @@ LOG_FILES = {
     'bilder': '/var/log/nginx/bilder_access.log'
 }
 
-class NginxLogAnalyzer:
-    def __init__(self, log_files, time_filter='gesamter_zeitraum'):
-        self.log_files = log_files if isinstance(log_files, list) else [log_files]
-        self.time_filter = time_filter
-        self.entries = []
-        self.stats = {
-            'total_requests': 0,
-            'unique_ips': set(),
-            'status_codes': Counter(),
-            'methods': Counter(),
-            'top_pages': Counter(),
-            'top_ips': Counter(),
-            'user_agents': Counter(),
-            'hourly_traffic': defaultdict(int),
-            'daily_traffic': defaultdict(int),
-            'bytes_transferred': 0,
-            'bot_requests': Counter(),
-            'error_requests': [],
-            'suspicious_ips': Counter(),
-            'log_file_stats': defaultdict(lambda: {'requests': 0, 'unique_ips': set()})
+# nginx log_format-Definitionen (Name -> Format). Einträge in LOG_FILES können
+# statt eines Pfads ein Tupel (Pfad, Format) sein; Format ist ein Name von hier
+# oder direkt ein log_format-String.
+DEFAULT_LOG_FORMAT = 'combined'
+# Parser-Engine ohne --engine: numpy, wenn installiert, sonst bytes
+DEFAULT_ENGINE = 'numpy' if np is not None else 'bytes'
+LOG_FORMATS = {
+    'combined': '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+                '"$http_referer" "$http_user_agent"',
+    # combined + Antwortzeiten (häufig bei Reverse-Proxies wie immich)
+    'timed': '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent '
+             '"$http_referer" "$http_user_agent" $request_time $upstream_response_time',
+}
+
+# Anzahl der zuletzt gesehenen Fehler-Requests, die im Speicher gehalten werden
+# (Ringpuffer - reicht für den Abschnitt "LETZTE 5 FEHLER-REQUESTS")
+ERROR_BUFFER_SIZE = 100
+
+# Große Log-Dateien werden für die parallele Analyse in Byte-Bereiche dieser
+# Größe (an Zeilengrenzen ausgerichtet) aufgeteilt
+PARALLEL_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Bytes-Engine: Puffer werden in Blöcken dieser Größe (an Zeilengrenzen)
+# geparst und spaltenweise gezählt
+BYTES_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Zeitsprung per Binärsuche: Suche endet bei Bereichen unter SEEK_BLOCK_SIZE,
+# gelesen wird ab SEEK_SLACK Bytes vor dem Treffer (Zeilen sind nicht streng
+# sortiert: $time_local ist die Zeit beim Schreiben des Eintrags, jeder
+# nginx-Worker nutzt seine eigene zwischengespeicherte Uhrzeit und schreibt
+# mit buffer= verzögert)
+SEEK_BLOCK_SIZE = 64 * 1024
+SEEK_SLACK = 256 * 1024
+SEEK_PROBE_LINES = 100
+
+# Verzeichnis für die Zustandsdateien der inkrementellen Analyse
+# (Offset + gespeicherte Statistik je Log-Datei und Zeitfilter)
+STATE_DIR = os.path.expanduser('~/.cache/nginx-log-analyzer')
+STATE_VERSION = 2
+
+# Ergebnis-Cache (--cache): Statistik je unveränderter Datei, erkannt an
+# Pfad, Inode, Größe und mtime, plus Zeitfenster - gzip-komprimiertes Pickle.
+# Über CACHE_MAX_SIZE hinaus werden die am längsten unbenutzten Einträge gelöscht
+CACHE_DIR = os.path.join(STATE_DIR, 'cache')
+CACHE_VERSION = 1
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+# Live-Modus (--follow): Polling-Intervall ohne inotify und gleitende Fenster
+# als (Bezeichnung, Länge in Sekunden, Bucket-Breite in Sekunden)
+FOLLOW_POLL_INTERVAL = 0.5
+LIVE_WINDOWS = [('1 min', 60, 1), ('5 min', 300, 5), ('60 min', 3600, 60)]
+
+# Spaltenindex (--index): je Log-Datei ein Verzeichnis mit numpy-Spalten
+INDEX_DIR = os.path.join(STATE_DIR, 'index')
+INDEX_VERSION = 2
+
+# Antwortzeiten ($request_time/$upstream_response_time): relative Breite der
+# logarithmischen Histogramm-Buckets und Mindestanzahl Requests, ab der ein
+# Pfad unter "LANGSAMSTE ENDPUNKTE" erscheint
+LATENCY_PRECISION = 0.02
+LATENCY_MIN_REQUESTS = 5
+
+# Blockliste (--blockliste): nftables-Set-Datei zum Einbinden per include in
+# /etc/nftables.conf, Zustand mit Ablaufzeiten je IP
+BLOCKLIST_NFT = '/etc/nftables.d/nginx-blocklist.nft'
+BLOCKLIST_STATE = os.path.join(STATE_DIR, 'blocklist.json')
+BLOCKLIST_VERSION = 1
+# Nie blockieren: Loopback und private Netze (per --block-ignorieren erweiterbar)
+BLOCKLIST_IGNORE = ['127.0.0.0/8', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16',
+                    '::1/128', 'fc00::/7', 'fe80::/10']
+
+# Profil (--profil): Anzahl der Funktionen (cProfile) bzw. Codezeilen
+# (tracemalloc) in der Übersicht am Ende
+PROFILE_TOP_FUNCTIONS = 15
+PROFILE_TOP_ALLOCATIONS = 10
+
+# Standard-Regeln für Bot- und Angriffserkennung, per --regeln (JSON) ersetzbar
+DEFAULT_BOT_PATTERNS = [
+    r'bot', r'crawler', r'spider', r'scraper', r'wget', r'curl',
+    r'python', r'java', r'php', r'ruby', r'go-http-client'
+]
+
+DEFAULT_SUSPICIOUS_PATTERNS = [
+    r'\.php$', r'\.asp$', r'\.jsp$',  # Script-Dateien
+    r'wp-admin', r'wp-login',          # WordPress Angriffe
+    r'admin', r'login', r'config',     # Admin-Bereiche
+    r'\.env', r'\.git',               # Sensible Dateien
+    r'eval\(', r'base64_decode',      # Code-Injection
+]
+
+def load_rules(path):
+    """Lädt Klassifizierungsregeln aus einer JSON-Datei
+
+    Erlaubte Schlüssel: "bot_patterns" und "suspicious_patterns" (Listen von
+    Regex-Strings). Vorhandene Schlüssel ersetzen die Standard-Regeln.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    rules = {}
+    for key in ('bot_patterns', 'suspicious_patterns'):
+        if key in config:
+            if not isinstance(config[key], list) or not all(isinstance(p, str) for p in config[key]):
+                raise ValueError(f"'{key}' muss eine Liste von Strings sein")
+            rules[key] = config[key]
+    return rules
+
+class PatternClassifier:
+    """Prüft Werte gegen eine Regel-Liste mit einer einzigen kombinierten Regex
+
+    Statt jede Regel einzeln zu durchsuchen, werden alle Muster zu einer
+    Alternation kompiliert (ein Scan pro Wert). Da User-Agents und Pfade sich
+    stark wiederholen, wird das Ergebnis je Wert in einem LRU-Cache gehalten.
+    Jede Regel wird vorher einzeln geprüft: globale Flags am Anfang ((?i)...)
+    werden auf die Regel begrenzt, nummerierte Rückverweise abgelehnt - in
+    der Alternation würden sie auf Gruppen anderer Regeln zeigen.
+    """
+
+    # Globale Inline-Flags am Anfang einer Regel, z.B. "(?i)"
+    GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+    # \1 bis \99 (nicht selbst maskiert) und Bedingungen wie (?(1)...)
+    NUMBERED_REFERENCE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d')
+
+    def __init__(self, patterns, lowercase=False, cache_size=65536):
+        self.patterns = list(patterns)
+        self.lowercase = lowercase
+        self.cache_size = cache_size
+        self._regex = None
+        if self.patterns:
+            combined = '|'.join(f'(?:{self._scoped(p)})' for p in self.patterns)
+            try:
+                self._regex = re.compile(combined)
+            except re.error as e:
+                raise ValueError(f"Regeln lassen sich nicht kombinieren "
+                                 f"(z.B. gleicher Gruppenname in mehreren Regeln): {e}") from None
+        self.matches = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    @classmethod
+    def _scoped(cls, pattern):
+        """Prüft eine Regel einzeln und gibt sie in kombinierbarer Form zurück"""
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Regel {pattern!r} ist ungültig: {e}") from None
+        if cls.NUMBERED_REFERENCE.search(pattern):
+            raise ValueError(f"Regel {pattern!r}: nummerierte Rückverweise (\\1, (?(1)...)) sind nicht "
+                             f"erlaubt - stattdessen (?P<name>...) und (?P=name) verwenden")
+        # Globale Flags gelten nur am Anfang des Ausdrucks - auf die Regel begrenzen
+        flags = ''
+        while match := cls.GLOBAL_FLAGS.match(pattern):
+            flags += match.group(1)
+            pattern = pattern[match.end():]
+        if flags:
+            # Im Verbose-Modus würde ein Kommentar am Ende die Klammer verschlucken
+            end = '\n)' if 'x' in flags else ')'
+            pattern = f"(?{flags}:{pattern}{end}"
+        return pattern
+
+    def _match(self, value):
+        """Ungecachte Prüfung eines Wertes"""
+        if self._regex is None:
+            return False
+        if self.lowercase:
+            value = value.lower()
+        return self._regex.search(value) is not None
+
+    def __getstate__(self):
+        # Der LRU-Cache ist nicht picklebar - Worker bauen ihn neu auf
+        return {'patterns': self.patterns, 'lowercase': self.lowercase, 'cache_size': self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+class IpEnricher:
+    """Offline-Anreicherung von IP-Adressen: Netz (/24 bzw. /48), ASN und Land
+
+    Die ASN-Datei wird einmal in sortierte, überlappungsfreie Bereiche
+    (Start/Ende als Integer, je IP-Version) überführt; eine Abfrage ist
+    damit ein bisect (O(log n)) und wird je Adresse im LRU-Cache gehalten.
+    Angereichert werden nur die aggregierten Zähler (eindeutige IPs), nicht
+    jede Log-Zeile. Unterstützte Formate (eine Zeile pro Bereich, # = Kommentar):
+
+      CSV:  netz,asn[,name[,land]]             z.B. 192.0.2.0/24,AS64500,Beispiel,DE
+      TSV:  start<TAB>ende<TAB>asn<TAB>land<TAB>name   (Format von iptoasn.com)
+
+    Bei verschachtelten Netzen gewinnt das spezifischere.
+    """
+
+    def __init__(self, path=None, cache_size=65536):
+        self.path = path
+        # IP-Version -> (Starts, Enden, Infos), Info = (ASN, Name, Land)
+        self._tables = {4: ([], [], []), 6: ([], [], [])}
+        if path:
+            self._load(path)
+        self.address = functools.lru_cache(maxsize=cache_size)(self._parse)
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self._lookup)
+        self.network = functools.lru_cache(maxsize=cache_size)(self._network)
+
+    @property
+    def has_asn(self):
+        """True wenn eine ASN-Datei geladen wurde"""
+        return bool(self.path)
+
+    def _load(self, path):
+        ranges = {4: [], 6: []}
+        header = True  # die erste Datenzeile darf eine Kopfzeile sein
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                row = [field.strip() for field in next(csv.reader([line], delimiter='\t' if '\t' in line else ','))]
+                try:
+                    if '\t' in line:
+                        (version, start), (end_version, end) = self._parse(row[0]), self._parse(row[1])
+                        if version != end_version:
+                            raise ValueError
+                        asn, country, name = (row[2:5] + ['', '', ''])[:3]
+                    else:
+                        version, start, end = self._parse_network(row[0])
+                        asn, name, country = (row[1:4] + ['', '', ''])[:3]
+                    asn = int(asn[2:] if asn.upper().startswith('AS') else asn)
+                except (ValueError, TypeError, IndexError):
+                    if header:
+                        header = False
+                        continue
+                    raise ValueError(f"{path}:{line_number}: ungültiger Eintrag: {line[:80]}")
+                header = False
+                if start > end:
+                    raise ValueError(f"{path}:{line_number}: ungültiger Bereich: {line[:80]}")
+                if asn == 0:
+                    continue  # iptoasn: "Not routed"
+                ranges[version].append((start, end, (asn, sys.intern(name), country.upper())))
+
+        for version, entries in ranges.items():
+            starts, ends, infos = self._tables[version]
+            for start, end, info in self._flatten(entries):
+                # Benachbarte Bereiche mit gleicher Info zusammenlegen
+                if ends and ends[-1] + 1 == start and infos[-1] == info:
+                    ends[-1] = end
+                else:
+                    starts.append(start)
+                    ends.append(end)
+                    infos.append(info)
+
+    @staticmethod
+    def _flatten(entries):
+        """Verschachtelte Bereiche -> sortierte, disjunkte (Start, Ende, Info)
+
+        Sortiert nach Start (bei gleichem Start der größere zuerst); ein Stapel
+        hält die umschließenden Bereiche, deren Rest nach dem inneren weiterläuft.
+        """
+        stack = []  # (Ende, Info) der offenen Bereiche, innerster oben
+        cursor = 0
+        for start, end, info in sorted(entries, key=lambda entry: (entry[0], -entry[1])):
+            while stack and stack[-1][0] < start:
+                outer_end, outer_info = stack.pop()
+                if cursor <= outer_end:
+                    yield cursor, outer_end, outer_info
+                    cursor = outer_end + 1
+            if stack and cursor < start:
+                yield cursor, start - 1, stack[-1][1]
+            cursor = max(cursor, start)
+            stack.append((end, info))
+        while stack:
+            outer_end, outer_info = stack.pop()
+            if cursor <= outer_end:
+                yield cursor, outer_end, outer_info
+                cursor = outer_end + 1
+
+    @staticmethod
+    def _parse(ip):
+        """(Version, Integer) einer IP, None wenn ungültig
+
+        inet_pton statt ipaddress - um ein Vielfaches schneller bei Millionen
+        Adressen. IPv4-mapped IPv6 (::ffff:a.b.c.d) zählt als IPv4.
+        """
+        version, family = (6, socket.AF_INET6) if ':' in ip else (4, socket.AF_INET)
+        try:
+            value = int.from_bytes(socket.inet_pton(family, ip), 'big')
+        except (OSError, ValueError):
+            return None
+        if version == 6 and value >> 32 == 0xffff:
+            return 4, value & 0xffffffff
+        return version, value
+
+    @classmethod
+    def _parse_network(cls, network):
+        """(Version, Start, Ende) eines CIDR-Netzes (Host-Bits werden ignoriert)"""
+        ip, _, prefix = network.partition('/')
+        mapped = ':' in ip
+        version, value = cls._parse(ip)
+        bits = 32 if version == 4 else 128
+        prefix = int(prefix) if prefix else (128 if mapped else bits)
+        if version == 4 and mapped:
+            prefix -= 96
+        if not 0 <= prefix <= bits:
+            raise ValueError(network)
+        host = (1 << (bits - prefix)) - 1
+        return version, value & ~host, value | host
+
+    def _lookup(self, ip):
+        """(ASN, Name, Land) einer IP, None wenn unbekannt"""
+        address = self.address(ip)
+        if address is None:
+            return None
+        version, value = address
+        starts, ends, infos = self._tables[version]
+        position = bisect.bisect_right(starts, value) - 1
+        if position >= 0 and value <= ends[position]:
+            return infos[position]
+        return None
+
+    def _network(self, ip):
+        """/24 (IPv4) bzw. /48 (IPv6) einer IP, ungültige Werte unverändert"""
+        address = self.address(ip)
+        if address is None:
+            return ip
+        version, value = address
+        if version == 4:
+            return socket.inet_ntop(socket.AF_INET, (value >> 8 << 8).to_bytes(4, 'big')) + '/24'
+        return socket.inet_ntop(socket.AF_INET6, (value >> 80 << 80).to_bytes(16, 'big')) + '/48'
+
+    def label(self, ip):
+        """Kurzbeschreibung für Berichte, z.B. "AS64500 DE", leer wenn unbekannt"""
+        info = self.lookup(ip)
+        if info is None:
+            return ''
+        return f"AS{info[0]} {info[2]}".strip()
+
+    def aggregate(self, counter):
+        """Zähler IP -> Anzahl zusammengefasst nach Netz, ASN und Land"""
+        networks, asns, countries = Counter(), Counter(), Counter()
+        for ip, count in counter.items():
+            networks[self.network(ip)] += count
+            info = self.lookup(ip)
+            if info is not None:
+                asns[info[:2]] += count
+                if info[2]:
+                    countries[info[2]] += count
+        return {'networks': networks, 'asns': asns, 'countries': countries}
+
+class LogFormat:
+    """Übersetzt ein nginx log_format in Regexe für Text- und Bytes-Engine
+
+    Literale Teile werden wörtlich übernommen, Variablen ohne eigene Regel
+    laufen bis zum nächsten Literal-Zeichen. Erfasst werden nur die Felder,
+    die die Statistik braucht (FIELDS, mit Antwortzeiten auch LATENCY_FIELDS);
+    alles hinter dem letzten davon wird gar nicht erst geprüft. Die
+    Bytes-Regex liefert bei findall Tupel in Reihenfolge des Formats - weicht
+    sie von row_fields ab, sortiert reorder um.
+    """
+
+    FIELDS = ('ip', 'time', 'method', 'path', 'status', 'size', 'user_agent')
+    REQUIRED = ('ip', 'time', 'method', 'path', 'status', 'size')
+    # Nur bei Formaten mit Antwortzeiten: Zeilen haben dann zusätzlich diese Felder
+    LATENCY_FIELDS = ('request_time', 'upstream_time')
+    VARIABLE = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+    # nginx-Variable -> (Feld, Regex); Regex None = bis zum nächsten Literal
+    VARIABLES = {
+        'remote_addr': ('ip', r'\S+'),
+        'time_local': ('time', None),
+        'request_method': ('method', r'\S+'),
+        'request_uri': ('path', r'\S+'),
+        'uri': ('path', r'\S+'),
+        'status': ('status', r'\d+'),
+        'body_bytes_sent': ('size', r'\d+|-'),
+        'bytes_sent': ('size', r'\d+|-'),
+        'http_user_agent': ('user_agent', None),
+        'request_time': ('request_time', r'\d+(?:\.\d+)?|-'),
+        # Mehrere Upstreams: "0.010, 0.020 : 0.005" - bis zum nächsten Literal
+        'upstream_response_time': ('upstream_time', None),
+    }
+
+    def __init__(self, log_format):
+        self.log_format = log_format
+        self.fields = []
+        pattern = self._compile(log_format)
+        self.pattern = re.compile(pattern)
+        self.pattern_bytes = re.compile(b'^' + pattern.encode('utf-8'), re.MULTILINE)
+        self.timed = any(field in self.fields for field in self.LATENCY_FIELDS)
+        order = [self.fields.index(field) for field in self.row_fields]
+        self.reorder = None if order == list(range(len(order))) else itemgetter(*order)
+
+    def _compile(self, log_format):
+        tokens = []  # (literal, None) oder (None, Variablenname)
+        position = 0
+        for match in self.VARIABLE.finditer(log_format):
+            if match.start() > position:
+                tokens.append((log_format[position:match.start()], None))
+            tokens.append((None, match.group(1) or match.group(2)))
+            position = match.end()
+        if position < len(log_format):
+            tokens.append((log_format[position:], None))
+
+        pieces = []
+        end = 0  # Regex endet nach dem Literal hinter dem letzten erfassten Feld
+        for index, (literal, variable) in enumerate(tokens):
+            if literal is not None:
+                pieces.append(re.escape(literal))
+                # Das Literal direkt hinter einem erfassten Feld gehört noch dazu
+                if end and end == len(pieces) - 1:
+                    end = len(pieces)
+                continue
+
+            captured = len(self.fields)
+            following = tokens[index + 1][0] if index + 1 < len(tokens) else None
+            if variable == 'request':
+                method = self._capture('method', r'\S+')
+                path = self._capture('path', r'\S+')
+                pieces.append(f"{method} {path} \\S+")
+            else:
+                field, regex = self.VARIABLES.get(variable, (None, None))
+                if regex is None:
+                    # Bis zum nächsten Literal-Zeichen (nie über das Zeilenende hinaus)
+                    stop = re.escape(following[0]) if following else ''
+                    regex = f"[^{stop}\\n]{'+' if field == 'time' else '*'}"
+                    if following is None and index + 1 < len(tokens):
+                        regex += '?'
+                pieces.append(self._capture(field, regex) if field else f"(?:{regex})")
+            if len(self.fields) > captured:
+                end = len(pieces)
+
+        missing = [field for field in self.REQUIRED if field not in self.fields]
+        if missing:
+            raise ValueError(f"log_format enthält keine Variable für: {', '.join(missing)}")
+        pattern = ''.join(pieces[:end])
+        # Fehlende optionale Felder als leere Gruppe, damit die Tupel gleich aufgebaut sind
+        if 'user_agent' not in self.fields:
+            pattern += self._capture('user_agent', '')
+        if any(field in self.fields for field in self.LATENCY_FIELDS):
+            for field in self.LATENCY_FIELDS:
+                if field not in self.fields:
+                    pattern += self._capture(field, '')
+        return pattern
+
+    @property
+    def row_fields(self):
+        """Felder der findall-Tupel (FIELDS, bei Antwortzeiten + LATENCY_FIELDS)"""
+        return self.FIELDS + self.LATENCY_FIELDS if self.timed else self.FIELDS
+
+    def findall(self, buffer, pos=0, endpos=None):
+        """Alle Zeilen im Puffer als Byte-Tupel in row_fields-Reihenfolge"""
+        if endpos is None:
+            rows = self.pattern_bytes.findall(buffer, pos)
+        else:
+            rows = self.pattern_bytes.findall(buffer, pos, endpos)
+        if self.reorder is not None:
+            rows = list(map(self.reorder, rows))
+        return rows
+
+    def _capture(self, field, regex):
+        """Erfassende Gruppe für field - nur beim ersten Vorkommen des Feldes"""
+        if field in self.fields:
+            return f"(?:{regex})"
+        self.fields.append(field)
+        return f"(?P<{field}>{regex})"
+
+@functools.lru_cache(maxsize=None)
+def compile_log_format(log_format):
+    """LogFormat für einen Namen aus LOG_FORMATS oder einen log_format-String"""
+    return LogFormat(LOG_FORMATS.get(log_format, log_format))
+
+def split_log_file_entry(entry):
+    """LOG_FILES-Eintrag -> (Pfad, Format)"""
+    if isinstance(entry, (tuple, list)):
+        return entry[0], entry[1]
+    return entry, DEFAULT_LOG_FORMAT
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+MONTHS = {name: number for number, name in enumerate(MONTH_NAMES, 1)}
+
+class TimestampDecoder:
+    """Schneller Decoder für nginx $time_local ("10/Oct/2000:13:55:36 +0200")
+
+    Liefert (Unix-Zeit, lokale Stunde, lokales Datum). Aufeinanderfolgende
+    Zeilen teilen sich Datum/Stunde/Minute, deshalb wird alles bis auf die
+    Sekunden je Präfix + Zeitzone nur einmal berechnet und gecacht. Die
+    Minute gehört mit in den Schlüssel, damit auch Zeitzonen mit halben
+    Stunden Versatz die richtige lokale Stunde bekommen; die teure
+    Kalenderrechnung selbst passiert nur einmal pro Stunde.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._cache = {}
+        self._hours = {}
+
+    def decode(self, time_str):
+        """Gibt (epoch, stunde, 'YYYY-MM-DD') zurück, None bei ungültigem Format"""
+        key = time_str[:17] + time_str[20:]
+        minute = self._cache.get(key)
+        if minute is None:
+            minute = self._decode_minute(time_str)
+            if minute is None:
+                return None
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = minute
+
+        # Wie datetime.strptime: Sekunden über :59 sind ungültig (auch :60/:61)
+        seconds = time_str[18:20]
+        if not seconds.isdigit() or seconds > '59' or time_str[17] != ':':
+            return None
+        return minute[0] + int(seconds), minute[1], minute[2]
+
+    def _decode_minute(self, time_str):
+        """Dekodiert Datum, Stunde, Minute und Zeitzone eines Zeitstempels"""
+        minute_str = time_str[15:17]
+        if len(time_str) < 20 or time_str[14] != ':' or not minute_str.isdigit() or minute_str > '59':
+            return None
+
+        hour_key = time_str[:14] + time_str[20:]
+        hour = self._hours.get(hour_key, False)
+        if hour is False:
+            if len(self._hours) >= self.cache_size:
+                self._hours.clear()
+            hour = self._hours[hour_key] = self._decode_hour(time_str)
+        if hour is None:
+            return None
+
+        epoch_hour, local_hour, local_date, aligned = hour
+        epoch = epoch_hour + int(minute_str) * 60
+        if aligned:
+            return epoch, local_hour, local_date
+        local = datetime.fromtimestamp(epoch)
+        return epoch, local.hour, local.strftime('%Y-%m-%d')
+
+    def _decode_hour(self, time_str):
+        """Dekodiert Datum, Stunde und Zeitzone (Minute 0)
+
+        aligned ist True, wenn die ganze Stunde in lokaler Zeit in dieselbe
+        Stunde fällt (Zeitzonen mit vollen Stunden Versatz, kein DST-Wechsel).
+        """
+        if time_str[2] != '/' or time_str[6] != '/' or time_str[11] != ':':
+            return None
+        try:
+            tz_str = time_str[21:]
+            if tz_str:
+                if time_str[20] != ' ' or len(tz_str) != 5 or tz_str[0] not in '+-' \
+                        or not tz_str[1:].isdigit():
+                    return None
+                offset = timedelta(hours=int(tz_str[1:3]), minutes=int(tz_str[3:5]))
+                tz = timezone(-offset if tz_str[0] == '-' else offset)
+            else:
+                tz = None  # ohne Zeitzone: lokale Zeit annehmen
+
+            dt = datetime(int(time_str[7:11]), MONTHS[time_str[3:6]], int(time_str[0:2]),
+                          int(time_str[12:14]), tzinfo=tz)
+        except (KeyError, ValueError):
+            return None
+
+        epoch = int(dt.timestamp())
+        local = datetime.fromtimestamp(epoch)
+        local_end = datetime.fromtimestamp(epoch + 3599)
+        aligned = local.minute == 0 and local_end.minute == 59 and local_end.hour == local.hour
+        return epoch, local.hour, local.strftime('%Y-%m-%d'), aligned
+
+# Rotierte Geschwister einer Log-Datei: access.log.1, access.log.2.gz,
+# access.log-20260101.xz ... (logrotate mit und ohne dateext)
+ROTATED_SUFFIX = re.compile(r'^[.-]\d+(\.gz|\.bz2|\.xz|\.zst)?$')
+
+def _open_zstd(path, mode='rb'):
+    """Öffnet eine .zst Datei als gepufferten Byte-Stream"""
+    if zstandard is None:
+        raise OSError("Python-Modul 'zstandard' fehlt für .zst Dateien (pip install zstandard)")
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return io.BufferedReader(reader)
+
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    '.zst': _open_zstd,
+}
+
+def is_compressed(path):
+    """True wenn die Datei anhand der Endung komprimiert ist"""
+    return os.path.splitext(path)[1] in COMPRESSED_OPENERS
+
+def open_log(path):
+    """Öffnet eine (ggf. komprimierte) Log-Datei binär - ohne Entpacken auf Platte"""
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, 'rb')
+
+def find_rotated_logs(log_file):
+    """Findet rotierte Versionen einer Log-Datei, älteste zuerst (nach mtime)"""
+    directory, name = os.path.split(log_file)
+    rotated = []
+    try:
+        with os.scandir(directory or '.') as entries:
+            for entry in entries:
+                if entry.name.startswith(name) and ROTATED_SUFFIX.match(entry.name[len(name):]) \
+                        and entry.is_file():
+                    rotated.append((entry.stat().st_mtime, entry.path))
+    except OSError:
+        return []
+    return [path for _, path in sorted(rotated)]
+
+_decode_bytes = methodcaller('decode', 'utf-8', 'ignore')
+
+def format_log_time(epoch, tz_minutes):
+    """Gegenstück zu TimestampDecoder: epoch + Zeitzone -> nginx $time_local"""
+    if tz_minutes == ColumnIndex.NO_TZ:
+        dt = datetime.fromtimestamp(epoch)
+        suffix = ''
+    else:
+        dt = datetime.fromtimestamp(epoch, timezone(timedelta(minutes=tz_minutes)))
+        sign = '-' if tz_minutes < 0 else '+'
+        suffix = f" {sign}{abs(tz_minutes) // 60:02d}{abs(tz_minutes) % 60:02d}"
+    return (f"{dt.day:02d}/{MONTH_NAMES[dt.month - 1]}/{dt.year}:"
+            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}{suffix}")
+
+class ColumnIndex:
+    """Spaltenweiser On-Disk-Index einer Log-Datei (numpy, memory-mapped)
+
+    Jede Spalte liegt als Binärdatei fester Breite im Index-Verzeichnis und
+    wird beim Aktualisieren nur angehängt. IP, Methode, Pfad und User-Agent
+    sind dictionary-kodiert (Code = Position im Wörterbuch). meta.pickle hält
+    Dateikennung, gelesenen Offset, Zeilenzahl und Wörterbücher und wird
+    zuletzt atomar geschrieben - Bytes hinter der gespeicherten Zeilenzahl
+    (abgebrochener Lauf) werden beim nächsten Anhängen verworfen.
+    """
+
+    COLUMNS = {
+        'epoch': 'int64',
+        'tz': 'int16',            # Zeitzonen-Versatz in Minuten
+        'status': 'uint16',
+        'size': 'int64',          # -1 für "-"
+        'ip': 'uint32',
+        'method': 'uint32',
+        'path': 'uint32',
+        'user_agent': 'uint32',
+        'request_time': 'float64',    # Sekunden, NaN ohne Antwortzeit
+        'upstream_time': 'float64',
+    }
+    DICTIONARY_COLUMNS = ('ip', 'method', 'path', 'user_agent')
+    INVALID_EPOCH = -2 ** 63      # Zeitstempel nicht dekodierbar
+    NO_TZ = -2 ** 15              # Zeitstempel ohne Zeitzone (lokale Zeit)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = self._load_meta()
+        self._codes = None
+        self._strings = {}
+        self._truncated = False
+
+    def _load_meta(self):
+        """Lädt die Metadaten (None wenn nicht vorhanden oder veraltet)"""
+        try:
+            with open(os.path.join(self.directory, 'meta.pickle'), 'rb') as f:
+                meta = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"   {Colors.WARNING}⚠ Index unlesbar, wird neu aufgebaut: {e}{Colors.RESET}")
+            return None
+        return meta if meta.get('version') == INDEX_VERSION else None
+
+    def reset(self, file_stat):
+        """Leert den Index für eine (neue) Datei"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in self.COLUMNS:
+            with open(self._column_path(name), 'wb'):
+                pass
+        self.meta = {
+            'version': INDEX_VERSION,
+            'inode': file_stat.st_ino,
+            'device': file_stat.st_dev,
+            'size': file_stat.st_size,
+            'mtime': file_stat.st_mtime,
+            'offset': 0,
+            'rows': 0,
+            'values': {name: [] for name in self.DICTIONARY_COLUMNS},
+            # Zeile -> Original-Zeitstempel, wo format_log_time ihn nicht exakt nachbildet
+            'time_exceptions': {},
         }
+        self._codes = None
+        self._strings = {}
+        self._truncated = True
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def encode(self, name, values):
+        """Byte-Werte einer Wörterbuch-Spalte -> Codes (neue Werte werden angehängt)"""
+        if self._codes is None:
+            self._codes = {column: {value: code for code, value in enumerate(self.meta['values'][column])}
+                           for column in self.DICTIONARY_COLUMNS}
+        codes = self._codes[name]
+        missing = set(values).difference(codes)
+        if missing:
+            dictionary = self.meta['values'][name]
+            # Reihenfolge des ersten Auftretens, damit der Index deterministisch ist
+            for value in values:
+                if value in missing and value not in codes:
+                    codes[value] = len(dictionary)
+                    dictionary.append(value)
+            self._strings.pop(name, None)
+        return list(map(codes.__getitem__, values))
+
+    def append(self, columns):
+        """Hängt einen Block Zeilen an ({Spalte: Werte}, alle gleich lang)"""
+        rows = self.meta['rows']
+        for name, dtype in self.COLUMNS.items():
+            data = np.asarray(columns[name], dtype=dtype)
+            with open(self._column_path(name), 'ab') as f:
+                if not self._truncated:
+                    f.truncate(rows * data.itemsize)
+                f.write(data.tobytes())
+        self._truncated = True
+        self.meta['rows'] = rows + len(columns['epoch'])
+
+    def save(self, file_stat, offset):
+        """Schreibt die Metadaten atomar - erst danach gelten angehängte Zeilen"""
+        self.meta.update({'inode': file_stat.st_ino, 'device': file_stat.st_dev,
+                          'size': file_stat.st_size, 'mtime': file_stat.st_mtime, 'offset': offset})
+        path = os.path.join(self.directory, 'meta.pickle')
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self.meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def column(self, name):
+        """Spalte als (read-only, memory-mapped) numpy-Array"""
+        dtype = np.dtype(self.COLUMNS[name])
+        if not self.meta['rows']:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(self.meta['rows'],))
+
+    def strings(self, name):
+        """Dekodierte (internierte) Werte einer Wörterbuch-Spalte, Index = Code"""
+        if name not in self._strings:
+            self._strings[name] = list(map(sys.intern, map(_decode_bytes, self.meta['values'][name])))
+        return self._strings[name]
+
+
+# Teile eines bytes-$time_local ("10/Oct/2000:13:55:36 +0200") für die Bytes-Engine
+_TIME_PREFIX = itemgetter(slice(None, 17))
+_TIME_SECONDS = itemgetter(slice(17, 20))
+_TIME_ZONE = itemgetter(slice(20, None))
+_VALID_SECONDS = frozenset(b':%02d' % second for second in range(60))
+# numpy-Engine: Spalten des Minuten-Schlüssels (Zeitstempel ohne ":SS") und
+# darin die des Stunden-Schlüssels (ohne ":MM")
+_TIME_MINUTE_COLUMNS = list(range(17)) + list(range(20, 26))
+_MINUTE_HOUR_COLUMNS = list(range(14)) + list(range(17, 23))
+
+def _minute_arrays(decoded):
+    """Dekodierte Minuten (Tupel oder None) -> (gültig, epoch, Stunde, Datums-Code, Daten) als Arrays"""
+    date_names = list(dict.fromkeys(minute[2] for minute in decoded if minute))
+    date_codes = dict(zip(date_names, range(len(date_names))))
+    return (np.array([minute is not None for minute in decoded], dtype=bool),
+            np.array([minute[0] if minute else 0 for minute in decoded], dtype=np.int64),
+            np.array([minute[1] if minute else 0 for minute in decoded], dtype=np.int64),
+            np.array([date_codes[minute[2]] if minute else 0 for minute in decoded], dtype=np.int64),
+            date_names)
+
+def _fixed_width(values, width):
+    """Byte-Werte ohne Zeilenumbruch als (n, width)-uint8-Matrix, None wenn nicht alle width lang sind"""
+    grid = np.frombuffer(b'\n'.join(values) + b'\n', dtype=np.uint8)
+    if len(grid) != (width + 1) * len(values):
+        return None
+    grid = grid.reshape(-1, width + 1)
+    # Jeder Wert muss an seinem Trenner enden - sonst gleichen sich nur kürzere und längere aus
+    return grid[:, :width] if (grid[:, width] == 10).all() else None
+
+# Näherungsmodus (--naeherung): Sketches fester Größe statt exakter Sets/Counter
+# für Werte, die unter Scanner-Traffic unbegrenzt wachsen
+SKETCH_COUNTERS = ('top_ips', 'top_pages', 'user_agents', 'bot_requests', 'suspicious_ips')
+_HLL_POWERS = [2.0 ** -rank for rank in range(66)]
+
+class HyperLogLog:
+    """Kardinalitätsschätzung mit fester Größe (HyperLogLog, Flajolet et al.)
+
+    2^precision Register zu je einem Byte, Standardfehler 1.04/sqrt(2^precision)
+    (precision 14: 16 KB, ±0,8%). Zusammenführen ist ein registerweises
+    Maximum - Dateien und Worker können getrennt zählen. Für den Analyzer
+    verhält sich das Objekt wie ein set (add, |=, len).
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._shift = 64 - precision
+        self._mask = (1 << self._shift) - 1
+
+    def add(self, value):
+        # Stabiler Hash (nicht hash()), damit Worker-Prozesse dieselben Register treffen
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogatepass'),
+                                                digest_size=8).digest(), 'big')
+        index = hashed >> self._shift
+        rank = self._shift - (hashed & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Nimmt eine andere HyperLogLog oder beliebige Werte (z.B. ein set) auf"""
+        if isinstance(other, HyperLogLog):
+            if other.precision != self.precision:
+                raise ValueError("HyperLogLog mit unterschiedlicher Genauigkeit")
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        else:
+            self.update(other)
+        return self
+
+    __ior__ = merge
+
+    def estimate(self):
+        """Geschätzte Anzahl verschiedener Werte"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_HLL_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Kleine Mengen: Linear Counting ist hier genauer
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+    def __len__(self):
+        return int(round(self.estimate()))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+class SpaceSaving:
+    """Top-k-Zähler mit fester Größe (Space-Saving, Metwally et al.)
+
+    Hält höchstens capacity Schlüssel. Ist er voll, verdrängt ein neuer
+    Schlüssel den kleinsten Zähler und übernimmt dessen Wert. Zählwerte sind
+    dadurch nie zu klein und höchstens um den kleinsten Zähler (≤ N/capacity)
+    zu groß. Die Schnittstelle entspricht dem Teil von Counter, den der
+    Analyzer nutzt ([key] += n, update, most_common, items, values); total
+    ist die exakte Summe aller Zählungen.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        # Min-Heap (Zähler, Schlüssel) mit genau einem Eintrag je Schlüssel; der
+        # Zähler darf veraltet (zu klein) sein und wird erst beim Verdrängen geprüft
+        self._heap = []
+
+    def add(self, key, count=1):
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+            heapq.heappush(self._heap, (count, key))
+        else:
+            heap = self._heap
+            while True:
+                low, victim = heap[0]
+                current = counts[victim]
+                if current == low:
+                    break
+                heapq.heapreplace(heap, (current, victim))
+            del counts[victim]
+            counts[key] = low + count
+            heapq.heapreplace(heap, (low + count, key))
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+    def __setitem__(self, key, value):
+        self.add(key, value - self.counts.get(key, 0))
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def items(self):
+        return self.counts.items()
+
+    def values(self):
+        return self.counts.values()
+
+    def most_common(self, n=None):
+        if n is None:
+            return sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+    def error_bound(self):
+        """Maximale Überschätzung eines Zählwerts (0 solange nichts verdrängt wurde)"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, values):
+        """Zählt ein Mapping (Schlüssel -> Anzahl) oder eine Folge von Schlüsseln"""
+        if isinstance(values, SpaceSaving):
+            self.merge(values)
+        elif hasattr(values, 'items'):
+            for key, count in values.items():
+                self.add(key, count)
+        else:
+            for key in values:
+                self.add(key)
 
-        # Zeitfilter berechnen
-        self.time_range = self._calculate_time_range()
+    def merge(self, other):
+        """Führt zwei Zusammenfassungen zusammen (Agarwal et al., "Mergeable Summaries")
 
-        # Regex für nginx combined log format
-        self.log_pattern = re.compile(
-            r'(?P<ip>\S+) - - \[(?P<time>[^\]]+)\] "(?P<method>\S+) (?P<path>\S+) (?P<protocol>\S+)" '
-            r'(?P<status>\d+) (?P<size>\d+|-) "(?P<referrer>[^"]*)" "(?P<user_agent>[^"]*)"'
-        )
+        Fehlt ein Schlüssel auf einer Seite, wird dort deren Fehlerschranke
+        angenommen; danach bleiben die capacity größten Zähler.
+        """
+        if not isinstance(other, SpaceSaving):
+            self.update(other)
+            return self
+        own_bound, other_bound = self.error_bound(), other.error_bound()
+        merged = {key: count + other.counts.get(key, other_bound) for key, count in self.counts.items()}
+        for key, count in other.counts.items():
+            if key not in merged:
+                merged[key] = count + own_bound
+        if len(merged) > self.capacity:
+            keep = set(heapq.nlargest(self.capacity, merged, key=merged.__getitem__))
+            merged = {key: count for key, count in merged.items() if key in keep}
+        self.counts = merged
+        self.total += other.total
+        self._heap = [(count, key) for key, count in merged.items()]
+        heapq.heapify(self._heap)
+        return self
+
+class LatencyHistogram:
+    """Antwortzeit-Verteilung in logarithmischen Buckets (HDR-Histogramm-Prinzip)
+
+    Bucket i deckt (b^(i-1), b^i] mit b = 1 + LATENCY_PRECISION ab, Perzentile
+    sind damit auf ±LATENCY_PRECISION/2 relativ genau, das Maximum exakt. Die
+    Größe hängt nur von der Spannweite der Werte ab (1 ms bis 100 s: ~580
+    Buckets), nicht von der Anzahl. Zusammenführen addiert die Buckets.
+    """
+
+    LOG_BASE = math.log1p(LATENCY_PRECISION)
+    ZERO_BUCKET = -2 ** 15        # Antwortzeit 0 (nginx misst in Millisekunden)
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.max = 0.0
+
+    @classmethod
+    def bucket(cls, seconds):
+        """Bucket-Nummer einer Antwortzeit in Sekunden"""
+        return math.ceil(math.log(seconds) / cls.LOG_BASE) if seconds > 0 else cls.ZERO_BUCKET
+
+    def add(self, seconds, count=1):
+        self.buckets[self.bucket(seconds)] += count
+        self.count += count
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        """Übernimmt ein anderes Histogramm (in-place)"""
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.max = max(self.max, other.max)
+        return self
+
+    __iadd__ = merge
+
+    def __len__(self):
+        return self.count
+
+    def percentile(self, fraction):
+        """Antwortzeit, unter der fraction aller Requests liegen (None ohne Daten)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                break
+        if bucket == self.ZERO_BUCKET:
+            return 0.0
+        # Geometrische Bucket-Mitte, nie über dem gemessenen Maximum
+        return min(math.exp((bucket - 0.5) * self.LOG_BASE), self.max)
+
+    def summary(self):
+        """{'count', 'p50', 'p90', 'p99', 'max'} in Sekunden"""
+        return {'count': self.count, 'p50': self.percentile(0.5), 'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99), 'max': self.max if self.count else None}
+
+def parse_latency(raw):
+    """$request_time/$upstream_response_time (str oder bytes) -> Sekunden, None für "-"
+
+    Mehrere Upstream-Zeiten ("0.010, 0.020 : 0.005") werden addiert.
+    """
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    if isinstance(raw, bytes):
+        raw = raw.decode('ascii', errors='ignore')
+    total = None
+    for part in re.split(r'[,:]', raw):
+        try:
+            total = (total or 0.0) + float(part)
+        except ValueError:
+            continue
+    return total
+
+# Spalten der von der Bytes-Engine gelieferten Zeilen-Tupel (die Antwortzeiten
+# nur bei Formaten mit LogFormat.timed)
+(_ROW_IP, _ROW_TIME, _ROW_METHOD, _ROW_PATH, _ROW_STATUS, _ROW_SIZE,
+ _ROW_USER_AGENT, _ROW_REQUEST_TIME, _ROW_UPSTREAM_TIME) = (itemgetter(index) for index in range(9))
+
+def _decode_counter(counter):
+    """Counter mit bytes-Schlüsseln -> Counter mit str-Schlüsseln
+
+    Die Reihenfolge bleibt erhalten. Dekodiert wird in einem Stück statt je
+    Schlüssel - die Felder der Bytes-Regex enthalten nie einen Zeilenumbruch,
+    er trennt die Schlüssel eindeutig. Dekodieren zwei Schlüssel (ungültiges
+    UTF-8) zum selben str, werden ihre Zählungen addiert.
+    """
+    if not counter:
+        return Counter()
+    keys = b'\n'.join(counter).decode('utf-8', 'ignore').split('\n')
+    result = Counter()
+    dict.update(result, zip(keys, counter.values()))
+    if len(result) != len(counter):
+        result = Counter()
+        for key, count in zip(keys, counter.values()):
+            result[key] += count
+    return result
+
+def _new_unique_set(sketch=None):
+    """Menge eindeutiger Werte: exakt (set) oder HyperLogLog im Näherungsmodus"""
+    return HyperLogLog(sketch['hll_precision']) if sketch else set()
+
+def _new_file_stats(sketch=None):
+    """Leere Per-File Statistik"""
+    return {'requests': 0, 'unique_ips': _new_unique_set(sketch),
+            'latency': LatencyHistogram(), 'upstream_latency': LatencyHistogram()}
+
+def _new_stats(sketch=None):
+    """Leere Statistik-Struktur (picklebar, damit Worker sie zurückgeben können)
+
+    sketch = {'hll_precision': ..., 'topk_capacity': ...} ersetzt die
+    unbegrenzt wachsenden Sets/Counter durch Sketches fester Größe.
+    """
+    stats = {
+        'total_requests': 0,
+        'unique_ips': _new_unique_set(sketch),
+        'status_codes': Counter(),
+        'methods': Counter(),
+        'top_pages': Counter(),
+        'top_ips': Counter(),
+        'user_agents': Counter(),
+        'hourly_traffic': defaultdict(int),
+        'daily_traffic': defaultdict(int),
+        'bytes_transferred': 0,
+        'bot_requests': Counter(),
+        'error_count': 0,
+        'error_requests': deque(maxlen=ERROR_BUFFER_SIZE),
+        'suspicious_ips': Counter(),
+        'path_latency': defaultdict(LatencyHistogram),
+        'log_file_stats': defaultdict(functools.partial(_new_file_stats, sketch))
+    }
+    if sketch:
+        for name in SKETCH_COUNTERS:
+            stats[name] = SpaceSaving(sketch['topk_capacity'])
+    return stats
+
+def merge_stats(target, other):
+    """Führt eine Teil-Statistik in target zusammen.
+
+    Teil-Statistiken müssen in Log-Reihenfolge zusammengeführt werden, dann
+    entspricht das Ergebnis (inkl. Reihenfolge gleich häufiger Einträge und
+    der letzten Fehler) exakt einem Durchlauf in einem Prozess.
+    """
+    for key, value in other.items():
+        if key == 'log_file_stats':
+            for source_file, file_stats in value.items():
+                target_file = target['log_file_stats'][source_file]
+                target_file['requests'] += file_stats['requests']
+                target_file['unique_ips'] |= file_stats['unique_ips']
+                target_file['latency'] += file_stats['latency']
+                target_file['upstream_latency'] += file_stats['upstream_latency']
+        elif isinstance(target[key], (HyperLogLog, SpaceSaving)):
+            # Sketches nehmen andere Sketches wie auch exakte Teil-Ergebnisse auf
+            target[key].merge(value)
+        elif isinstance(value, Counter):
+            target[key].update(value)
+        elif isinstance(value, set):
+            target[key] |= value
+        elif isinstance(value, deque):
+            target[key].extend(value)
+        elif isinstance(value, dict):
+            for sub_key, count in value.items():
+                target[key][sub_key] += count
+        else:
+            target[key] += value
+    return target
+
+class LogTail:
+    """Folgt einer Log-Datei wie "tail -F"
+
+    Gelesen wird ab dem aktuellen Dateiende. Wird die Datei rotiert (Pfad
+    zeigt auf eine neue Inode) oder gekürzt (copytruncate), wird der Rest
+    der alten Datei noch ausgelesen und dann von vorne weitergelesen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.identity = None
+        self.rest = b''
+        self.rotations = 0
+        self._open(from_start=False)
+
+    def _open(self, from_start):
+        try:
+            self.file = open(self.path, 'rb')
+        except OSError:
+            self.file = None
+            self.identity = None
+            return
+        file_stat = os.fstat(self.file.fileno())
+        self.identity = (file_stat.st_dev, file_stat.st_ino)
+        if not from_start:
+            self.file.seek(0, os.SEEK_END)
+
+    def read(self):
+        """Neue vollständige Zeilen als ein Byte-Block (b'' wenn nichts Neues)"""
+        data = self.rest + (self.file.read() if self.file else b'')
+        try:
+            file_stat = os.stat(self.path)
+        except OSError:
+            file_stat = None
+
+        if file_stat is not None:
+            if (file_stat.st_dev, file_stat.st_ino) != self.identity:
+                # Rotiert: alte Datei ist ausgelesen, neue von Anfang an lesen
+                if self.file:
+                    self.file.close()
+                    self.rotations += 1
+                if data and not data.endswith(b'\n'):
+                    data += b'\n'
+                self._open(from_start=True)
+                if self.file:
+                    data += self.file.read()
+            elif self.file and file_stat.st_size < self.file.tell():
+                # Gekürzt (copytruncate): unvollständige Zeile verwerfen
+                self.file.seek(0)
+                self.rotations += 1
+                data = data[:data.rfind(b'\n') + 1] + self.file.read()
+
+        cut = data.rfind(b'\n') + 1
+        self.rest = data[cut:]
+        return data[:cut]
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+class RollingWindow:
+    """Gleitendes Zeitfenster (z.B. letzte 5 Minuten) aus Ring-Buckets
+
+    Das Fenster ist in gleich lange Buckets geteilt, jeder mit eigenen
+    Zählern; die Summen über das Fenster werden laufend mitgeführt. Ein
+    Eintrag kostet O(1), beim Weiterrücken wird ein abgelaufener Bucket
+    von den Summen abgezogen - der Aufwand hängt also an der Zahl der
+    eingegangenen Zeilen, nicht an der Fenstergröße.
+    """
+
+    def __init__(self, span, bucket_seconds):
+        self.span = span
+        self.bucket_seconds = bucket_seconds
+        self.size = span // bucket_seconds
+        self.buckets = [None] * self.size     # je Slot (Bucket-Nummer, Zähler)
+        self.current = None
+        self.started = None
+        self.totals = self._new_bucket()
 
-        # Bot User-Agent Patterns
-        self.bot_patterns = [
-            r'bot', r'crawler', r'spider', r'scraper', r'wget', r'curl',
-            r'python', r'java', r'php', r'ruby', r'go-http-client'
-        ]
+    @staticmethod
+    def _new_bucket():
+        return {'requests': 0, 'errors': 0, 'bytes': 0,
+                'ips': Counter(), 'status_codes': Counter(), 'suspicious_ips': Counter()}
+
+    def advance(self, now):
+        """Rückt das Fenster bis now (epoch) vor und verwirft abgelaufene Buckets"""
+        bucket_id = int(now // self.bucket_seconds)
+        if self.current is None:
+            self.current = bucket_id
+            self.started = now
+            return
+        # Höchstens eine Runde durch den Ring - danach ist ohnehin alles abgelaufen
+        for next_id in range(max(self.current + 1, bucket_id - self.size + 1), bucket_id + 1):
+            self._expire(next_id % self.size)
+        self.current = max(self.current, bucket_id)
+
+    def _expire(self, slot):
+        entry = self.buckets[slot]
+        if entry is None:
+            return
+        self.buckets[slot] = None
+        bucket = entry[1]
+        for name in ('requests', 'errors', 'bytes'):
+            self.totals[name] -= bucket[name]
+        for name in ('ips', 'status_codes', 'suspicious_ips'):
+            totals = self.totals[name]
+            for key, count in bucket[name].items():
+                remaining = totals[key] - count
+                if remaining > 0:
+                    totals[key] = remaining
+                else:
+                    del totals[key]
+
+    def add(self, epoch, ip, status, size, suspicious):
+        """Zählt einen Eintrag (epoch = Zeitstempel der Log-Zeile)"""
+        # Zeilen aus der "Zukunft" (Uhrabweichung) zählen zum aktuellen Bucket
+        bucket_id = min(int(epoch // self.bucket_seconds), self.current)
+        if bucket_id <= self.current - self.size:
+            return
+        slot = bucket_id % self.size
+        entry = self.buckets[slot]
+        if entry is None or entry[0] != bucket_id:
+            self._expire(slot)
+            entry = self.buckets[slot] = (bucket_id, self._new_bucket())
+
+        for target in (entry[1], self.totals):
+            target['requests'] += 1
+            target['bytes'] += size
+            target['ips'][ip] += 1
+            target['status_codes'][status] += 1
+            if status >= 400:
+                target['errors'] += 1
+            if suspicious:
+                target['suspicious_ips'][ip] += 1
+
+    def rate(self, now):
+        """Requests pro Sekunde über das Fenster (bzw. die bisherige Laufzeit)"""
+        elapsed = min(self.span, max(1.0, now - self.started)) if self.started is not None else self.span
+        return self.totals['requests'] / elapsed
+
+class Blocklist:
+    """Persistente Blockliste aus verdächtigen (und optional Bot-)IPs
+
+    Der Zustand (JSON) hält je IP die Zählerstände und eine Ablaufzeit. Eine
+    IP wird für ttl Sekunden (erneut) gesperrt, wenn sie die Schwelle erreicht
+    und ihr Zähler seit dem letzten Lauf gewachsen ist - ein Cronjob mit
+    --inkrementell verlängert so nur die Sperren aktiver Scanner. Beim
+    Schreiben werden ab min_network gesperrten Adressen eines /24 (/48) das
+    ganze Netz gesperrt und benachbarte Netze zusammengefasst.
+    """
+
+    def __init__(self, path=BLOCKLIST_STATE, ignore=BLOCKLIST_IGNORE):
+        self.path = path
+        self.ignore = [ipaddress.ip_network(network, strict=False) for network in ignore]
+        self.state = self._load()
+
+    def _load(self):
+        """Lädt den Zustand (leer wenn nicht vorhanden oder veraltet)"""
+        empty = {'version': BLOCKLIST_VERSION, 'window_start': None, 'entries': {}}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return empty
+        except (OSError, ValueError) as e:
+            print(f"   {Colors.WARNING}⚠ Blocklisten-Zustand unlesbar, beginne neu: {e}{Colors.RESET}")
+            return empty
+        return state if state.get('version') == BLOCKLIST_VERSION else empty
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        _write_atomic(self.path, json.dumps(self.state, indent=1, sort_keys=True))
+
+    def _normalize(self, ip):
+        """Adresse als str (IPv4-mapped IPv6 als IPv4), None wenn ungültig oder ignoriert"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if any(address in network for network in self.ignore):
+            return None
+        return str(address)
+
+    def update(self, counters, window_start, ttl, now):
+        """Übernimmt {Grund: (Zähler IP -> Anzahl, Schwelle)}, gibt die Anzahl neuer/verlängerter Sperren zurück"""
+        entries = self.state['entries']
+        # Neues Zeitfenster (z.B. neuer Tag bei --zeit heute): Zähler beginnen bei 0
+        same_window = self.state['window_start'] == window_start
+        if not same_window:
+            # Alle Einträge zurücksetzen, nicht nur die erneut auffälligen - sonst
+            # würde später im Fenster gegen Zählerstände des alten verglichen
+            for entry in entries.values():
+                entry['counts'] = {}
+        blocked = 0
+        for reason, (counter, threshold) in counters.items():
+            if not threshold:
+                continue
+            for ip, count in counter.items():
+                if count < threshold:
+                    continue
+                ip = self._normalize(ip)
+                if ip is None:
+                    continue
+                entry = entries.get(ip)
+                previous = entry['counts'].get(reason, 0) if entry else 0
+                if count <= previous:
+                    continue
+                if entry is None:
+                    entry = entries[ip] = {'first_blocked': int(now), 'counts': {}}
+                entry['counts'][reason] = count
+                entry['expires'] = int(now + ttl)
+                blocked += 1
+
+        for ip in [ip for ip, entry in entries.items() if entry['expires'] <= now]:
+            del entries[ip]
+        self.state['window_start'] = window_start
+        return blocked
+
+    def networks(self, min_network, now):
+        """Aktive Sperren als sortierte Liste (Netz, Ablaufzeit), zu Präfixen zusammengefasst"""
+        groups = defaultdict(list)
+        for ip, entry in self.state['entries'].items():
+            if entry['expires'] > now:
+                address = ipaddress.ip_address(ip)
+                prefix = 24 if address.version == 4 else 48
+                groups[ipaddress.ip_network((address, prefix), strict=False)].append((address, entry['expires']))
+
+        blocked = []
+        for network, members in groups.items():
+            if min_network and len(members) >= min_network \
+                    and not any(network.overlaps(ignored) for ignored in self.ignore):
+                blocked.append((network, max(expires for _, expires in members)))
+            else:
+                blocked.extend((ipaddress.ip_network(address), expires) for address, expires in members)
+
+        # Benachbarte/enthaltene Netze zusammenlegen, Ablaufzeit = die späteste
+        result = []
+        for version in (4, 6):
+            originals = sorted((item for item in blocked if item[0].version == version), key=itemgetter(0))
+            position = 0
+            for network in ipaddress.collapse_addresses(network for network, _ in originals):
+                expires = 0
+                while position < len(originals) and originals[position][0].subnet_of(network):
+                    expires = max(expires, originals[position][1])
+                    position += 1
+                result.append((network, expires))
+        return result
+
+    @staticmethod
+    def render_nft(networks, now):
+        """nftables-Datei: eigene Tabelle mit Sets je IP-Version, Drop in input und forward
+
+        forward ist nötig, weil per DNAT weitergeleitete Verbindungen
+        (nftables-forwarding.sh) den input-Hook nie erreichen.
+        """
+        lines = [f"# nginx-log-analyzer Blockliste - generiert {datetime.fromtimestamp(now):%Y-%m-%d %H:%M:%S}",
+                 f"# {len(networks)} Einträge; einbinden per include in /etc/nftables.conf",
+                 "table inet nginx_blocklist",
+                 "delete table inet nginx_blocklist",
+                 "",
+                 "table inet nginx_blocklist {"]
+        for version, name, address_type in ((4, 'blocked_v4', 'ipv4_addr'), (6, 'blocked_v6', 'ipv6_addr')):
+            elements = [f"{network} timeout {max(1, int(expires - now))}s"
+                        for network, expires in networks if network.version == version]
+            lines += [f"    set {name} {{",
+                      f"        type {address_type}",
+                      "        flags interval, timeout"]
+            if elements:
+                lines.append("        elements = { " + ",\n                     ".join(elements) + " }")
+            lines += ["    }", ""]
+        for chain in ('input', 'forward'):
+            lines += [f"    chain {chain} {{",
+                      f"        type filter hook {chain} priority -10; policy accept;",
+                      "        ip saddr @blocked_v4 drop",
+                      "        ip6 saddr @blocked_v6 drop",
+                      "    }", ""]
+        lines[-1] = "}"
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_fail2ban(networks, now, jail='nginx-blocklist'):
+        """Eine Adresse/ein Netz pro Zeile, Ablaufzeit als Kommentar dahinter"""
+        lines = [f"# nginx-log-analyzer Blockliste - generiert {datetime.fromtimestamp(now):%Y-%m-%d %H:%M:%S}",
+                 f"# Einspielen: awk '!/^#/ {{print $1}}' DATEI | xargs -r -n1 fail2ban-client set {jail} banip"]
+        for network, expires in networks:
+            entry = str(network.network_address) if network.num_addresses == 1 else str(network)
+            lines.append(f"{entry:<24} # bis {datetime.fromtimestamp(expires):%Y-%m-%d %H:%M}")
+        return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    """Schreibt eine Textdatei atomar (erst temporäre Datei, dann umbenennen)"""
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
+class Profiler:
+    """Laufzeit-Profil einer Analyse (--profil)
+
+    Misst Wall- und CPU-Zeit je Stufe (Planung, Parsen, Bericht, Export),
+    Zeilen/s sowie erkannte und verworfene Zeilen je Log-Datei und den
+    Spitzen-Speicher. cProfile und tracemalloc bremsen merklich und laufen
+    nur, wenn eine Ausgabedatei dafür angegeben ist.
+    """
+
+    def __init__(self, cprofile_file=None, tracemalloc_file=None):
+        self.cprofile_file = cprofile_file
+        self.tracemalloc_file = tracemalloc_file
+        self.stages = {}   # Stufe -> {'wall': s, 'cpu': s}
+        self.files = []    # je Log-Datei: Zeilen, Treffer, Durchsatz
+        self.top_functions = []
+        self.top_allocations = []
+        self.tracemalloc_peak = None
+        self._cprofile = None
+        self._started = self._finished = None
+
+    def start(self):
+        """Startet die Gesamtmessung (und ggf. cProfile/tracemalloc)"""
+        if self.tracemalloc_file:
+            tracemalloc.start()
+        if self.cprofile_file:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started = (time.perf_counter(), time.process_time(), self._children_cpu())
+
+    def stop(self):
+        """Beendet die Messung und schreibt cProfile-/tracemalloc-Dateien"""
+        self._finished = (time.perf_counter(), time.process_time(), self._children_cpu())
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_file)
+            # (Datei, Zeile, Funktion) -> (primitive Aufrufe, Aufrufe, eigene Zeit, kumuliert, Aufrufer)
+            functions = pstats.Stats(self._cprofile).stats.items()
+            self.top_functions = [
+                {'function': f"{os.path.basename(filename)}:{line}({name})", 'calls': calls,
+                 'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)}
+                for (filename, line, name), (_, calls, own, cumulative, _) in
+                heapq.nlargest(PROFILE_TOP_FUNCTIONS, functions, key=lambda item: item[1][2])]
+            self._cprofile = None
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            self.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            snapshot.dump(self.tracemalloc_file)
+            self.top_allocations = [
+                {'line': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 'bytes': stat.size, 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Misst einen Abschnitt; wiederholte Stufen werden aufsummiert"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            stage['wall'] += time.perf_counter() - wall
+            stage['cpu'] += time.process_time() - cpu
+
+    def add_file(self, log_file, seconds, size, lines, matched, entries):
+        """Ergebnis einer Log-Datei; lines/matched sind None wenn unbekannt (Index)"""
+        self.files.append({
+            'log_file': log_file,
+            'seconds': seconds,
+            'bytes': size,
+            'lines': lines,
+            'matched': matched,
+            'rejected': None if lines is None or matched is None else lines - matched,
+            'entries': entries,
+            'lines_per_second': lines / seconds if lines and seconds > 0 else None,
+        })
+
+    @staticmethod
+    def _children_cpu():
+        """CPU-Zeit beendeter Kindprozesse (Worker) in Sekunden"""
+        times = os.times()
+        return times.children_user + times.children_system
+
+    @staticmethod
+    def _peak_rss(who):
+        """Spitzen-Speicher (maxrss) in Bytes, None wenn unbekannt"""
+        if resource is None:
+            return None
+        peak = resource.getrusage(who).ru_maxrss
+        # Linux liefert KB, macOS Bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def summary(self, **context):
+        """Profil als dict (eine NDJSON-Zeile für Trendauswertungen)"""
+        finished = self._finished or (time.perf_counter(), time.process_time(), self._children_cpu())
+        started = self._started or finished
+        lines = [entry['lines'] for entry in self.files if entry['lines'] is not None]
+        matched = [entry['matched'] for entry in self.files if entry['matched'] is not None]
+        return {
+            'type': 'profile',
+            'timestamp': datetime.now(timezone.utc).astimezone().isoformat(timespec='seconds'),
+            **context,
+            'wall_seconds': finished[0] - started[0],
+            'cpu_seconds': finished[1] - started[1],
+            'worker_cpu_seconds': finished[2] - started[2],
+            'stages': {name: dict(stage) for name, stage in self.stages.items()},
+            'files': self.files,
+            'lines': sum(lines) if lines else None,
+            'matched': sum(matched) if matched else None,
+            'rejected': sum(lines) - sum(matched) if lines and matched else None,
+            'peak_rss_bytes': self._peak_rss(resource.RUSAGE_SELF) if resource else None,
+            'peak_rss_worker_bytes': self._peak_rss(resource.RUSAGE_CHILDREN) if resource else None,
+            'tracemalloc_peak_bytes': self.tracemalloc_peak,
+            'top_functions': self.top_functions,
+            'top_allocations': self.top_allocations,
+        }
+
+    def export_json(self, filename, summary):
+        """Hängt das Profil als eine JSON-Zeile an filename an"""
+        with open(filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+    def print_summary(self, summary):
+        """Gibt das Profil als Tabelle aus"""
+        def seconds(value):
+            return f"{value:.3f} s" if value is not None else "–"
+
+        def number(value):
+            return f"{value:,}" if value is not None else "–"
+
+        def megabytes(value):
+            return f"{value / 1024 / 1024:.1f} MB" if value is not None else "–"
+
+        print(f"\n{Colors.HEADER}⏱ PROFIL:{Colors.RESET}")
+        print(f"   {Colors.BOLD}{'Stufe':<22} {'Wall':>12} {'CPU':>12}{Colors.RESET}")
+        for name, stage in summary['stages'].items():
+            print(f"   {Colors.CYAN}{name:<22}{Colors.RESET} {seconds(stage['wall']):>12} {seconds(stage['cpu']):>12}")
+        print(f"   {Colors.BOLD}{'gesamt':<22} {seconds(summary['wall_seconds']):>12} "
+              f"{seconds(summary['cpu_seconds']):>12}{Colors.RESET}"
+              + (f" {Colors.GRAY}+ {seconds(summary['worker_cpu_seconds'])} in Workern{Colors.RESET}"
+                 if summary['worker_cpu_seconds'] > 0 else ""))
+
+        if summary['files']:
+            print(f"\n   {Colors.BOLD}{'Log-Datei':<22} {'Zeilen':>12} {'erkannt':>12} {'verworfen':>10} "
+                  f"{'im Zeitraum':>12} {'Zeilen/s':>12} {'MB/s':>8}{Colors.RESET}")
+            for entry in summary['files']:
+                rate = entry['lines_per_second']
+                throughput = entry['bytes'] / 1024 / 1024 / entry['seconds'] if entry['seconds'] > 0 else None
+                rejected_color = Colors.WARNING if entry['rejected'] else Colors.RESET
+                print(f"   {Colors.CYAN}{os.path.basename(entry['log_file'])[:22]:<22}{Colors.RESET} "
+                      f"{number(entry['lines']):>12} {number(entry['matched']):>12} "
+                      f"{rejected_color}{number(entry['rejected']):>10}{Colors.RESET} "
+                      f"{number(entry['entries']):>12} {f'{rate:,.0f}' if rate else '–':>12} "
+                      f"{f'{throughput:.1f}' if throughput is not None else '–':>8}")
+            if summary['rejected']:
+                print(f"   {Colors.WARNING}⚠ {summary['rejected']:,} Zeile(n) passen nicht zum log_format "
+                      f"und wurden verworfen{Colors.RESET}")
+
+        print(f"\n   Spitzen-Speicher: {Colors.BOLD}{megabytes(summary['peak_rss_bytes'])}{Colors.RESET}"
+              + (f" {Colors.GRAY}(Worker: {megabytes(summary['peak_rss_worker_bytes'])}){Colors.RESET}"
+                 if summary['peak_rss_worker_bytes'] else ""))
+
+        if summary['top_functions']:
+            print(f"\n   {Colors.INFO}cProfile → {self.cprofile_file} (Hauptprozess, nach eigener Zeit):{Colors.RESET}")
+            for function in summary['top_functions']:
+                print(f"   {seconds(function['own_seconds']):>10} {Colors.GRAY}{function['calls']:>10,}x{Colors.RESET} "
+                      f"{function['function']}")
+
+        if summary['top_allocations']:
+            print(f"\n   {Colors.INFO}tracemalloc → {self.tracemalloc_file} "
+                  f"(Spitze: {megabytes(summary['tracemalloc_peak_bytes'])}):{Colors.RESET}")
+            for allocation in summary['top_allocations']:
+                print(f"   {megabytes(allocation['bytes']):>10} {Colors.GRAY}{allocation['blocks']:>10,} Blöcke{Colors.RESET} "
+                      f"{allocation['line']}")
+
+class NginxLogAnalyzer:
+    def __init__(self, log_files, time_filter='gesamter_zeitraum', jobs=1, state_dir=None,
+                 cache_dir=None, cache_size=CACHE_MAX_SIZE, time_range=None, rules=None, include_rotated=True, engine=DEFAULT_ENGINE, index_dir=None,
+                 sketch=None, log_formats=None, enricher=None, profiler=None, count_lines=False):
+        self.log_files = log_files if isinstance(log_files, list) else [log_files]
+        self.time_filter = time_filter
+        self.jobs = max(1, jobs or 1)
+        # Inkrementelle Analyse: nur aktiv wenn ein Zustandsverzeichnis gesetzt ist
+        self.state_dir = state_dir
+        # Ergebnis-Cache: unveränderte Dateien nicht erneut parsen (nicht mit Zustand/Index)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        # Rotierte/komprimierte Vorgänger (access.log.1, .2.gz, ...) mit einlesen
+        self.include_rotated = include_rotated
+        # Parser: 'numpy' (Standard mit numpy; wie bytes, Zeit/Status als Arrays je
+        # Block), 'bytes' (mmap + bytes-Regex) oder 'text' (zeilenweise str)
+        self.engine = engine
+        # Spaltenindex: Logs einmal in numpy-Spalten überführen, danach nur noch abfragen
+        self.index_dir = index_dir
+        # Näherungsmodus: HyperLogLog/Space-Saving statt exakter Sets/Counter
+        self.sketch = sketch
+        self.stats = _new_stats(sketch)
+
+        # Zeitfilter berechnen (Worker übernehmen den Bereich des Hauptprozesses)
+        self.time_range = time_range or self._calculate_time_range()
+        self.epoch_range = tuple(t.timestamp() if t else None for t in self.time_range)
+        self.timestamps = TimestampDecoder()
+
+        # log_format je Log-Datei (Standard: combined). log_pattern ist die
+        # Regex der Text-Engine, log_pattern_bytes die der Bytes-Engine (läuft
+        # über ganze Puffer, daher mehrzeilig verankert) - jeweils für das
+        # Standardformat, dateibezogen über _log_format(path).
+        self.log_formats = log_formats or {}
+        # IP-Anreicherung (Netz/ASN/Land) - nur für den Bericht, nicht in den Workern
+        self.enricher = enricher
+        # Laufzeit-Profil (--profil) - nur im Hauptprozess
+        self.profiler = profiler
+        # Gelesene und vom log_format erkannte Zeilen des zuletzt geparsten Bereichs;
+        # die Bytes-Engine zählt gelesene Zeilen nur fürs Profil (auch in Workern)
+        self.count_lines = count_lines or profiler is not None
+        self.line_counts = Counter()
+        self.log_format = compile_log_format(DEFAULT_LOG_FORMAT)
+        self.log_pattern = self.log_format.pattern
+        self.log_pattern_bytes = self.log_format.pattern_bytes
+
+        # Bot- und Angriffserkennung (kombinierte Regex + LRU-Cache)
+        self.rules = rules or {}
+        self.bot_classifier = PatternClassifier(
+            self.rules.get('bot_patterns', DEFAULT_BOT_PATTERNS), lowercase=True)
+        self.suspicious_classifier = PatternClassifier(
+            self.rules.get('suspicious_patterns', DEFAULT_SUSPICIOUS_PATTERNS))
+
+    def _log_format(self, path):
+        """Kompiliertes log_format einer Datei (rotierte Geschwister erben es)"""
+        log_format = self.log_formats.get(path)
+        if log_format is None:
+            for log_file, candidate in self.log_formats.items():
+                if path.startswith(log_file) and ROTATED_SUFFIX.match(path[len(log_file):]):
+                    log_format = candidate
+                    break
+        return compile_log_format(log_format or DEFAULT_LOG_FORMAT)
 
     def _calculate_time_range(self):
         """Berechnet den Zeitbereich basierend auf dem Filter"""
@@ -120,17 +1773,18 @@ class NginxLogAnalyzer:
 
         return (start_time, end_time)
 
-    def _is_in_time_range(self, entry_time):
-        """Prüft ob ein Log-Eintrag im gewählten Zeitbereich liegt"""
-        if self.time_range[0] is None:  # gesamter_zeitraum
+    def _is_in_time_range(self, timestamp):
+        """Prüft ob ein (dekodierter) Log-Zeitstempel im gewählten Zeitbereich liegt"""
+        if self.epoch_range[0] is None:  # gesamter_zeitraum
             return True
 
-        try:
-            # Format: 10/Oct/2000:13:55:36 +0000
-            dt = datetime.strptime(entry_time.split()[0], '%d/%b/%Y:%H:%M:%S')
-            return self.time_range[0] <= dt <= self.time_range[1]
-        except ValueError:
+        if timestamp is None:
             return False
+        return self.epoch_range[0] <= timestamp[0] <= self.epoch_range[1]
+
+    def _stage(self, name):
+        """Profil-Stufe (ohne --profil ein leerer Kontext)"""
+        return self.profiler.stage(name) if self.profiler else contextlib.nullcontext()
 
     def parse_log_files(self):
         """Parse alle angegebenen Log-Dateien"""
@@ -139,39 +1793,1099 @@ class NginxLogAnalyzer:
 
         total_processed = 0
 
-        for log_file in self.log_files:
-            if not os.path.exists(log_file):
-                print(f"{Colors.ERROR}❌ Datei nicht gefunden: {log_file}{Colors.RESET}")
-                continue
+        # Arbeitsplan: je Log-Datei die zu lesenden Dateien (rotierte zuerst)
+        # mit ihren Byte-Bereichen
+        plan = []
+        with self._stage('planung'):
+            for log_file in self.log_files:
+                if not os.path.exists(log_file):
+                    print(f"{Colors.ERROR}❌ Datei nicht gefunden: {log_file}{Colors.RESET}")
+                    continue
+                try:
+                    plan.append(self._plan_log_file(log_file))
+                except OSError as e:
+                    print(f"{Colors.ERROR}❌ Fehler beim Lesen von {log_file}: {e}{Colors.RESET}")
+
+        tasks = [(segment['path'], os.path.basename(item['log_file']), start, end)
+                 for item in plan for segment in item['segments'] for start, end in segment['ranges']]
+        results = self._iter_chunk_results(tasks)
+
+        with self._stage('parsen'):
+            for item in plan:
+                total_processed += self._collect_log_file(item, results)
+            if self.cache_dir:
+                self._prune_cache()
 
-            print(f"\n{Colors.INFO}📁 Analysiere: {Colors.RESET}{Colors.BOLD}{log_file}{Colors.RESET}")
-            file_entries = 0
+        print(f"\n{Colors.SUCCESS}✅ Gesamt verarbeitet: {total_processed:,} Log-Einträge{Colors.RESET}")
+        return total_processed > 0
 
-            try:
-                with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line_num, line in enumerate(f, 1):
-                        match = self.log_pattern.match(line.strip())
-                        if match:
-                            entry = match.groupdict()
-                            entry['source_file'] = os.path.basename(log_file)
-
-                            # Zeitfilter anwenden
-                            if self._is_in_time_range(entry['time']):
-                                self.entries.append(entry)
-                                self._update_stats(entry)
-                                file_entries += 1
-
-                total_processed += file_entries
-                print(f"   {Colors.SUCCESS}✓ {file_entries:,} Einträge (im Zeitraum) verarbeitet{Colors.RESET}")
-
-            except Exception as e:
-                print(f"   {Colors.ERROR}❌ Fehler beim Lesen: {e}{Colors.RESET}")
+    def _collect_log_file(self, item, results):
+        """Übernimmt die Bereichs-Ergebnisse einer geplanten Log-Datei, gibt die Einträge zurück"""
+        started = time.perf_counter()
+        line_counts = Counter()
+        log_file = item['log_file']
+        print(f"\n{Colors.INFO}📁 Analysiere: {Colors.RESET}{Colors.BOLD}{log_file}{Colors.RESET}")
+        if item['skipped']:
+            print(f"   {Colors.GRAY}⏭ {item['skipped']} rotierte Datei(en) vor dem Zeitfenster übersprungen{Colors.RESET}")
+
+        log_entries = 0
+        log_new_entries = 0
+        for segment in item['segments']:
+            if segment['note']:
+                print(f"   {Colors.GRAY}{segment['note']}{Colors.RESET}")
+            # Inkrementell/Cache: neue Teil-Statistiken erst in den Datei-Snapshot
+            if segment['state']:
+                file_stats = segment['state']['stats']
+            elif segment['cache']:
+                file_stats = segment['cache']['stats']
+            else:
+                file_stats = self.stats
+            file_entries = 0
+            error = None
+
+            for _ in segment['ranges']:
+                count, partial_stats, chunk_error, chunk_lines = next(results)
+                line_counts.update(chunk_lines)
+                if chunk_error is not None:
+                    error = error or chunk_error
+                    continue
+                if partial_stats is not None:
+                    merge_stats(file_stats, partial_stats)
+                    self._prune_path_latency(file_stats)
+                file_entries += count
+
+            if error is not None:
+                print(f"   {Colors.ERROR}❌ Fehler beim Lesen von {os.path.basename(segment['path'])}: {error}{Colors.RESET}")
                 continue
 
-        print(f"\n{Colors.SUCCESS}✅ Gesamt verarbeitet: {total_processed:,} Log-Einträge{Colors.RESET}")
-        return total_processed > 0
+            log_new_entries += file_entries
+            if segment['state']:
+                self._save_state(segment['path'], segment['state'])
+                merge_stats(self.stats, file_stats)
+                file_entries = file_stats['total_requests']
+            elif segment['cache']:
+                if not segment['cache']['hit']:
+                    self._save_cache(segment['cache'])
+                if self.stats['total_requests']:
+                    merge_stats(self.stats, file_stats)
+                else:
+                    # Noch leer: Datei-Statistik übernehmen statt sie hineinzukopieren
+                    self.stats = file_stats
+                file_entries = file_stats['total_requests']
+            log_entries += file_entries
+
+            if segment['path'] != log_file:
+                print(f"   {Colors.GRAY}+ {os.path.basename(segment['path'])}: {file_entries:,} Einträge{Colors.RESET}")
+
+        if self.state_dir:
+            print(f"   {Colors.SUCCESS}✓ {log_entries:,} Einträge (im Zeitraum) verarbeitet, davon {log_new_entries:,} neu{Colors.RESET}")
+        else:
+            print(f"   {Colors.SUCCESS}✓ {log_entries:,} Einträge (im Zeitraum) verarbeitet{Colors.RESET}")
+
+        if self.profiler:
+            # Mit --prozesse laufen die Worker voraus, gemessen wird die Zeit bis
+            # alle Bereiche der Datei übernommen sind
+            size = sum(os.path.getsize(segment['path']) if end is None else end - start
+                       for segment in item['segments'] for start, end in segment['ranges'])
+            self.profiler.add_file(log_file, time.perf_counter() - started, size,
+                                   line_counts.get('lines'), line_counts.get('matched'), log_new_entries)
+        return log_entries
+
+    def _plan_log_file(self, log_file):
+        """Plant eine Log-Datei inkl. rotierter Vorgänger (.1, .2.gz, ...)"""
+        segments = []
+        skipped = 0
+
+        if self.include_rotated:
+            for path in find_rotated_logs(log_file):
+                if self._outside_window(path):
+                    skipped += 1
+                    continue
+                segments.append(self._plan_segment(path))
+
+        segments.append(self._plan_segment(log_file))
+        return {'log_file': log_file, 'segments': segments, 'skipped': skipped}
+
+    def _outside_window(self, path):
+        """True wenn ein rotiertes Archiv sicher keine Einträge im Zeitfenster enthält
+
+        Die mtime allein genügt nicht (kopierte oder zurückgespielte Archive):
+        wie bei _seek_time werden die Zeitstempel am Anfang und - bei
+        unkomprimierten Archiven - am Ende gelesen. Komprimierte lassen sich
+        nicht von hinten lesen, dort gilt für das Ende weiter die mtime, sofern
+        sie nicht vor der ersten Zeile liegt.
+        """
+        start, end = self.epoch_range
+        if start is None and end is None:
+            return False
+        pattern = self._log_format(path).pattern
+        try:
+            with open_log(path) as f:
+                first = self._read_timestamp(f, math.inf, pattern)
+                if first is None or start is None or first >= start:
+                    last = None
+                elif is_compressed(path):
+                    mtime = os.path.getmtime(path)
+                    last = mtime if mtime >= first else None
+                else:
+                    last = self._tail_timestamp(f, pattern)
+        except (OSError, EOFError, lzma.LZMAError):
+            # Unlesbar: einplanen, der Fehler wird beim Parsen gemeldet
+            return False
+        if first is None:
+            # Kein Zeitstempel am Anfang - wie bisher nur nach der mtime urteilen
+            return start is not None and os.path.getmtime(path) < start
+        # Beginnt erst nach dem Fenster, oder endet schon vor dessen Beginn
+        return (end is not None and first > end) or (last is not None and last < start)
+
+    def _tail_timestamp(self, f, pattern):
+        """Spätester Zeitstempel im letzten SEEK_BLOCK_SIZE-Block der Datei, sonst None"""
+        size = f.seek(0, os.SEEK_END)
+        f.seek(self._next_line_start(f, max(0, size - SEEK_BLOCK_SIZE)))
+        latest = None
+        for raw_line in f:
+            match = pattern.match(raw_line.decode('utf-8', errors='ignore').strip())
+            timestamp = match and self.timestamps.decode(match.group('time'))
+            if timestamp and (latest is None or timestamp[0] > latest):
+                latest = timestamp[0]
+        return latest
+
+    def _plan_segment(self, path):
+        """Bestimmt die zu parsenden Byte-Bereiche einer Datei (inkl. Zustand)
+
+        Komprimierte Dateien lassen sich weder aufteilen noch durchsuchen und
+        werden als Ganzes (Bereich (0, None)) von einem Worker gelesen.
+        """
+        if self.index_dir:
+            # Index wird im Worker aktualisiert und abgefragt - immer die ganze Datei
+            return {'path': path, 'ranges': [(0, None)], 'state': None, 'cache': None, 'note': None}
+
+        compressed = is_compressed(path)
+        if not self.state_dir:
+            cache = self._load_cache(path) if self.cache_dir else None
+            if cache and cache['hit']:
+                return {'path': path, 'ranges': [], 'state': None, 'cache': cache,
+                        'note': "⚡ Unverändert - Statistik aus dem Cache"}
+            if compressed:
+                return {'path': path, 'ranges': [(0, None)], 'state': None, 'cache': cache, 'note': None}
+            # Nur bis zur beim Planen gemessenen Größe lesen, damit die
+            # Statistik zum Cache-Schlüssel passt, auch wenn nginx weiterschreibt
+            size = cache['size'] if cache else os.path.getsize(path)
+            start = self._seek_time(path, size)
+            note = f"⏩ Zeitfenster beginnt bei Byte {start:,} von {size:,}" if start else None
+            return {'path': path, 'ranges': self._split_log_file(path, start, size),
+                    'state': None, 'cache': cache, 'note': note}
+
+        file_stat = os.stat(path)
+        if compressed:
+            end = file_stat.st_size
+        else:
+            # Nur vollständige Zeilen übernehmen, nginx schreibt evtl. gerade noch
+            end = self._last_line_end(path, file_stat.st_size)
+        state = self._load_state(path)
+        note = None
+
+        if state is None:
+            note = "↻ Kein gespeicherter Zustand - vollständige Analyse"
+        elif (state['inode'], state['device']) != (file_stat.st_ino, file_stat.st_dev):
+            note = "↻ Log wurde rotiert (neue Inode) - Analyse beginnt von vorne"
+            state = None
+        elif state['offset'] > file_stat.st_size or (compressed and state['offset'] != end):
+            note = "↻ Log wurde gekürzt oder ersetzt - Analyse beginnt von vorne"
+            state = None
+        elif state['window_start'] != self.time_range[0]:
+            note = "↻ Zeitfenster hat sich geändert - Analyse beginnt von vorne"
+            state = None
+        elif state.get('rules') != self.rules:
+            note = "↻ Klassifizierungsregeln haben sich geändert - Analyse beginnt von vorne"
+            state = None
+        elif state.get('sketch') != self.sketch:
+            note = "↻ Näherungsmodus hat sich geändert - Analyse beginnt von vorne"
+            state = None
+        elif state.get('log_format', self.log_format.log_format) != self._log_format(path).log_format:
+            note = "↻ log_format hat sich geändert - Analyse beginnt von vorne"
+            state = None
+
+        if state is None:
+            start = 0 if compressed else self._seek_time(path, end)
+            state = {'version': STATE_VERSION, 'offset': start, 'stats': _new_stats(self.sketch)}
+        elif end > state['offset']:
+            note = f"↻ Inkrementell ab Byte {state['offset']:,} ({end - state['offset']:,} neue Bytes)"
+        else:
+            note = "↻ Keine neuen Einträge seit der letzten Analyse"
 
-    def _update_stats(self, entry):
+        if compressed:
+            ranges = [(0, None)] if state['offset'] != end else []
+        else:
+            ranges = self._split_log_file(path, state['offset'], end)
+        state.update({
+            'inode': file_stat.st_ino,
+            'device': file_stat.st_dev,
+            'offset': end,
+            'window_start': self.time_range[0],
+            'rules': self.rules,
+            'sketch': self.sketch,
+            'log_format': self._log_format(path).log_format,
+        })
+        return {'path': path, 'ranges': ranges, 'state': state, 'cache': None, 'note': note}
+
+    def _state_path(self, log_file):
+        """Pfad der Zustandsdatei für Log-Datei und Zeitfilter"""
+        name = os.path.abspath(log_file).strip(os.sep).replace(os.sep, '_')
+        return os.path.join(self.state_dir, f"{name}.{self.time_filter}.state")
+
+    def _load_state(self, log_file):
+        """Lädt den gespeicherten Zustand einer Log-Datei (None wenn unbrauchbar)"""
+        try:
+            with open(self._state_path(log_file), 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"   {Colors.WARNING}⚠ Zustandsdatei unlesbar, wird ignoriert: {e}{Colors.RESET}")
+            return None
+        return state if state.get('version') == STATE_VERSION else None
+
+    def _save_state(self, log_file, state):
+        """Speichert den Zustand atomar (erst temporäre Datei, dann umbenennen)"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._state_path(log_file)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def _cache_key(self, path, file_stat):
+        """Alles, wovon die Statistik einer Datei abhängt (Inhalt über Inode/Größe/mtime)"""
+        # Relative Zeitfilter enden "jetzt" - eine unveränderte Datei enthält
+        # keine neueren Einträge, entscheidend ist nur der Fensterbeginn
+        return (os.path.abspath(path), file_stat.st_ino, file_stat.st_dev, file_stat.st_size,
+                file_stat.st_mtime_ns, self.time_range[0], self.rules, self.sketch,
+                self._log_format(path).log_format, CACHE_VERSION)
+
+    def _load_cache(self, path):
+        """Cache-Eintrag einer Datei: gespeicherte Statistik (hit) oder leere zum Befüllen"""
+        file_stat = os.stat(path)
+        key = self._cache_key(path, file_stat)
+        cache_file = os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.cache')
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.loads(gzip.decompress(f.read()))
+            if cached.get('key') == key:
+                # LRU: mtime markiert die letzte Benutzung
+                os.utime(cache_file)
+                return {'file': cache_file, 'key': key, 'size': file_stat.st_size,
+                        'stats': cached['stats'], 'hit': True}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"   {Colors.WARNING}⚠ Cache-Eintrag unlesbar, wird ignoriert: {e}{Colors.RESET}")
+        return {'file': cache_file, 'key': key, 'size': file_stat.st_size,
+                'stats': _new_stats(self.sketch), 'hit': False}
+
+    def _save_cache(self, cache):
+        """Speichert einen Cache-Eintrag atomar (erst temporäre Datei, dann umbenennen)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data = pickle.dumps({'key': cache['key'], 'stats': cache['stats']}, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(cache['file'] + '.tmp', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=1))
+            os.replace(cache['file'] + '.tmp', cache['file'])
+        except OSError as e:
+            print(f"   {Colors.WARNING}⚠ Cache-Eintrag konnte nicht geschrieben werden: {e}{Colors.RESET}")
+
+    def _prune_cache(self):
+        """Löscht die am längsten unbenutzten Cache-Einträge oberhalb von cache_size"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir)
+                       if entry.is_file() and entry.name.endswith('.cache')]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        total = 0
+        for entry in entries:
+            total += entry.stat().st_size
+            if total > self.cache_size:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
+
+    def _last_line_end(self, log_file, size):
+        """Byte-Position direkt nach dem letzten Zeilenumbruch"""
+        block_size = 64 * 1024
+        with open(log_file, 'rb') as f:
+            position = size
+            while position > 0:
+                read_from = max(0, position - block_size)
+                f.seek(read_from)
+                block = f.read(position - read_from)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    return read_from + newline + 1
+                position = read_from
+        return 0
+
+    def _seek_time(self, log_file, end):
+        """Binärsuche nach dem Byte-Offset, ab dem das Zeitfenster beginnt
+
+        Access-Logs werden in Zeitreihenfolge geschrieben. Geprüft wird jeweils
+        der Zeitstempel der ersten Zeile ab der Probe-Position; das Ergebnis
+        liegt immer auf einem Zeilenanfang vor der ersten Zeile im Fenster.
+        """
+        target = self.epoch_range[0]
+        if target is None or end <= SEEK_BLOCK_SIZE:
+            return 0
+
+        low, high = 0, end
+        pattern = self._log_format(log_file).pattern
+        with open(log_file, 'rb') as f:
+            while high - low > SEEK_BLOCK_SIZE:
+                middle = (low + high) // 2
+                timestamp = self._probe_timestamp(f, middle, end, pattern)
+                if timestamp is None or timestamp >= target:
+                    high = middle
+                else:
+                    low = middle
+
+            if low == 0:
+                return 0
+            return self._next_line_start(f, max(0, low - SEEK_SLACK))
+
+    def _probe_timestamp(self, f, offset, end, pattern):
+        """Zeitstempel (epoch) der ersten gültigen Zeile ab offset, sonst None"""
+        f.seek(self._next_line_start(f, offset))
+        return self._read_timestamp(f, end, pattern)
+
+    def _read_timestamp(self, f, end, pattern):
+        """Zeitstempel (epoch) der ersten gültigen Zeile ab der aktuellen Position, sonst None"""
+        for _ in range(SEEK_PROBE_LINES):
+            raw_line = f.readline()
+            if not raw_line or f.tell() > end:
+                return None
+            match = pattern.match(raw_line.decode('utf-8', errors='ignore').strip())
+            if match:
+                timestamp = self.timestamps.decode(match.group('time'))
+                if timestamp is not None:
+                    return timestamp[0]
+        return None
+
+    def _next_line_start(self, f, offset):
+        """Erster Zeilenanfang bei oder nach offset"""
+        if offset == 0:
+            return 0
+        f.seek(offset - 1)
+        f.readline()
+        return f.tell()
+
+    def _split_log_file(self, log_file, start=0, end=None):
+        """Teilt eine Datei in an Zeilengrenzen ausgerichtete Byte-Bereiche"""
+        size = os.path.getsize(log_file) if end is None else end
+        if self.jobs == 1 or size - start <= PARALLEL_CHUNK_SIZE:
+            return [(start, size)]
+
+        boundaries = [start]
+        with open(log_file, 'rb') as f:
+            for offset in range(start + PARALLEL_CHUNK_SIZE, size, PARALLEL_CHUNK_SIZE):
+                if offset <= boundaries[-1]:
+                    continue
+                # Bis zum nächsten Zeilenanfang vorspulen
+                position = self._next_line_start(f, offset)
+                if position < size:
+                    boundaries.append(position)
+        boundaries.append(size)
+        return list(zip(boundaries, boundaries[1:]))
+
+    def _iter_chunk_results(self, tasks):
+        """Liefert (Einträge, Teil-Statistik, Fehler, Zeilenzähler) je Byte-Bereich in Aufgabenreihenfolge"""
+        options = self._worker_options()
+        worker_tasks = [(options,) + task for task in tasks]
+        if self.jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(tasks))) as pool:
+                yield from pool.map(_parse_chunk, worker_tasks)
+        elif self.state_dir or self.cache_dir:
+            # Inkrementell/Cache: Teil-Statistiken werden pro Datei gebraucht
+            for worker_task in worker_tasks:
+                yield _parse_chunk(worker_task)
+        else:
+            # Ein Prozess: direkt in self.stats aggregieren
+            for path, source_file, start, end in tasks:
+                try:
+                    yield self._parse_range(path, source_file, start, end), None, None, self.line_counts
+                except Exception as e:
+                    yield 0, None, e, self.line_counts
+
+    def _worker_options(self):
+        """Konstruktor-Argumente, mit denen Worker einen gleichwertigen Analyzer bauen"""
+        # Zeitbereich vom Hauptprozess übernehmen, damit alle Worker dasselbe "jetzt" nutzen
+        return {'time_filter': self.time_filter, 'time_range': self.time_range, 'rules': self.rules,
+                'engine': self.engine, 'index_dir': self.index_dir, 'sketch': self.sketch,
+                'log_formats': self.log_formats, 'count_lines': self.count_lines}
+
+    def _parse_range(self, path, source_file, start, end):
+        """Parst alle Zeilen, die im Byte-Bereich [start, end) beginnen
+
+        end=None liest bis zum Dateiende (komprimierte Dateien werden immer
+        vollständig und ohne Entpacken auf Platte gestreamt). Gelesene und
+        erkannte Zeilen landen in self.line_counts (nicht beim Index; gelesene
+        zählt die Bytes-Engine nur mit count_lines).
+        """
+        self.line_counts = Counter()
+        if self.index_dir:
+            return self._parse_range_index(path, source_file)
+        if self.engine in ('bytes', 'numpy'):
+            return self._parse_range_bytes(path, source_file, start, end)
+        return self._parse_range_text(path, source_file, start, end)
+
+    def _parse_range_text(self, path, source_file, start, end):
+        """Text-Engine: jede Zeile dekodieren und als str parsen (Referenz)"""
+        file_entries = 0
+        lines = matched = 0
+        match_line = self._log_format(path).pattern.match
+
+        with open_log(path) as f:
+            if start:
+                f.seek(start)
+            position = start
+            # Näherungsmodus: Pfad-Latenzen wie in der Bytes-Engine einmal je Block
+            # kürzen - je Zeile wäre das O(Sketch-Größe)
+            next_prune = position + BYTES_BLOCK_SIZE
+            for raw_line in f:
+                if end is not None and position >= end:
+                    break
+                position += len(raw_line)
+                lines += 1
+                if position >= next_prune:
+                    self._prune_path_latency(self.stats)
+                    next_prune = position + BYTES_BLOCK_SIZE
+
+                match = match_line(raw_line.decode('utf-8', errors='ignore').strip())
+                if match:
+                    matched += 1
+                    entry = match.groupdict()
+                    entry['source_file'] = source_file
+
+                    # Zeitstempel nur einmal dekodieren, dann Zeitfilter anwenden -
+                    # Einträge werden nicht gespeichert, sondern direkt aggregiert
+                    timestamp = self.timestamps.decode(entry['time'])
+                    if self._is_in_time_range(timestamp):
+                        self._update_stats(entry, timestamp)
+                        file_entries += 1
+
+        self._prune_path_latency(self.stats)
+        self.line_counts.update(lines=lines, matched=matched)
+        return file_entries
+
+    def _iter_buffers(self, path, start, end):
+        """Liefert (Puffer, pos, endpos) für die Bytes-Engine
+
+        Unkomprimierte Dateien werden per mmap eingeblendet (keine Kopie),
+        komprimierte blockweise entpackt und an Zeilengrenzen geschnitten.
+        """
+        if not is_compressed(path):
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                end = size if end is None else min(end, size)
+                if start >= end:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    position = start
+                    while position < end:
+                        cut = buffer.find(b'\n', min(position + BYTES_BLOCK_SIZE, end) - 1, end)
+                        cut = end if cut == -1 else cut + 1
+                        yield buffer, position, cut
+                        position = cut
+            return
+
+        with open_log(path) as f:
+            rest = b''
+            while True:
+                block = f.read(BYTES_BLOCK_SIZE)
+                if not block:
+                    if rest:
+                        yield rest, 0, len(rest)
+                    return
+                data = rest + block
+                cut = data.rfind(b'\n') + 1
+                if cut:
+                    yield data, 0, cut
+                rest = data[cut:]
+
+    def _parse_range_bytes(self, path, source_file, start, end):
+        """Bytes-Engine: Regex direkt über den Puffer, Auswertung spaltenweise je Block
+
+        findall liefert pro Block die Felder als Byte-Tupel. Statt jede Zeile
+        in Python anzufassen, werden die Spalten mit zip/Counter/compress (C)
+        gezählt; dekodiert und klassifiziert wird nur einmal pro eindeutigem Wert.
+        """
+        findall = self._log_format(path).findall
+        counters = {name: Counter() for name in
+                    ('top_ips', 'methods', 'top_pages', 'user_agents', 'status_codes',
+                     'minutes', 'hourly_traffic', 'daily_traffic', 'bot_requests', 'suspicious_ips',
+                     'path_latency', 'upstream_latency')}
+        # Caches je Byte-Wert (Minute, Zeitfenster, Status, Klassifizierung)
+        caches = {'minutes': {}, 'window': {}, 'status': {}, 'bot': {}, 'suspicious': {}}
+        errors = deque(maxlen=ERROR_BUFFER_SIZE)
+        totals = {'error_count': 0, 'bytes_transferred': 0, 'total_requests': 0}
+
+        count_rows = self._count_rows_numpy if self.engine == 'numpy' else self._count_rows
+
+        file_entries = 0
+        lines = matched = 0
+        for buffer, position, endpos in self._iter_buffers(path, start, end):
+            rows = findall(buffer, position, endpos)
+            if self.count_lines:
+                # Zeilen ohne Treffer verwirft findall stillschweigend - für das
+                # Profil mitzählen (mmap kennt kein count, der Slice kopiert den Block)
+                lines += buffer[position:endpos].count(b'\n') + (buffer[endpos - 1] != 10)
+            matched += len(rows)
+            if rows:
+                count_rows(rows, counters, caches, errors, totals)
+                if self.sketch:
+                    # Näherungsmodus: Block sofort in die Sketches übernehmen, damit
+                    # die exakten Block-Zähler nicht mit der Datei wachsen
+                    file_entries += self._flush_bytes_stats(counters, caches, errors, totals, source_file)
+
+        self.line_counts.update(lines=lines, matched=matched)
+        return file_entries + self._flush_bytes_stats(counters, caches, errors, totals, source_file)
+
+    def _flush_bytes_stats(self, counters, caches, errors, totals, source_file):
+        """Übernimmt die bytes-Zähler in self.stats und leert sie, gibt die Anzahl zurück"""
+        partial = self._decode_bytes_stats(counters, caches['minutes'], errors, source_file)
+        partial.update(totals)
+        merge_stats(self.stats, partial)
+        self._prune_path_latency(self.stats)
+        count = totals['total_requests']
+        for counter in counters.values():
+            counter.clear()
+        errors.clear()
+        totals.update(dict.fromkeys(totals, 0))
+        return count
+
+    def _count_rows(self, rows, counters, caches, errors, totals):
+        """Zählt einen Block geparster Zeilen (Tupel aus Byte-Feldern)"""
+        time_values = list(map(_ROW_TIME, rows))
+        # Minuten-Schlüssel (Zeitstempel ohne ":SS") per map in C bilden, dekodiert
+        # wird nur einmal pro Minute
+        minute_keys = list(map(add, map(_TIME_PREFIX, time_values), map(_TIME_ZONE, time_values)))
+        seconds_valid = None
+        if not _VALID_SECONDS.issuperset(map(_TIME_SECONDS, time_values)):
+            seconds_valid = [seconds in _VALID_SECONDS for seconds in map(_TIME_SECONDS, time_values)]
+
+        # Zeitfilter: Entscheidung je Minute, nur Grenzminuten sekundengenau
+        if self.epoch_range[0] is not None:
+            window = self._lookup(caches['window'], minute_keys,
+                                  lambda key: self._minute_in_window(key, caches['minutes']))
+            keep = list(map(window.__getitem__, minute_keys))
+            if None in keep or seconds_valid is not None:
+                for index, inside in enumerate(keep):
+                    if seconds_valid is not None and not seconds_valid[index]:
+                        keep[index] = False
+                    elif inside is None:
+                        minute = caches['minutes'][minute_keys[index]]
+                        keep[index] = self._is_in_time_range(
+                            (minute[0] + int(time_values[index][18:20]),))
+            if not all(keep):
+                rows = list(compress(rows, keep))
+                minute_keys = list(compress(minute_keys, keep))
+                if not rows:
+                    return
+        elif seconds_valid is not None:
+            # Ungültige Zeitstempel zählen mit, aber nicht in der Zeitstatistik
+            minute_keys = list(compress(minute_keys, seconds_valid))
+
+        counters['minutes'].update(minute_keys)
+        self._count_columns(rows, counters, caches, totals)
+
+        status_counts = Counter(map(_ROW_STATUS, rows))
+        counters['status_codes'].update(status_counts)
+        totals['bytes_transferred'] += sum(map(int, filter(b'-'.__ne__, map(_ROW_SIZE, rows))))
+
+        # Fehler: Anzahl aus den Status-Zählern, Details nur für die letzten
+        status_values = self._lookup(caches['status'], status_counts, int)
+        error_statuses = {raw for raw in status_counts if status_values[raw] >= 400}
+        if error_statuses:
+            totals['error_count'] += sum(status_counts[raw] for raw in error_statuses)
+            recent = []
+            for ip, time_raw, _, request_path, status_raw, _, user_agent, *_ in reversed(rows):
+                if status_raw in error_statuses:
+                    recent.append((ip, status_values[status_raw], request_path, time_raw, user_agent))
+                    if len(recent) == ERROR_BUFFER_SIZE:
+                        break
+            errors.extend(reversed(recent))
+
+    def _count_rows_numpy(self, rows, counters, caches, errors, totals):
+        """numpy-Variante von _count_rows: Zeit und Status als Arrays
+
+        Zeitstempel und Status fester Breite werden je Block als eine
+        Byte-Matrix gelesen; Minuten-Codes, Sekunden, Zeitfilter, Stunden-/
+        Tagesverteilung und Status-Codes ergeben sich aus Masken, np.unique
+        und np.bincount statt aus Listen und Zählern je Zeile. Den Kalender
+        fragt die Engine nur einmal pro Stunde. Die Text-Spalten (IPs, Seiten,
+        Agents) zählt sie wie bytes.
+        """
+        time_values = list(map(_ROW_TIME, rows))
+        # Minute je Zeile als Code in die eindeutigen Minuten des Blocks
+        stamps = _fixed_width(time_values, 26)
+        if stamps is not None:
+            # Übliche Zeitstempel gleicher Länge: Minuten und Sekunden direkt aus der
+            # Byte-Matrix. Logs sind nahezu sortiert - eindeutig gemacht werden nur
+            # die Anfänge der Läufe gleicher Minute
+            keys = stamps[:, _TIME_MINUTE_COLUMNS]
+            changed = np.ones(len(rows), dtype=bool)
+            changed[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+            run_keys = np.ascontiguousarray(keys[changed]).view('S23').ravel()
+            unique_minutes, run_codes = np.unique(run_keys, return_inverse=True)
+            codes = run_codes.ravel()[np.cumsum(changed) - 1]
+            minutes = self._decode_minute_grid(unique_minutes, caches['minutes'])
+            seconds = stamps[:, 17:20]
+        else:
+            minute_keys = list(map(add, map(_TIME_PREFIX, time_values), map(_TIME_ZONE, time_values)))
+            unique_minutes = list(dict.fromkeys(minute_keys))
+            minute_codes = dict(zip(unique_minutes, range(len(unique_minutes))))
+            codes = np.fromiter(map(minute_codes.__getitem__, minute_keys), dtype=np.int64, count=len(rows))
+            minutes = _minute_arrays([self._decode_minute_key(key, caches['minutes']) for key in unique_minutes])
+            seconds = np.array(list(map(_TIME_SECONDS, time_values)), dtype='S3').view(np.uint8).reshape(-1, 3)
+        minute_valid, minute_epochs, minute_hours, minute_dates, date_names = minutes
+
+        # Sekunden (":SS") direkt aus den Bytes, ungültige Zeitstempel wie im Decoder verwerfen
+        digits = seconds[:, 1:].astype(np.int64) - ord('0')
+        second_values = digits[:, 0] * 10 + digits[:, 1]
+        valid = (minute_valid[codes] & (seconds[:, 0] == ord(':'))
+                 & ((digits >= 0) & (digits <= 9)).all(axis=1) & (second_values <= 59))
+
+        if self.epoch_range[0] is not None:
+            epochs = minute_epochs[codes] + second_values
+            keep = valid & (epochs >= self.epoch_range[0]) & (epochs <= self.epoch_range[1])
+            if not keep.all():
+                rows = list(compress(rows, keep.tolist()))
+                if not rows:
+                    return
+            codes = codes[keep]
+        else:
+            # Ungültige Zeitstempel zählen mit, aber nicht in der Zeitstatistik
+            codes = codes[valid]
+
+        # Stunden/Tage: Zeilen je Minute zählen, dann je Stunde/Datum aufsummieren
+        minute_counts = np.bincount(codes, minlength=len(minute_valid))
+        hour_counts = np.bincount(minute_hours, weights=minute_counts, minlength=24).astype(np.int64)
+        for hour in np.flatnonzero(hour_counts).tolist():
+            counters['hourly_traffic'][hour] += int(hour_counts[hour])
+        date_counts = np.bincount(minute_dates, weights=minute_counts,
+                                  minlength=len(date_names)).astype(np.int64)
+        for date_code in np.flatnonzero(date_counts).tolist():
+            counters['daily_traffic'][date_names[date_code]] += int(date_counts[date_code])
+
+        self._count_columns(rows, counters, caches, totals)
+
+        status_raw = list(map(_ROW_STATUS, rows))
+        status_digits = _fixed_width(status_raw, 3)
+        if status_digits is not None:
+            statuses = (status_digits.astype(np.int64) - ord('0')) @ np.array([100, 10, 1])
+        else:
+            status_values = self._lookup(caches['status'], status_raw, int)
+            statuses = np.fromiter(map(status_values.__getitem__, status_raw), dtype=np.int64, count=len(rows))
+        present, counts = np.unique(statuses, return_counts=True)
+        counters['status_codes'].update(dict(zip(present.tolist(), counts.tolist())))
+
+        # Größen unterschiedlicher Länge: int() in C ist schneller als ein S-Array mit astype
+        totals['bytes_transferred'] += sum(map(int, filter(b'-'.__ne__, map(_ROW_SIZE, rows))))
+
+        # Fehler: Anzahl per Maske, Details nur für die letzten
+        error_rows = np.flatnonzero(statuses >= 400)
+        totals['error_count'] += len(error_rows)
+        for position in error_rows[-ERROR_BUFFER_SIZE:].tolist():
+            ip, time_raw, _, request_path, _, _, user_agent = rows[position][:7]
+            errors.append((ip, int(statuses[position]), request_path, time_raw, user_agent))
+
+    def _count_columns(self, rows, counters, caches, totals):
+        """Zählt die Text-Spalten eines Blocks (IPs, Seiten, Agents, Klassifizierung, Antwortzeiten)"""
+        # Mehrfach benötigte Spalten als Liste, der Rest direkt per map
+        ips, paths, agents = (list(map(field, rows)) for field in (_ROW_IP, _ROW_PATH, _ROW_USER_AGENT))
+        totals['total_requests'] += len(rows)
+
+        counters['top_ips'].update(ips)
+        counters['methods'].update(map(_ROW_METHOD, rows))
+        counters['top_pages'].update(paths)
+        counters['user_agents'].update(agents)
+
+        bots = self._lookup(caches['bot'], agents,
+                            lambda ua: self._is_bot(_decode_bytes(ua)))
+        counters['bot_requests'].update(compress(ips, map(bots.__getitem__, agents)))
+
+        suspicious = self._lookup(caches['suspicious'], paths,
+                                  lambda p: self.suspicious_classifier.matches(_decode_bytes(p)))
+        counters['suspicious_ips'].update(compress(ips, map(suspicious.__getitem__, paths)))
+
+        # Antwortzeiten roh als (Pfad, Wert) zählen, geparst wird beim Dekodieren
+        if len(rows[0]) > len(LogFormat.FIELDS):
+            counters['path_latency'].update(zip(paths, map(_ROW_REQUEST_TIME, rows)))
+            counters['upstream_latency'].update(map(_ROW_UPSTREAM_TIME, rows))
+
+    def _lookup(self, cache, values, compute, max_size=65536):
+        """Füllt cache für alle noch unbekannten values und gibt ihn zurück"""
+        missing = set(values).difference(cache)
+        if missing:
+            if len(cache) + len(missing) > max_size:
+                cache.clear()
+                missing = set(values)
+            for value in missing:
+                cache[value] = compute(value)
+        return cache
+
+    def _decode_minute_key(self, minute_key, minutes):
+        """(epoch, Stunde, Datum) eines Minuten-Schlüssels, None wenn ungültig"""
+        minute = minutes.get(minute_key, False)
+        if minute is False:
+            if len(minutes) >= 65536:
+                minutes.clear()
+            # Schlüssel ist der Zeitstempel ohne ":SS" - für den Decoder ergänzen
+            time_str = _decode_bytes(minute_key[:17] + b':00' + minute_key[17:])
+            minute = minutes[minute_key] = self.timestamps._decode_minute(time_str)
+        return minute
+
+    def _decode_minute_grid(self, minute_keys, minutes):
+        """numpy-Engine: alle Minuten-Schlüssel eines Blocks (S23-Array) auf einmal dekodieren
+
+        Der Kalender wird nur je voller Stunde befragt, die Minuten ergeben
+        sich per Array-Rechnung. Stunden, die lokal nicht in dieselbe Stunde
+        fallen (halbe Stunden Versatz, Zeitumstellung), dekodiert
+        _decode_minute_key einzeln. Ergebnis wie _minute_arrays.
+        """
+        grid = minute_keys.view(np.uint8).reshape(len(minute_keys), -1)
+        # Stunden-Schlüssel: Minuten-Schlüssel ohne ":MM"
+        hour_keys = np.ascontiguousarray(grid[:, _MINUTE_HOUR_COLUMNS]).view('S20').ravel()
+        unique_hours, hour_codes = np.unique(hour_keys, return_inverse=True)
+        hour_codes = hour_codes.ravel()
+        hours = [self.timestamps._decode_hour(_decode_bytes(key[:14] + b':00:00' + key[14:]))
+                 for key in unique_hours.tolist()]
+
+        digits = grid[:, 15:17].astype(np.int64) - ord('0')
+        minute_values = digits[:, 0] * 10 + digits[:, 1]
+        valid = ((grid[:, 14] == ord(':')) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+                 & (minute_values <= 59) & np.array([hour is not None for hour in hours])[hour_codes])
+        epochs = np.array([hour[0] if hour else 0 for hour in hours], dtype=np.int64)[hour_codes] + minute_values * 60
+        local_hours = np.array([hour[1] if hour else 0 for hour in hours], dtype=np.int64)[hour_codes]
+        date_names = list(dict.fromkeys(hour[2] for hour in hours if hour))
+        date_codes = dict(zip(date_names, range(len(date_names))))
+        dates = np.array([date_codes[hour[2]] if hour else 0 for hour in hours], dtype=np.int64)[hour_codes]
+
+        unaligned = np.array([hour is not None and not hour[3] for hour in hours])[hour_codes] & valid
+        for index in np.flatnonzero(unaligned).tolist():
+            minute = self._decode_minute_key(minute_keys[index], minutes)
+            epochs[index], local_hours[index] = minute[0], minute[1]
+            if minute[2] not in date_codes:
+                date_codes[minute[2]] = len(date_names)
+                date_names.append(minute[2])
+            dates[index] = date_codes[minute[2]]
+        return valid, epochs, local_hours, dates, date_names
+
+    def _minute_in_window(self, minute_key, minutes):
+        """True/False wenn die ganze Minute inner-/außerhalb des Zeitfilters liegt, sonst None"""
+        minute = self._decode_minute_key(minute_key, minutes)
+        if minute is None:
+            return False
+        epoch_start, epoch_end = self.epoch_range
+        if epoch_start <= minute[0] and minute[0] + 59 <= epoch_end:
+            return True
+        if minute[0] + 59 < epoch_start or minute[0] > epoch_end:
+            return False
+        return None
+
+    def _decode_bytes_stats(self, counters, minutes, errors, source_file):
+        """Wandelt bytes-Zähler in die normale Statistik-Struktur um (einmal pro Schlüssel)"""
+        partial = _new_stats()
+
+        for name in ('top_ips', 'methods', 'top_pages', 'user_agents', 'bot_requests', 'suspicious_ips'):
+            partial[name] = _decode_counter(counters[name])
+        for key, count in counters['status_codes'].items():
+            partial['status_codes'][int(key)] += count
+
+        # Stündlich/täglich: je Minute nur einmal dekodieren (numpy-Engine zählt direkt)
+        for minute_key, count in counters['minutes'].items():
+            minute = self._decode_minute_key(minute_key, minutes)
+            if minute is not None:
+                partial['hourly_traffic'][minute[1]] += count
+                partial['daily_traffic'][minute[2]] += count
+        for name in ('hourly_traffic', 'daily_traffic'):
+            for key, count in counters[name].items():
+                partial[name][key] += count
+
+        # Eindeutige IPs = Schlüssel des IP-Zählers, kein Set-Update pro Zeile nötig
+        partial['unique_ips'] = set(partial['top_ips'])
+        if partial['top_ips']:
+            file_stats = partial['log_file_stats'][source_file]
+            file_stats['requests'] = sum(partial['top_ips'].values())
+            # Dasselbe Set - merge_stats übernimmt beide nur per |= in eigene Sets
+            file_stats['unique_ips'] = partial['unique_ips']
+
+        # Antwortzeiten: je eindeutigem Rohwert und Pfad nur einmal parsen/dekodieren
+        if counters['path_latency'] or counters['upstream_latency']:
+            file_stats = partial['log_file_stats'][source_file]
+            seconds = {}
+            path_names = {}
+            for (request_path, raw), count in counters['path_latency'].items():
+                if raw not in seconds:
+                    seconds[raw] = parse_latency(raw)
+                if seconds[raw] is not None:
+                    if request_path not in path_names:
+                        path_names[request_path] = sys.intern(_decode_bytes(request_path))
+                    file_stats['latency'].add(seconds[raw], count)
+                    partial['path_latency'][path_names[request_path]].add(seconds[raw], count)
+            for raw, count in counters['upstream_latency'].items():
+                value = parse_latency(raw)
+                if value is not None:
+                    file_stats['upstream_latency'].add(value, count)
+
+        for ip, status, request_path, time_raw, user_agent in errors:
+            partial['error_requests'].append({
+                'ip': sys.intern(_decode_bytes(ip)),
+                'status': status,
+                'path': _decode_bytes(request_path),
+                'time': _decode_bytes(time_raw),
+                'user_agent': sys.intern(_decode_bytes(user_agent)),
+                'source': source_file
+            })
+        return partial
+
+    def _index_path(self, log_file):
+        """Index-Verzeichnis einer Log-Datei"""
+        name = os.path.abspath(log_file).strip(os.sep).replace(os.sep, '_')
+        return os.path.join(self.index_dir, name)
+
+    def _parse_range_index(self, path, source_file):
+        """Spaltenindex: neue Zeilen anhängen, dann vektorisiert abfragen"""
+        index = self._update_index(path)
+        partial = self._query_index(index, source_file)
+        merge_stats(self.stats, partial)
+        return partial['total_requests']
+
+    def _update_index(self, path):
+        """Bringt den Index auf den Stand der Datei und gibt ihn zurück
+
+        Wie bei --inkrementell: gleiche Inode und nicht geschrumpft -> nur
+        die neuen Zeilen ab dem gespeicherten Offset anhängen, sonst neu
+        aufbauen. Komprimierte Archive werden einmal komplett indiziert.
+        """
+        index = ColumnIndex(self._index_path(path))
+        file_stat = os.stat(path)
+        compressed = is_compressed(path)
+        log_format = self._log_format(path)
+        meta = index.meta
+        if meta is None or (meta['inode'], meta['device']) != (file_stat.st_ino, file_stat.st_dev) \
+                or meta['offset'] > file_stat.st_size \
+                or meta.get('log_format', self.log_format.log_format) != log_format.log_format \
+                or (compressed and (meta['size'], meta['mtime']) != (file_stat.st_size, file_stat.st_mtime)):
+            index.reset(file_stat)
+            meta = None
+
+        start = index.meta['offset']
+        end = file_stat.st_size if compressed else self._last_line_end(path, file_stat.st_size)
+        if end > start:
+            findall = log_format.findall
+            caches = {'times': {}, 'status': {}, 'latency': {}}
+            for buffer, position, endpos in self._iter_buffers(path, start, None if compressed else end):
+                rows = findall(buffer, position, endpos)
+                if rows:
+                    index.append(self._index_columns(rows, index, caches))
+        if end > start or meta is None:
+            index.meta['log_format'] = log_format.log_format
+            index.save(file_stat, end)
+        return index
+
+    def _index_columns(self, rows, index, caches):
+        """Wandelt einen Block geparster Zeilen (Byte-Tupel) in Index-Spalten um"""
+        times = list(map(_ROW_TIME, rows))
+        decoded = self._lookup(caches['times'], times, self._index_time)
+        time_info = list(map(decoded.__getitem__, times))
+        if any(decoded[raw][2] is not None for raw in set(times)):
+            first_row = index.meta['rows']
+            for row, info in enumerate(time_info, first_row):
+                if info[2] is not None:
+                    index.meta['time_exceptions'][row] = info[2]
+
+        statuses = self._lookup(caches['status'], map(_ROW_STATUS, rows), int)
+        latency = dict.fromkeys(('request_time', 'upstream_time'), np.full(len(rows), np.nan))
+        if len(rows[0]) > len(LogFormat.FIELDS):
+            for name, field in (('request_time', _ROW_REQUEST_TIME), ('upstream_time', _ROW_UPSTREAM_TIME)):
+                values = list(map(field, rows))
+                seconds = self._lookup(caches['latency'], values, parse_latency)
+                latency[name] = [math.nan if seconds[raw] is None else seconds[raw] for raw in values]
+        return {
+            'epoch': list(map(itemgetter(0), time_info)),
+            'tz': list(map(itemgetter(1), time_info)),
+            'status': list(map(statuses.__getitem__, map(_ROW_STATUS, rows))),
+            'size': [-1 if size == b'-' else int(size) for size in map(_ROW_SIZE, rows)],
+            'ip': index.encode('ip', list(map(_ROW_IP, rows))),
+            'method': index.encode('method', list(map(_ROW_METHOD, rows))),
+            'path': index.encode('path', list(map(_ROW_PATH, rows))),
+            'user_agent': index.encode('user_agent', list(map(_ROW_USER_AGENT, rows))),
+            **latency,
+        }
+
+    def _index_time(self, raw):
+        """(epoch, Zeitzone in Minuten, Original falls nicht exakt nachbildbar) eines Zeitstempels"""
+        time_str = _decode_bytes(raw)
+        timestamp = self.timestamps.decode(time_str)
+        if timestamp is None:
+            return ColumnIndex.INVALID_EPOCH, ColumnIndex.NO_TZ, time_str
+        tz_str = time_str[21:]
+        tz_minutes = ColumnIndex.NO_TZ
+        if tz_str:
+            tz_minutes = (int(tz_str[1:3]) * 60 + int(tz_str[3:5])) * (-1 if tz_str[0] == '-' else 1)
+        exact = format_log_time(timestamp[0], tz_minutes) == time_str
+        return timestamp[0], tz_minutes, None if exact else time_str
+
+    def _query_index(self, index, source_file):
+        """Wertet den Index für den Zeitfilter aus (Masken + Zählungen statt Zeilenschleife)"""
+        partial = _new_stats()
+        epochs = index.column('epoch')
+        selected = None
+        if self.epoch_range[0] is not None:
+            selected = np.flatnonzero((epochs >= self.epoch_range[0]) & (epochs <= self.epoch_range[1]))
+            epochs = epochs[selected]
+        if not len(epochs):
+            return partial
+
+        def column(name):
+            values = index.column(name)
+            return values if selected is None else values[selected]
+
+        ips, paths, agents, statuses = (column(name) for name in ('ip', 'path', 'user_agent', 'status'))
+        ip_strings, path_strings, agent_strings = (index.strings(name) for name in ('ip', 'path', 'user_agent'))
+
+        partial['total_requests'] = len(epochs)
+        partial['top_ips'] = self._index_counter(ips, ip_strings)
+        partial['methods'] = self._index_counter(column('method'), index.strings('method'))
+        partial['top_pages'] = self._index_counter(paths, path_strings)
+        partial['user_agents'] = self._index_counter(agents, agent_strings)
+        partial['status_codes'] = self._index_counter(statuses)
+
+        sizes = column('size')
+        partial['bytes_transferred'] = int(sizes[sizes >= 0].sum())
+
+        # Stündlich/täglich: je Stunde in lokale Zeit umrechnen, nur Stunden mit
+        # Zeitumstellung oder halbstündigem Versatz minutengenau
+        minutes, counts = np.unique(epochs[epochs != ColumnIndex.INVALID_EPOCH] // 60, return_counts=True)
+        hours, starts = np.unique(minutes // 60, return_index=True)
+        if len(hours):
+            hour_counts = np.add.reduceat(counts, starts).tolist()
+            stops = starts[1:].tolist() + [len(minutes)]
+            for hour, count, start, stop in zip(hours.tolist(), hour_counts, starts.tolist(), stops):
+                local = datetime.fromtimestamp(hour * 3600)
+                local_end = datetime.fromtimestamp(hour * 3600 + 3599)
+                if local.minute == 0 and local_end.hour == local.hour:
+                    partial['hourly_traffic'][local.hour] += count
+                    partial['daily_traffic'][local.strftime('%Y-%m-%d')] += count
+                    continue
+                for minute, minute_count in zip(minutes[start:stop].tolist(), counts[start:stop].tolist()):
+                    local = datetime.fromtimestamp(minute * 60)
+                    partial['hourly_traffic'][local.hour] += minute_count
+                    partial['daily_traffic'][local.strftime('%Y-%m-%d')] += minute_count
+
+        # Klassifiziert wird nur einmal pro vorkommendem Wörterbuch-Eintrag
+        bot_agents = self._index_flags(agents, agent_strings, self._is_bot)
+        partial['bot_requests'] = self._index_counter(ips[bot_agents[agents]], ip_strings)
+        suspicious_paths = self._index_flags(paths, path_strings, self.suspicious_classifier.matches)
+        partial['suspicious_ips'] = self._index_counter(ips[suspicious_paths[paths]], ip_strings)
+
+        error_rows = np.flatnonzero(statuses >= 400)
+        partial['error_count'] = len(error_rows)
+        recent = error_rows[-ERROR_BUFFER_SIZE:]
+        rows = recent if selected is None else selected[recent]
+        time_exceptions = index.meta['time_exceptions']
+        tz_minutes = index.column('tz')[rows]
+        method_strings = index.strings('method')
+        for position, row, tz in zip(recent.tolist(), rows.tolist(), tz_minutes.tolist()):
+            partial['error_requests'].append({
+                'ip': ip_strings[ips[position]],
+                'status': int(statuses[position]),
+                'path': path_strings[paths[position]],
+                'time': time_exceptions.get(row) or format_log_time(int(epochs[position]), tz),
+                'user_agent': agent_strings[agents[position]],
+                'source': source_file
+            })
+
+        partial['unique_ips'] = set(partial['top_ips'])
+        file_stats = partial['log_file_stats'][source_file]
+        file_stats['requests'] = partial['total_requests']
+        file_stats['unique_ips'] = set(partial['unique_ips'])
+
+        request_times = column('request_time')
+        timed = ~np.isnan(request_times)
+        if timed.any():
+            request_times = request_times[timed]
+            file_stats['latency'] = self._index_latency(request_times)
+            timed_paths = paths[timed]
+            present, first = np.unique(timed_paths, return_index=True)
+            codes = present[np.argsort(first)].tolist()
+            for code, histogram in zip(codes, self._index_path_latency(request_times, timed_paths, codes)):
+                partial['path_latency'][path_strings[code]] += histogram
+        upstream_times = column('upstream_time')
+        upstream_times = upstream_times[~np.isnan(upstream_times)]
+        if len(upstream_times):
+            file_stats['upstream_latency'] = self._index_latency(upstream_times)
+        return partial
+
+    def _index_latency(self, seconds):
+        """LatencyHistogram aus einem Array von Antwortzeiten (Buckets per numpy)"""
+        histogram = LatencyHistogram()
+        buckets, counts = np.unique(self._index_buckets(seconds), return_counts=True)
+        histogram.buckets.update(dict(zip(buckets.tolist(), counts.tolist())))
+        histogram.count = len(seconds)
+        histogram.max = float(seconds.max())
+        return histogram
+
+    def _index_path_latency(self, seconds, codes, present):
+        """Je Pfad-Code aus present ein LatencyHistogram (eine Sortierung statt Schleife je Zeile)"""
+        # Pfad-Code und Bucket zu einem Schlüssel kombinieren (Buckets liegen in ±2^15)
+        keys = codes.astype(np.int64) * 2 ** 17 + (self._index_buckets(seconds) + 2 ** 16)
+        keys, counts = np.unique(keys, return_counts=True)
+        maxima = np.zeros(int(codes.max()) + 1)
+        np.maximum.at(maxima, codes, seconds)
+        histograms = defaultdict(LatencyHistogram)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            histogram = histograms[key >> 17]
+            histogram.buckets[(key & (2 ** 17 - 1)) - 2 ** 16] = count
+            histogram.count += count
+        for code, histogram in histograms.items():
+            histogram.max = float(maxima[code])
+        return [histograms[code] for code in present]
+
+    def _index_buckets(self, seconds):
+        """LatencyHistogram.bucket für ein ganzes Array"""
+        buckets = np.full(len(seconds), LatencyHistogram.ZERO_BUCKET, dtype=np.int64)
+        positive = seconds > 0
+        buckets[positive] = np.ceil(np.log(seconds[positive]) / LatencyHistogram.LOG_BASE)
+        return buckets
+
+    def _index_counter(self, codes, strings=None):
+        """Counter über eine (kodierte) Spalte, Schlüssel in Reihenfolge des ersten Auftretens
+
+        Die Reihenfolge entspricht dem zeilenweisen Zählen - gleich häufige
+        Einträge erscheinen im Bericht wie ohne Index.
+        """
+        if not len(codes):
+            return Counter()
+        present, first, counts = np.unique(codes, return_index=True, return_counts=True)
+        order = np.argsort(first)
+        keys = present[order].tolist()
+        if strings is not None:
+            keys = list(map(strings.__getitem__, keys))
+        counts = counts[order].tolist()
+        result = Counter(dict(zip(keys, counts)))
+        if len(result) != len(keys):
+            # Verschiedene Byte-Werte, die zum selben str dekodieren
+            result = Counter()
+            for key, count in zip(keys, counts):
+                result[key] += count
+        return result
+
+    def _index_flags(self, codes, strings, predicate):
+        """Boolesches Array je Wörterbuch-Code, predicate nur für vorkommende Werte"""
+        flags = np.zeros(len(strings), dtype=bool)
+        present = np.flatnonzero(np.bincount(codes, minlength=len(strings)))
+        flags[present] = [predicate(strings[code]) for code in present.tolist()]
+        return flags
+
+    def _update_stats(self, entry, timestamp):
         """Aktualisiert die Statistiken für einen Log-Eintrag"""
         self.stats['total_requests'] += 1
         source_file = entry['source_file']
@@ -205,26 +2919,18 @@ class NginxLogAnalyzer:
         if size != '-':
             self.stats['bytes_transferred'] += int(size)
 
-        # Zeit-basierte Statistiken
-        try:
-            time_str = entry['time']
-            dt = datetime.strptime(time_str.split()[0], '%d/%b/%Y:%H:%M:%S')
-
-            hour = dt.hour
-            date_str = dt.date().strftime('%Y-%m-%d')
-
-            self.stats['hourly_traffic'][hour] += 1
-            self.stats['daily_traffic'][date_str] += 1
-
-        except ValueError:
-            pass
+        # Zeit-basierte Statistiken (lokale Zeit, Zeitzone des Logs berücksichtigt)
+        if timestamp is not None:
+            self.stats['hourly_traffic'][timestamp[1]] += 1
+            self.stats['daily_traffic'][timestamp[2]] += 1
 
         # Bot Detection
         if self._is_bot(user_agent):
             self.stats['bot_requests'][ip] += 1
 
-        # Error Requests (4xx, 5xx)
+        # Error Requests (4xx, 5xx) - nur die letzten ERROR_BUFFER_SIZE behalten
         if status >= 400:
+            self.stats['error_count'] += 1
             self.stats['error_requests'].append({
                 'ip': ip,
                 'status': status,
@@ -238,23 +2944,32 @@ class NginxLogAnalyzer:
         if self._is_suspicious(entry):
             self.stats['suspicious_ips'][ip] += 1
 
+        # Antwortzeiten (nur wenn das log_format sie enthält)
+        if 'request_time' in entry:
+            file_stats = self.stats['log_file_stats'][source_file]
+            request_time = parse_latency(entry['request_time'])
+            if request_time is not None:
+                file_stats['latency'].add(request_time)
+                self.stats['path_latency'][path].add(request_time)
+            upstream_time = parse_latency(entry['upstream_time'])
+            if upstream_time is not None:
+                file_stats['upstream_latency'].add(upstream_time)
+
+    def _prune_path_latency(self, stats):
+        """Näherungsmodus: Pfad-Latenzen nur für Pfade im Top-Seiten-Sketch behalten"""
+        path_latency = stats['path_latency']
+        if self.sketch and len(path_latency) > self.sketch['topk_capacity']:
+            top_pages = stats['top_pages']
+            for path in [path for path in path_latency if path not in top_pages]:
+                del path_latency[path]
+
     def _is_bot(self, user_agent):
         """Prüft ob User-Agent ein Bot ist"""
-        user_agent_lower = user_agent.lower()
-        return any(re.search(pattern, user_agent_lower) for pattern in self.bot_patterns)
+        return self.bot_classifier.matches(user_agent)
 
     def _is_suspicious(self, entry):
         """Erkennt verdächtige Aktivitäten"""
-        suspicious_patterns = [
-            r'\.php$', r'\.asp$', r'\.jsp$',  # Script-Dateien
-            r'wp-admin', r'wp-login',          # WordPress Angriffe
-            r'admin', r'login', r'config',     # Admin-Bereiche
-            r'\.env', r'\.git',               # Sensible Dateien
-            r'eval\(', r'base64_decode',      # Code-Injection
-        ]
-
-        path = entry['path']
-        return any(re.search(pattern, path) for pattern in suspicious_patterns)
+        return self.suspicious_classifier.matches(entry['path'])
 
     def format_bytes(self, bytes_count):
         """Formatiert Bytes in lesbare Einheiten"""
@@ -264,6 +2979,12 @@ class NginxLogAnalyzer:
             bytes_count /= 1024.0
         return f"{bytes_count:.2f} PB"
 
+    def format_duration(self, seconds):
+        """Formatiert eine Antwortzeit (Sekunden) lesbar"""
+        if seconds < 1:
+            return f"{seconds * 1000:.0f} ms"
+        return f"{seconds:.2f} s"
+
     def get_time_filter_description(self):
         """Gibt Beschreibung des Zeitfilters zurück"""
         if self.time_filter == 'heute':
@@ -294,10 +3015,15 @@ class NginxLogAnalyzer:
         # Grundlegende Statistiken
         print(f"\n{Colors.INFO}📊 GRUNDSTATISTIKEN ({self.get_time_filter_description()}):{Colors.RESET}")
         print(f"   {Colors.BOLD}Gesamte Requests:{Colors.RESET} {Colors.GREEN}{self.stats['total_requests']:,}{Colors.RESET}")
-        print(f"   {Colors.BOLD}Eindeutige IPs:{Colors.RESET} {Colors.YELLOW}{len(self.stats['unique_ips']):,}{Colors.RESET}")
+        approx = "≈" if self.sketch else ""
+        print(f"   {Colors.BOLD}Eindeutige IPs:{Colors.RESET} {Colors.YELLOW}{approx}{len(self.stats['unique_ips']):,}{Colors.RESET}")
         print(f"   {Colors.BOLD}Datenübertragung:{Colors.RESET} {Colors.CYAN}{self.format_bytes(self.stats['bytes_transferred'])}{Colors.RESET}")
-        print(f"   {Colors.BOLD}Bot-Requests:{Colors.RESET} {Colors.MAGENTA}{sum(self.stats['bot_requests'].values()):,}{Colors.RESET}")
-        print(f"   {Colors.BOLD}Fehler-Requests:{Colors.RESET} {Colors.RED}{len(self.stats['error_requests']):,}{Colors.RESET}")
+        bot_requests = self.stats['bot_requests']
+        bot_total = bot_requests.total if isinstance(bot_requests, SpaceSaving) else sum(bot_requests.values())
+        print(f"   {Colors.BOLD}Bot-Requests:{Colors.RESET} {Colors.MAGENTA}{bot_total:,}{Colors.RESET}")
+        print(f"   {Colors.BOLD}Fehler-Requests:{Colors.RESET} {Colors.RED}{self.stats['error_count']:,}{Colors.RESET}")
+        if self.sketch:
+            self._print_sketch_bounds()
 
         # Nur relevante Abschnitte anzeigen wenn Daten vorhanden
         if not self.stats['total_requests']:
@@ -315,7 +3041,7 @@ class NginxLogAnalyzer:
                 ip_color = Colors.YELLOW
             else:
                 ip_color = Colors.WHITE
-            print(f"   {Colors.GRAY}{i:>2}.{Colors.RESET} {Colors.colorize(ip, ip_color):<15} {Colors.BOLD}{count:>8,}{Colors.RESET} requests ({Colors.GREEN}{percentage:>5.1f}%{Colors.RESET})")
+            print(f"   {Colors.GRAY}{i:>2}.{Colors.RESET} {Colors.colorize(ip, ip_color):<15} {Colors.BOLD}{count:>8,}{Colors.RESET} requests ({Colors.GREEN}{percentage:>5.1f}%{Colors.RESET}){self._ip_label(ip)}")
 
         # Status Codes
         print(f"\n{Colors.INFO}📈 HTTP STATUS CODES:{Colors.RESET}")
@@ -349,6 +3075,10 @@ class NginxLogAnalyzer:
             path_display = path[:50] + "..." if len(path) > 50 else path
             print(f"   {Colors.GRAY}{i:>2}.{Colors.RESET} {Colors.BOLD}{count:>6,}{Colors.RESET} ({Colors.GREEN}{percentage:>5.1f}%{Colors.RESET}) {Colors.CYAN}{path_display}{Colors.RESET}")
 
+        # Antwortzeiten (nur wenn ein log_format $request_time enthält)
+        if self.stats['path_latency']:
+            self._print_latency()
+
         # Hourly Traffic (nur wenn relevant)
         if self.time_filter in ['heute', 'diese_woche']:
             print(f"\n{Colors.INFO}⏰ TRAFFIC NACH STUNDEN:{Colors.RESET}")
@@ -379,21 +3109,87 @@ class NginxLogAnalyzer:
         if self.stats['bot_requests']:
             print(f"\n{Colors.WARNING}🕷️  TOP BOT IPs:{Colors.RESET}")
             for ip, count in self.stats['bot_requests'].most_common(5):
-                print(f"   {Colors.MAGENTA}{ip:<15}{Colors.RESET} {Colors.BOLD}{count:>6,}{Colors.RESET} bot requests")
+                print(f"   {Colors.MAGENTA}{ip:<15}{Colors.RESET} {Colors.BOLD}{count:>6,}{Colors.RESET} bot requests{self._ip_label(ip)}")
 
         # Suspicious Activity
         if self.stats['suspicious_ips']:
             print(f"\n{Colors.WARNING}⚠️  VERDÄCHTIGE IPs:{Colors.RESET}")
             for ip, count in self.stats['suspicious_ips'].most_common(10):
-                print(f"   {Colors.RED}{ip:<15}{Colors.RESET} {Colors.BOLD}{count:>6,}{Colors.RESET} verdächtige requests")
+                print(f"   {Colors.RED}{ip:<15}{Colors.RESET} {Colors.BOLD}{count:>6,}{Colors.RESET} verdächtige requests{self._ip_label(ip)}")
+
+        # Netze/ASN: viele "verschiedene" IPs sind oft ein einziger Hoster
+        if self.enricher:
+            self._print_networks()
 
         # Recent Errors
         if self.stats['error_requests']:
             print(f"\n{Colors.ERROR}❌ LETZTE 5 FEHLER-REQUESTS:{Colors.RESET}")
-            for error in self.stats['error_requests'][-5:]:
+            for error in list(self.stats['error_requests'])[-5:]:
                 status_color = Colors.YELLOW if 400 <= error['status'] < 500 else Colors.RED
                 print(f"   {Colors.colorize(str(error['status']), status_color)} {Colors.RED}{error['ip']}{Colors.RESET} {Colors.GRAY}{error['path'][:40]}{Colors.RESET} [{Colors.CYAN}{error['source']}{Colors.RESET}]")
 
+    def _print_latency(self):
+        """Antwortzeit-Perzentile je Log-Datei und die langsamsten Endpunkte"""
+        print(f"\n{Colors.INFO}⏱️  ANTWORTZEITEN (p50 / p90 / p99 / max):{Colors.RESET}")
+        for source_file, stats in self.stats['log_file_stats'].items():
+            for name, label in (('latency', 'request'), ('upstream_latency', 'upstream')):
+                if stats[name].count:
+                    summary = stats[name].summary()
+                    times = " / ".join(self.format_duration(summary[key]) for key in ('p50', 'p90', 'p99', 'max'))
+                    print(f"   {Colors.CYAN}{source_file:<25}{Colors.RESET} {label:<9} {Colors.BOLD}{times}{Colors.RESET} {Colors.GRAY}({summary['count']:,} requests){Colors.RESET}")
+
+        # Sortiert nach p90, damit einzelne Ausreißer die Liste nicht bestimmen
+        slowest = sorted(((path, histogram.summary()) for path, histogram in self.stats['path_latency'].items()
+                          if histogram.count >= LATENCY_MIN_REQUESTS),
+                         key=lambda item: (-item[1]['p90'], -item[1]['count'], item[0]))[:10]
+        if slowest:
+            print(f"\n{Colors.INFO}🐢 TOP 10 LANGSAMSTE ENDPUNKTE (nach p90, ab {LATENCY_MIN_REQUESTS} Requests):{Colors.RESET}")
+            for i, (path, summary) in enumerate(slowest, 1):
+                path_display = path[:50] + "..." if len(path) > 50 else path
+                print(f"   {Colors.GRAY}{i:>2}.{Colors.RESET} {Colors.RED}{self.format_duration(summary['p90']):>8}{Colors.RESET} "
+                      f"{Colors.GRAY}(p50 {self.format_duration(summary['p50'])}, max {self.format_duration(summary['max'])}, "
+                      f"{summary['count']:,}x){Colors.RESET} {Colors.CYAN}{path_display}{Colors.RESET}")
+
+    def _ip_label(self, ip):
+        """ASN/Land-Zusatz für IP-Zeilen (leer ohne ASN-Datei)"""
+        if not self.enricher or not self.enricher.has_asn:
+            return ''
+        label = self.enricher.label(ip)
+        return f" {Colors.GRAY}[{label}]{Colors.RESET}" if label else ''
+
+    def _print_networks(self):
+        """Top-IPs, Bot- und verdächtige IPs zusammengefasst nach /24 bzw. /48, ASN und Land"""
+        sections = (('top_ips', 'ALLE IPs', 'requests', Colors.INFO, '🌐'),
+                    ('bot_requests', 'BOT-IPs', 'bot requests', Colors.WARNING, '🕷️ '),
+                    ('suspicious_ips', 'VERDÄCHTIGE IPs', 'verdächtige requests', Colors.WARNING, '⚠️ '))
+        for name, label, unit, color, icon in sections:
+            if not self.stats[name]:
+                continue
+            groups = self.enricher.aggregate(self.stats[name])
+            print(f"\n{color}{icon} {label} NACH NETZ (/24, /48):{Colors.RESET}")
+            for network, count in groups['networks'].most_common(10):
+                print(f"   {Colors.CYAN}{network:<22}{Colors.RESET} {Colors.BOLD}{count:>8,}{Colors.RESET} {unit}")
+            if groups['asns']:
+                print(f"\n{color}{icon} {label} NACH ASN:{Colors.RESET}")
+                for (asn, as_name), count in groups['asns'].most_common(10):
+                    print(f"   {Colors.CYAN}{'AS' + str(asn):<10}{Colors.RESET} {Colors.BOLD}{count:>8,}{Colors.RESET} {unit} {Colors.GRAY}{as_name[:50]}{Colors.RESET}")
+            if groups['countries'] and name == 'top_ips':
+                print(f"\n{color}{icon} {label} NACH LAND:{Colors.RESET}")
+                for country, count in groups['countries'].most_common(10):
+                    print(f"   {Colors.CYAN}{country:<4}{Colors.RESET} {Colors.BOLD}{count:>8,}{Colors.RESET} {unit}")
+
+    def _print_sketch_bounds(self):
+        """Fehlerschranken des Näherungsmodus"""
+        hll_error = self.stats['unique_ips'].relative_error
+        print(f"\n{Colors.WARNING}≈ NÄHERUNGSMODUS:{Colors.RESET}")
+        print(f"   {Colors.BOLD}Eindeutige IPs:{Colors.RESET} HyperLogLog, Standardfehler ±{hll_error * 100:.1f}% "
+              f"(3σ: ±{hll_error * 3 * 100:.1f}%)")
+        labels = {'top_ips': 'IPs', 'top_pages': 'Seiten', 'user_agents': 'User-Agents',
+                  'bot_requests': 'Bot-IPs', 'suspicious_ips': 'Verdächtige IPs'}
+        bounds = ", ".join(f"{label} +{self.stats[name].error_bound():,}" for name, label in labels.items())
+        print(f"   {Colors.BOLD}Top-Listen:{Colors.RESET} Space-Saving ({self.sketch['topk_capacity']:,} Einträge), "
+              f"Zählwerte max. überschätzt um: {bounds}")
+
     def _get_status_text(self, status):
         """Gibt Beschreibung für HTTP Status Code zurück"""
         status_texts = {
@@ -432,13 +3228,291 @@ class NginxLogAnalyzer:
 
         print(f"\n{Colors.SUCCESS}💾 CSV Export gespeichert: {filename}{Colors.RESET}")
 
+    def export_ndjson(self, filename=None):
+        """Exportiert das komplette Statistik-Modell als NDJSON (ein Objekt pro Zeile)
+
+        Jede Zeile hat ein Feld "type" (Name des Statistik-Feldes), Zähler
+        werden als {"type", "key", "count"} vollständig und ungekürzt geschrieben,
+        Antwortzeiten als Perzentile in Sekunden (p50, p90, p99, max).
+        Die Datei wird zeilenweise gestreamt, Dashboards können sie ebenso lesen.
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"nginx_analysis_{self.time_filter}_{timestamp}.ndjson"
+
+        start_time, end_time = self.time_range
+        bot_requests = self.stats['bot_requests']
+        records = [
+            {'type': 'meta',
+             'time_filter': self.time_filter,
+             'description': self.get_time_filter_description(),
+             'start': start_time.isoformat() if start_time else None,
+             'end': end_time.isoformat() if end_time else None,
+             'log_files': self.log_files,
+             'created': datetime.now().isoformat(timespec='seconds'),
+             'sketch': self.sketch},
+            {'type': 'summary',
+             'total_requests': self.stats['total_requests'],
+             'unique_ips': len(self.stats['unique_ips']),
+             'bytes_transferred': self.stats['bytes_transferred'],
+             'bot_requests': bot_requests.total if isinstance(bot_requests, SpaceSaving) else sum(bot_requests.values()),
+             'error_count': self.stats['error_count']},
+        ]
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            def write(record):
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+
+            for record in records:
+                write(record)
+            for source_file, file_stats in self.stats['log_file_stats'].items():
+                write({'type': 'log_file_stats', 'source_file': source_file,
+                       'requests': file_stats['requests'], 'unique_ips': len(file_stats['unique_ips'])})
+                for name in ('latency', 'upstream_latency'):
+                    if file_stats[name].count:
+                        write({'type': name, 'source_file': source_file, **file_stats[name].summary()})
+            for path, histogram in sorted(self.stats['path_latency'].items(), key=lambda item: (-item[1].count, item[0])):
+                write({'type': 'path_latency', 'key': path, **histogram.summary()})
+            for name in ('status_codes', 'methods', 'hourly_traffic', 'daily_traffic'):
+                for key, count in sorted(self.stats[name].items()):
+                    write({'type': name, 'key': key, 'count': count})
+            for name in ('top_ips', 'top_pages', 'user_agents', 'bot_requests', 'suspicious_ips'):
+                for key, count in self.stats[name].most_common():
+                    write({'type': name, 'key': key, 'count': count})
+            for error in self.stats['error_requests']:
+                write({'type': 'error_requests', **error})
+            if self.enricher:
+                for name in ('top_ips', 'bot_requests', 'suspicious_ips'):
+                    groups = self.enricher.aggregate(self.stats[name])
+                    for network, count in groups['networks'].most_common():
+                        write({'type': 'networks', 'source': name, 'key': network, 'count': count})
+                    for (asn, as_name), count in groups['asns'].most_common():
+                        write({'type': 'asns', 'source': name, 'key': asn, 'name': as_name, 'count': count})
+                    for country, count in groups['countries'].most_common():
+                        write({'type': 'countries', 'source': name, 'key': country, 'count': count})
+
+        print(f"\n{Colors.SUCCESS}💾 NDJSON Export gespeichert: {filename}{Colors.RESET}")
+
+    def export_blocklist(self, nft_file=None, fail2ban_file=None, state_file=BLOCKLIST_STATE,
+                         min_suspicious=10, min_bots=0, ttl=7 * 86400, min_network=4, ignore=BLOCKLIST_IGNORE):
+        """Aktualisiert die Blockliste aus suspicious_ips/bot_requests und schreibt nftables-/fail2ban-Dateien"""
+        now = time.time()
+        blocklist = Blocklist(state_file, ignore)
+        window_start = self.time_range[0].isoformat() if self.time_range[0] else None
+        blocked = blocklist.update({'suspicious': (self.stats['suspicious_ips'], min_suspicious),
+                                    'bot': (self.stats['bot_requests'], min_bots)},
+                                   window_start, ttl, now)
+        networks = blocklist.networks(min_network, now)
+
+        for filename, render in ((nft_file, blocklist.render_nft), (fail2ban_file, blocklist.render_fail2ban)):
+            if filename:
+                _write_atomic(filename, render(networks, now))
+        blocklist.save()
+
+        addresses = len(blocklist.state['entries'])
+        print(f"\n{Colors.SUCCESS}🛡️  Blockliste: {len(networks):,} Einträge aus {addresses:,} IPs "
+              f"({blocked:,} neu/verlängert){Colors.RESET}")
+        for filename in (nft_file, fail2ban_file):
+            if filename:
+                print(f"   {Colors.GRAY}💾 {filename}{Colors.RESET}")
+        if nft_file:
+            print(f"   {Colors.GRAY}Laden mit: nft -f {nft_file}{Colors.RESET}")
+
+    def export_requests(self, filename):
+        """Exportiert die Einzel-Requests im Zeitfenster als Parquet (.parquet) oder Arrow (.arrow/.feather)
+
+        Einzelne Requests hält nur der Spaltenindex vor, daher nur mit --index.
+        Wörterbuch-Spalten werden direkt als Arrow-Dictionary übernommen.
+        """
+        if pa is None:
+            print(f"{Colors.ERROR}❌ Request-Export benötigt pyarrow (pip install pyarrow){Colors.RESET}")
+            return
+        if not self.index_dir:
+            print(f"{Colors.ERROR}❌ Request-Export benötigt --index{Colors.RESET}")
+            return
+
+        schema = pa.schema([
+            ('time', pa.timestamp('s', tz='UTC')),
+            ('tz_offset_minutes', pa.int16()),
+            ('source_file', pa.dictionary(pa.int32(), pa.string())),
+            ('ip', pa.dictionary(pa.int32(), pa.string())),
+            ('method', pa.dictionary(pa.int32(), pa.string())),
+            ('path', pa.dictionary(pa.int32(), pa.string())),
+            ('status', pa.uint16()),
+            ('size', pa.int64()),
+            ('user_agent', pa.dictionary(pa.int32(), pa.string())),
+            ('request_time', pa.float64()),
+            ('upstream_time', pa.float64()),
+        ])
+        tables = (self._index_table(ColumnIndex(self._index_path(segment['path'])),
+                                    os.path.basename(log_file), schema)
+                  for log_file in self.log_files if os.path.exists(log_file)
+                  for segment in self._plan_log_file(log_file)['segments'])
+        tables = [table for table in tables if table is not None]
+
+        rows = 0
+        if filename.endswith(('.arrow', '.feather')):
+            # Arrow-Dateien erlauben nur ein Wörterbuch pro Spalte - vorher vereinheitlichen
+            table = pa.concat_tables(tables).unify_dictionaries() if tables else schema.empty_table()
+            with pa.ipc.new_file(filename, schema) as writer:
+                writer.write_table(table)
+            rows = table.num_rows
+        else:
+            # Parquet: je Datei eine eigene Row-Group, Wörterbücher dürfen sich unterscheiden
+            with pq.ParquetWriter(filename, schema) as writer:
+                for table in tables:
+                    writer.write_table(table)
+                    rows += table.num_rows
+
+        print(f"\n{Colors.SUCCESS}💾 Request-Export gespeichert: {filename} ({rows:,} Requests){Colors.RESET}")
+
+    def _index_table(self, index, source_file, schema):
+        """Arrow-Tabelle der Index-Zeilen im Zeitfenster (None wenn leer)"""
+        if index.meta is None or not index.meta['rows']:
+            return None
+        epochs = index.column('epoch')
+        if self.epoch_range[0] is not None:
+            selected = np.flatnonzero((epochs >= self.epoch_range[0]) & (epochs <= self.epoch_range[1]))
+        else:
+            selected = np.arange(len(epochs))
+        if not len(selected):
+            return None
+
+        epochs = epochs[selected]
+        tz_minutes = index.column('tz')[selected]
+        sizes = index.column('size')[selected]
+        # Ungültige Zeitstempel, fehlende Zeitzone, "-" als Größe und fehlende
+        # Antwortzeiten werden zu null
+        columns = {
+            'time': pa.array(epochs, mask=epochs == ColumnIndex.INVALID_EPOCH, type=pa.timestamp('s', tz='UTC')),
+            'tz_offset_minutes': pa.array(tz_minutes, mask=tz_minutes == ColumnIndex.NO_TZ),
+            'source_file': pa.DictionaryArray.from_arrays(np.zeros(len(selected), dtype=np.int32), [source_file]),
+            'status': pa.array(index.column('status')[selected]),
+            'size': pa.array(sizes, mask=sizes < 0),
+        }
+        for name in ('request_time', 'upstream_time'):
+            values = index.column(name)[selected]
+            columns[name] = pa.array(values, mask=np.isnan(values))
+        for name in ColumnIndex.DICTIONARY_COLUMNS:
+            columns[name] = pa.DictionaryArray.from_arrays(
+                index.column(name)[selected].astype(np.int32), pa.array(index.strings(name), pa.string()))
+        return pa.table([columns[field.name] for field in schema], schema=schema)
+
+    def follow(self, interval=2.0, top=10):
+        """Live-Modus: folgt allen Log-Dateien und zeigt gleitende Fenster an"""
+        tails = [LogTail(path) for path in self.log_files]
+        windows = [(label, RollingWindow(span, bucket_seconds))
+                   for label, span, bucket_seconds in LIVE_WINDOWS]
+
+        watcher = None
+        if INotify is not None:
+            # Verzeichnisse beobachten, damit auch neu angelegte Dateien (Rotation) auffallen
+            watcher = INotify()
+            watch_flags = inotify_flags.MODIFY | inotify_flags.CREATE | inotify_flags.MOVED_TO
+            for directory in {os.path.dirname(os.path.abspath(path)) for path in self.log_files}:
+                watcher.add_watch(directory, watch_flags)
+
+        next_draw = 0.0
+        try:
+            while True:
+                now = time.time()
+                for _, window in windows:
+                    window.advance(now)
+                for tail in tails:
+                    data = tail.read()
+                    if data:
+                        self._follow_rows(self._log_format(tail.path).findall(data), windows, now)
+
+                if now >= next_draw:
+                    self._print_live(windows, tails, now, top)
+                    next_draw = now + interval
+
+                timeout = max(0.0, min(next_draw - time.time(), FOLLOW_POLL_INTERVAL))
+                if watcher is not None:
+                    watcher.read(timeout=int(timeout * 1000))
+                else:
+                    time.sleep(timeout)
+        except KeyboardInterrupt:
+            print(f"\n{Colors.SUCCESS}✅ Live-Modus beendet{Colors.RESET}")
+        finally:
+            for tail in tails:
+                tail.close()
+            if watcher is not None:
+                watcher.close()
+
+    def _follow_rows(self, rows, windows, now):
+        """Trägt neu gelesene Zeilen (Byte-Tupel) in alle Fenster ein"""
+        for ip, time_raw, _, path, status, size, *_ in rows:
+            timestamp = self.timestamps.decode(_decode_bytes(time_raw))
+            epoch = timestamp[0] if timestamp is not None else now
+            ip = sys.intern(_decode_bytes(ip))
+            status = int(status)
+            size = int(size) if size != b'-' else 0
+            suspicious = self.suspicious_classifier.matches(_decode_bytes(path))
+            for _, window in windows:
+                window.add(epoch, ip, status, size, suspicious)
+
+    def _print_live(self, windows, tails, now, top):
+        """Zeichnet die Live-Ansicht neu (Spalten = Zeitfenster)"""
+        width = 26
+        lines = ["\033[H\033[2J"]
+        lines.append(f"{Colors.HEADER}🔴 NGINX LIVE - {datetime.fromtimestamp(now).strftime('%H:%M:%S')}"
+                     f"{Colors.RESET}  {Colors.GRAY}(Strg+C beendet){Colors.RESET}")
+        lines.append(Colors.colorize("=" * 80, Colors.CYAN))
+        for tail in tails:
+            state = f"{tail.rotations} Rotation(en)" if tail.file else "nicht vorhanden"
+            lines.append(f"   {Colors.CYAN}{os.path.basename(tail.path):<25}{Colors.RESET} {Colors.GRAY}{state}{Colors.RESET}")
+
+        lines.append("")
+        lines.append(" " * 22 + "".join(f"{Colors.BOLD}{label:>{width}}{Colors.RESET}" for label, _ in windows))
+        totals = [window.totals for _, window in windows]
+        rows = [
+            ("Requests", [f"{t['requests']:,}" for t in totals]),
+            ("Requests/s", [f"{window.rate(now):,.1f}" for _, window in windows]),
+            ("Fehlerrate", [f"{t['errors'] / t['requests'] * 100:.1f}%" if t['requests'] else "-" for t in totals]),
+            ("Datenübertragung", [self.format_bytes(t['bytes']) for t in totals]),
+            ("Eindeutige IPs", [f"{len(t['ips']):,}" for t in totals]),
+        ]
+        for name, values in rows:
+            lines.append(f"   {Colors.BOLD}{name:<19}{Colors.RESET}" + "".join(f"{value:>{width}}" for value in values))
+
+        sections = [
+            (f"🌐 TOP {top} IP-ADRESSEN", 'ips', Colors.YELLOW),
+            ("📈 HTTP STATUS CODES", 'status_codes', Colors.GREEN),
+            ("⚠️  VERDÄCHTIGE IPs", 'suspicious_ips', Colors.RED),
+        ]
+        for title, name, color in sections:
+            lines.append(f"\n{Colors.INFO}{title}:{Colors.RESET}")
+            columns = [t[name].most_common(top) for t in totals]
+            for rank in range(max(map(len, columns))):
+                cells = []
+                for column in columns:
+                    if rank < len(column):
+                        key, count = column[rank]
+                        key = f"{str(key)[:width - 10]:<{width - 10}}"
+                        cells.append(f"  {Colors.colorize(key, color)}{count:>8,}")
+                    else:
+                        cells.append(" " * width)
+                lines.append(f"   {Colors.GRAY}{rank + 1:>2}.{Colors.RESET}" + " " * 16 + "".join(cells))
+        print("\n".join(lines), flush=True)
+
+def _parse_chunk(task):
+    """Worker: parst einen Byte-Bereich und gibt die Teil-Statistik zurück"""
+    options, path, source_file, start, end = task
+    analyzer = NginxLogAnalyzer([path], **options)
+    try:
+        return analyzer._parse_range(path, source_file, start, end), analyzer.stats, None, analyzer.line_counts
+    except Exception as e:
+        return 0, None, e, analyzer.line_counts
+
 def main():
     parser = argparse.ArgumentParser(
         description='nginx Multi-Log Access Analyzer mit Zeitfilter',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=f"""
 {Colors.HEADER}VERFÜGBARE LOG-DATEIEN:{Colors.RESET}
-{chr(10).join([f"  {Colors.CYAN}{name}{Colors.RESET}: {path}" for name, path in LOG_FILES.items()])}
+{chr(10).join([f"  {Colors.CYAN}{name}{Colors.RESET}: {' ['.join(split_log_file_entry(entry))}]" for name, entry in LOG_FILES.items()])}
 
 {Colors.HEADER}ZEITFILTER:{Colors.RESET}
   {Colors.GREEN}heute{Colors.RESET}           - Nur heutige Einträge
@@ -449,7 +3523,11 @@ def main():
 {Colors.HEADER}BEISPIELE:{Colors.RESET}
   {Colors.CYAN}{sys.argv[0]} start wiki --zeit heute{Colors.RESET}
   {Colors.CYAN}{sys.argv[0]} alle --zeit diese_woche --csv{Colors.RESET}
+  {Colors.CYAN}{sys.argv[0]} alle --zeit diese_woche --cache --json{Colors.RESET}  (zweiter Lauf ohne Parsen)
   {Colors.CYAN}{sys.argv[0]} immich bilder --zeit dieser_monat{Colors.RESET}
+  {Colors.CYAN}{sys.argv[0]} alle --follow{Colors.RESET}
+  {Colors.CYAN}{sys.argv[0]} alle --zeit heute --inkrementell --blockliste --fail2ban /etc/fail2ban/nginx-blocklist.txt{Colors.RESET}  (Cronjob)
+  {Colors.CYAN}{sys.argv[0]} alle --profil-json profil.ndjson --profil-cprofile analyse.prof --prozesse 1{Colors.RESET}
         """
     )
 
@@ -462,36 +3540,246 @@ def main():
                        default='gesamter_zeitraum',
                        help='Zeitfilter für die Analyse (Standard: gesamter_zeitraum)')
 
+    parser.add_argument('--prozesse', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help='Anzahl paralleler Worker-Prozesse (Standard: Anzahl CPU-Kerne)')
+
+    parser.add_argument('--regeln', '--rules',
+                       help='JSON-Datei mit eigenen bot_patterns / suspicious_patterns')
+
+    parser.add_argument('--inkrementell', '--incremental', action='store_true',
+                       help='Nur neue Log-Zeilen parsen und mit gespeichertem Zustand zusammenführen')
+
+    parser.add_argument('--state-dir', default=STATE_DIR,
+                       help=f'Verzeichnis für Zustandsdateien (Standard: {STATE_DIR})')
+
+    parser.add_argument('--cache', action='store_true',
+                       help='Statistik unveränderter Dateien zwischenspeichern - Bericht/Export ohne erneutes Parsen')
+
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                       help=f'Verzeichnis für den Ergebnis-Cache (Standard: {CACHE_DIR})')
+
+    parser.add_argument('--cache-groesse', '--cache-size', type=float, default=CACHE_MAX_SIZE / 1024 / 1024,
+                       metavar='MB', help=f'Maximale Größe des Ergebnis-Caches (Standard: {CACHE_MAX_SIZE // 1024 // 1024} MB)')
+
+    parser.add_argument('--index', action='store_true',
+                       help='Spaltenindex (numpy) aufbauen/aktualisieren und statt der Rohdaten abfragen')
+
+    parser.add_argument('--index-dir', default=INDEX_DIR,
+                       help=f'Verzeichnis für den Spaltenindex (Standard: {INDEX_DIR})')
+
+    parser.add_argument('--ohne-rotierte', '--no-rotated', action='store_true',
+                       help='Rotierte Logs (access.log.1, .2.gz, ...) nicht mit einlesen')
+
+    parser.add_argument('--engine', choices=['bytes', 'numpy', 'text'], default=DEFAULT_ENGINE,
+                       help='Parser: numpy (bytes + Array-Aggregation für Zeit/Status), bytes (mmap + Bytes-Regex) '
+                            f'oder text (zeilenweise) (Standard: {DEFAULT_ENGINE})')
+
+    parser.add_argument('--naeherung', '--approximate', action='store_true',
+                       help='Näherungsmodus: HyperLogLog/Space-Saving mit fester Speichergröße')
+
+    parser.add_argument('--ip-fehler', type=float, default=0.01,
+                       help='Näherungsmodus: Standardfehler der eindeutigen IPs (Standard: 0.01 = 1%%)')
+
+    parser.add_argument('--top-fehler', type=float, default=0.0001,
+                       help='Näherungsmodus: max. Überschätzung der Top-Listen als Anteil aller Requests (Standard: 0.0001)')
+
+    parser.add_argument('--verfolgen', '--follow', action='store_true',
+                       help='Live-Modus: Logs fortlaufend lesen, gleitende Fenster (1/5/60 min) anzeigen')
+
+    parser.add_argument('--intervall', '--interval', type=float, default=2.0,
+                       help='Aktualisierungsintervall des Live-Modus in Sekunden (Standard: 2)')
+
     parser.add_argument('--csv', action='store_true',
                        help='Exportiere Ergebnisse als CSV')
 
     parser.add_argument('--csv-file',
                        help='CSV Dateiname (automatisch generiert wenn nicht angegeben)')
 
+    parser.add_argument('--json', action='store_true',
+                       help='Exportiere alle Statistiken als NDJSON (eine Zeile pro Eintrag)')
+
+    parser.add_argument('--json-file',
+                       help='NDJSON Dateiname (automatisch generiert wenn nicht angegeben)')
+
+    parser.add_argument('--parquet', metavar='DATEI',
+                       help='Einzel-Requests im Zeitfenster als Parquet (.arrow/.feather: Arrow) exportieren, benötigt --index')
+
+    parser.add_argument('--log-format', metavar='FORMAT',
+                       help=f'log_format für alle gewählten Dateien ({", ".join(LOG_FORMATS)} oder nginx-Format-String)')
+
+    parser.add_argument('--netze', '--networks', action='store_true',
+                       help='IPs zusätzlich nach Netz (/24, /48) zusammenfassen')
+
+    parser.add_argument('--asn-datei', '--asn-db', metavar='DATEI',
+                       help='CIDR/Bereich -> ASN/Land Datei (CSV oder iptoasn-TSV), aktiviert ASN-/Länder-Auswertung')
+
+    parser.add_argument('--blockliste', '--blocklist', nargs='?', const=BLOCKLIST_NFT, metavar='DATEI',
+                       help=f'Blockliste als nftables-Datei schreiben (Standard: {BLOCKLIST_NFT})')
+
+    parser.add_argument('--fail2ban', metavar='DATEI',
+                       help='Blockliste zusätzlich als fail2ban-Liste (eine IP/ein Netz pro Zeile) schreiben')
+
+    parser.add_argument('--block-schwelle', type=int, default=10, metavar='N',
+                       help='Ab N verdächtigen Requests sperren (Standard: 10, 0 = aus)')
+
+    parser.add_argument('--block-bots', type=int, default=0, metavar='N',
+                       help='Ab N Bot-Requests sperren (Standard: 0 = aus)')
+
+    parser.add_argument('--block-dauer', type=float, default=168, metavar='STUNDEN',
+                       help='Sperrdauer ab der letzten Aktivität (Standard: 168 = 7 Tage)')
+
+    parser.add_argument('--block-netz', type=int, default=4, metavar='N',
+                       help='Ab N gesperrten IPs im selben /24 bzw. /48 das ganze Netz sperren (0 = aus)')
+
+    parser.add_argument('--block-ignorieren', '--block-ignore', action='append', default=[], metavar='NETZ',
+                       help='Netz nie sperren (mehrfach möglich, zusätzlich zu Loopback/privaten Netzen)')
+
+    parser.add_argument('--profil', '--profile', action='store_true',
+                       help='Laufzeit-Profil ausgeben: Zeit je Stufe, Zeilen/s und verworfene Zeilen je Datei, Spitzen-Speicher')
+
+    parser.add_argument('--profil-json', '--profile-json', metavar='DATEI',
+                       help='Profil zusätzlich als JSON-Zeile an DATEI anhängen (Trendauswertung, impliziert --profil)')
+
+    parser.add_argument('--profil-cprofile', '--profile-cprofile', metavar='DATEI',
+                       help='cProfile-Statistik des Hauptprozesses nach DATEI schreiben (pstats/snakeviz, impliziert --profil)')
+
+    parser.add_argument('--profil-tracemalloc', '--profile-tracemalloc', metavar='DATEI',
+                       help='tracemalloc-Snapshot nach DATEI schreiben (impliziert --profil, deutlich langsamer)')
+
     args = parser.parse_args()
 
     # Log-Dateien auswählen
     if 'alle' in args.logs:
-        selected_logs = list(LOG_FILES.values())
+        entries = list(LOG_FILES.values())
     else:
-        selected_logs = [LOG_FILES[log] for log in args.logs if log in LOG_FILES]
+        entries = [LOG_FILES[log] for log in args.logs if log in LOG_FILES]
 
-    if not selected_logs:
+    if not entries:
         print(f"{Colors.ERROR}❌ Keine gültigen Log-Dateien ausgewählt!{Colors.RESET}")
         sys.exit(1)
 
-    # Analyzer initialisieren und ausführen
-    analyzer = NginxLogAnalyzer(selected_logs, args.zeit)
+    log_formats = dict(map(split_log_file_entry, entries))
+    if args.log_format:
+        log_formats = dict.fromkeys(log_formats, args.log_format)
+    selected_logs = list(log_formats)
+    try:
+        # Formate vorab kompilieren, damit Fehler nicht erst in den Workern auffallen
+        for log_format in set(log_formats.values()):
+            compile_log_format(log_format)
+    except (ValueError, re.error) as e:
+        print(f"{Colors.ERROR}❌ log_format fehlerhaft: {e}{Colors.RESET}")
+        sys.exit(1)
 
-    if analyzer.parse_log_files():
-        analyzer.print_report()
+    rules = None
+    if args.regeln:
+        try:
+            rules = load_rules(args.regeln)
+            # Regeln vorab kompilieren, damit Fehler nicht erst in den Workern auffallen
+            PatternClassifier(rules.get('bot_patterns', []))
+            PatternClassifier(rules.get('suspicious_patterns', []))
+        except (OSError, ValueError, re.error) as e:
+            print(f"{Colors.ERROR}❌ Regel-Datei fehlerhaft: {e}{Colors.RESET}")
+            sys.exit(1)
+
+    enricher = None
+    if args.netze or args.asn_datei:
+        try:
+            enricher = IpEnricher(args.asn_datei)
+        except (OSError, ValueError) as e:
+            print(f"{Colors.ERROR}❌ ASN-Datei fehlerhaft: {e}{Colors.RESET}")
+            sys.exit(1)
 
-        if args.csv:
-            analyzer.export_csv(args.csv_file)
+    if args.blockliste or args.fail2ban:
+        try:
+            block_ignore = BLOCKLIST_IGNORE + [str(ipaddress.ip_network(network, strict=False))
+                                               for network in args.block_ignorieren]
+        except ValueError as e:
+            print(f"{Colors.ERROR}❌ --block-ignorieren: {e}{Colors.RESET}")
+            sys.exit(1)
+
+    if args.index and np is None:
+        print(f"{Colors.ERROR}❌ --index benötigt numpy (pip install numpy){Colors.RESET}")
+        sys.exit(1)
+
+    if args.engine == 'numpy' and np is None:
+        print(f"{Colors.ERROR}❌ --engine numpy benötigt numpy (pip install numpy){Colors.RESET}")
+        sys.exit(1)
+
+    if args.parquet and (not args.index or pa is None):
+        print(f"{Colors.ERROR}❌ --parquet benötigt --index und pyarrow (pip install pyarrow){Colors.RESET}")
+        sys.exit(1)
+
+    if args.verfolgen:
+        # Live-Modus: Zeitfilter, Index und Zustand spielen keine Rolle
+        NginxLogAnalyzer(selected_logs, jobs=1, rules=rules,
+                         log_formats=log_formats).follow(interval=args.intervall)
+        return
+
+    sketch = None
+    if args.naeherung:
+        if not 0 < args.ip_fehler < 1 or not 0 < args.top_fehler < 1:
+            print(f"{Colors.ERROR}❌ --ip-fehler und --top-fehler müssen zwischen 0 und 1 liegen{Colors.RESET}")
+            sys.exit(1)
+        # HyperLogLog: Fehler 1.04/sqrt(2^p); Space-Saving: Überschätzung <= N/k
+        sketch = {
+            'hll_precision': min(18, max(4, math.ceil(math.log2((1.04 / args.ip_fehler) ** 2)))),
+            'topk_capacity': math.ceil(1 / args.top_fehler),
+        }
+
+    profiler = None
+    if args.profil or args.profil_json or args.profil_cprofile or args.profil_tracemalloc:
+        profiler = Profiler(args.profil_cprofile, args.profil_tracemalloc)
+        profiler.start()
+
+    # Analyzer initialisieren und ausführen (der Index ist selbst inkrementell,
+    # der Zustand der inkrementellen Analyse ersetzt den Cache)
+    analyzer = NginxLogAnalyzer(selected_logs, args.zeit, jobs=args.prozesse,
+                                state_dir=args.state_dir if args.inkrementell and not args.index else None,
+                                cache_dir=args.cache_dir if args.cache and not args.inkrementell and not args.index else None,
+                                cache_size=int(args.cache_groesse * 1024 * 1024),
+                                rules=rules, include_rotated=not args.ohne_rotierte,
+                                engine=args.engine, index_dir=args.index_dir if args.index else None,
+                                sketch=sketch, log_formats=log_formats, enricher=enricher, profiler=profiler)
+
+    if analyzer.parse_log_files():
+        with analyzer._stage('bericht'):
+            analyzer.print_report()
+
+        with analyzer._stage('export'):
+            if args.csv:
+                analyzer.export_csv(args.csv_file)
+
+            if args.json:
+                analyzer.export_ndjson(args.json_file)
+
+            if args.parquet:
+                analyzer.export_requests(args.parquet)
+
+            if args.blockliste or args.fail2ban:
+                try:
+                    analyzer.export_blocklist(args.blockliste, args.fail2ban, min_suspicious=args.block_schwelle,
+                                              min_bots=args.block_bots, ttl=args.block_dauer * 3600,
+                                              min_network=args.block_netz, ignore=block_ignore)
+                except OSError as e:
+                    print(f"{Colors.ERROR}❌ Blockliste konnte nicht geschrieben werden: {e}{Colors.RESET}")
+                    sys.exit(1)
     else:
         print(f"{Colors.ERROR}❌ Keine Log-Dateien konnten verarbeitet werden!{Colors.RESET}")
         sys.exit(1)
 
+    if profiler:
+        profiler.stop()
+        summary = profiler.summary(logs=selected_logs, time_filter=args.zeit, engine=args.engine,
+                                   jobs=analyzer.jobs, index=args.index, incremental=args.inkrementell,
+                                   approximate=args.naeherung)
+        profiler.print_summary(summary)
+        if args.profil_json:
+            try:
+                profiler.export_json(args.profil_json, summary)
+                print(f"\n{Colors.SUCCESS}✓ Profil angehängt an: {args.profil_json}{Colors.RESET}")
+            except OSError as e:
+                print(f"{Colors.ERROR}❌ Profil konnte nicht geschrieben werden: {e}{Colors.RESET}")
+
     print(f"\n{Colors.SUCCESS}✅ Analyse abgeschlossen!{Colors.RESET}")
 
 if __name__ == "__main__":
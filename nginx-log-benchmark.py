@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Benchmark für nginx-log-analyzer.py
+Erzeugt realistische Access-Logs in wählbarer Größe und Mischung, misst die
+Parser-Engines (text / bytes) inkl. Spitzen-Speicher (RSS) und schlüsselt die
+Text-Pipeline nach Stufen auf (Lesen, Regex, Zeitfilter, Statistik, Bericht).
+Ergebnisse können als JSON gespeichert und mit früheren Läufen verglichen werden.
+
+BEISPIELE:
+    ./nginx-log-benchmark.py                       # 500.000 synthetische Zeilen
+    ./nginx-log-benchmark.py --zeilen 2000000 --bot-anteil 0.4 --fehlerrate 0.2
+    ./nginx-log-benchmark.py --ips 200000 --agent-laenge 400 --schiefe 3
+    ./nginx-log-benchmark.py --json benchmark.json   # Lauf anhängen + vergleichen
+    ./nginx-log-benchmark.py --datei /var/log/nginx/immich_access.log
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ANALYZER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nginx-log-analyzer.py')
+
+# Bausteine für synthetische Logs
+BROWSER_AGENTS = [
+    'Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148 Safari/604.1',
+] + [f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/{v}.0 Safari/537.36'
+     for v in range(100, 140)]
+BOT_AGENTS = [
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+    'Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)',
+    'curl/8.4.0',
+    'python-requests/2.31.0',
+    'Wget/1.21.4',
+]
+SUSPICIOUS_PATHS = ['/.env', '/wp-login.php', '/wp-admin/setup-config.php', '/phpmyadmin/index.php',
+                    '/cgi-bin/luci', '/admin/.git/config', '/shell?cd+/tmp']
+ERROR_STATUSES = [404] * 6 + [400, 401, 403, 499, 500, 502, 503]
+OK_STATUSES = [200] * 12 + [204, 206, 301, 302, 304]
+METHODS = ['GET'] * 16 + ['POST', 'POST', 'PUT', 'HEAD']
+
+def load_analyzer():
+    """Lädt nginx-log-analyzer.py als Modul (Dateiname enthält Bindestriche)"""
+    spec = importlib.util.spec_from_file_location('nginx_log_analyzer', ANALYZER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Für Worker-Prozesse (pickle) muss das Modul unter seinem Namen auffindbar sein
+    sys.modules['nginx_log_analyzer'] = module
+    spec.loader.exec_module(module)
+    return module
+
+def generate_log(path, lines, seed=42, bot_share=0.1, error_rate=0.05, suspicious_share=0.01,
+                 unique_ips=5000, agent_length=0, days=2, skew=1.0, jitter=2):
+    """Schreibt ein synthetisches Access-Log im combined Format
+
+    - IPs folgen einer Zipf-Verteilung (wenige Vielnutzer, langer Schwanz)
+    - agent_length > 0 verlängert Browser-User-Agents auf mindestens so viele Zeichen
+    - skew > 1 verdichtet den Traffic zum Ende des Zeitraums (Lastspitzen "heute"),
+      jitter lässt Zeitstempel wie bei nginx leicht ungeordnet erscheinen
+    """
+    rng = random.Random(seed)
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(unique_ips)]
+    ip_weights = []
+    total = 0.0
+    for rank in range(unique_ips):
+        total += 1.0 / (rank + 1)
+        ip_weights.append(total)
+
+    browsers = BROWSER_AGENTS
+    if agent_length:
+        padding = ' '.join(f'Ext{n}/1.{n}' for n in range(agent_length // 8 + 1))
+        browsers = [f'{agent} {padding}'[:max(agent_length, len(agent))] for agent in BROWSER_AGENTS]
+    paths = [f'/api/assets/{n}/thumbnail' for n in range(3000)] + ['/', '/api/server/ping', '/favicon.ico']
+
+    end = datetime.now().replace(microsecond=0)
+    span = days * 86400
+    time_cache = {}
+
+    with open(path, 'w', encoding='utf-8') as f:
+        batch = 10000
+        for offset in range(0, lines, batch):
+            count = min(batch, lines - offset)
+            chosen_ips = rng.choices(ips, cum_weights=ip_weights, k=count)
+            out = []
+            for i in range(count):
+                position = (offset + i) / lines
+                seconds_before_end = int(span * (1.0 - position) ** skew) + rng.randint(0, jitter)
+                timestamp = time_cache.get(seconds_before_end)
+                if timestamp is None:
+                    if len(time_cache) > 100000:
+                        time_cache.clear()
+                    timestamp = time_cache[seconds_before_end] = \
+                        (end - timedelta(seconds=seconds_before_end)).strftime('%d/%b/%Y:%H:%M:%S')
+
+                agent = rng.choice(BOT_AGENTS) if rng.random() < bot_share else rng.choice(browsers)
+                page = rng.choice(SUSPICIOUS_PATHS) if rng.random() < suspicious_share else rng.choice(paths)
+                status = rng.choice(ERROR_STATUSES) if rng.random() < error_rate else rng.choice(OK_STATUSES)
+                size = '-' if status == 304 else rng.randint(100, 90000)
+                out.append(f'{chosen_ips[i]} - - [{timestamp} +0000] "{rng.choice(METHODS)} {page} HTTP/1.1" '
+                           f'{status} {size} "-" "{agent}"\n')
+            f.write(''.join(out))
+
+def peak_rss_mb():
+    """Spitzen-Speicher (maxrss) des aktuellen Prozesses in MB, None wenn unbekannt"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def run_engine(log_file, engine, time_filter):
+    """Parst log_file mit einer Engine, gibt (Sekunden, Zeilen, Bericht, RSS) zurück"""
+    analyzer_module = load_analyzer()
+    analyzer = analyzer_module.NginxLogAnalyzer([log_file], time_filter, jobs=1,
+                                                include_rotated=False, engine=engine)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        started = time.perf_counter()
+        analyzer.parse_log_files()
+        elapsed = time.perf_counter() - started
+        report_start = output.tell()
+        analyzer.print_report()
+    return elapsed, analyzer.stats['total_requests'], output.getvalue()[report_start:], peak_rss_mb()
+
+def run_stages(log_file, time_filter):
+    """Misst die Stufen der Text-Pipeline einzeln, gibt ({Stufe: Sekunden}, RSS) zurück
+
+    Die Stufen laufen nacheinander über alle Zeilen statt verschränkt - die
+    Summe liegt daher etwas über einem normalen Lauf (Zwischenlisten).
+    """
+    analyzer_module = load_analyzer()
+    analyzer = analyzer_module.NginxLogAnalyzer([log_file], time_filter, jobs=1,
+                                                include_rotated=False, engine='text')
+    source_file = os.path.basename(log_file)
+    stages = {}
+
+    started = time.perf_counter()
+    with analyzer_module.open_log(log_file) as f:
+        raw_lines = f.readlines()
+    stages['lesen'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    match = analyzer.log_pattern.match
+    entries = []
+    for raw_line in raw_lines:
+        parsed = match(raw_line.decode('utf-8', errors='ignore').strip())
+        if parsed:
+            entries.append(parsed.groupdict())
+    stages['regex'] = time.perf_counter() - started
+    del raw_lines
+
+    started = time.perf_counter()
+    decode = analyzer.timestamps.decode
+    kept = []
+    for entry in entries:
+        timestamp = decode(entry['time'])
+        if analyzer._is_in_time_range(timestamp):
+            kept.append((entry, timestamp))
+    stages['zeitfilter'] = time.perf_counter() - started
+    del entries
+
+    started = time.perf_counter()
+    for entry, timestamp in kept:
+        entry['source_file'] = source_file
+        analyzer._update_stats(entry, timestamp)
+    stages['statistik'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.print_report()
+    stages['bericht'] = time.perf_counter() - started
+
+    return stages, peak_rss_mb()
+
+def measure(function, *args):
+    """Führt function in einem frischen Prozess aus, damit der RSS je Lauf stimmt"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(function, *args).result()
+
+def load_history(path):
+    """Frühere Läufe aus der JSON-Datei (Liste), leer wenn nicht vorhanden"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return []
+    return history if isinstance(history, list) else [history]
+
+def save_history(path, history):
+    """Schreibt die Lauf-Historie atomar"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+def format_change(colors, new, old, higher_is_better=True):
+    """Formatiert die relative Änderung new/old farbig"""
+    if not old:
+        return ''
+    change = (new / old - 1.0) * 100
+    better = change >= 0 if higher_is_better else change <= 0
+    color = colors.GREEN if better else colors.RED
+    return f" {color}({change:+.1f}%){colors.RESET}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark der nginx-log-analyzer Parser-Engines')
+    parser.add_argument('--datei', help='Vorhandene Log-Datei statt synthetischer Daten')
+    parser.add_argument('--zeilen', type=int, default=500000,
+                        help='Anzahl synthetischer Zeilen (Standard: 500000)')
+    parser.add_argument('--bot-anteil', type=float, default=0.1,
+                        help='Anteil Bot-User-Agents 0..1 (Standard: 0.1)')
+    parser.add_argument('--fehlerrate', type=float, default=0.05,
+                        help='Anteil 4xx/5xx-Antworten 0..1 (Standard: 0.05)')
+    parser.add_argument('--verdaechtig-anteil', type=float, default=0.01,
+                        help='Anteil verdächtiger Pfade 0..1 (Standard: 0.01)')
+    parser.add_argument('--ips', type=int, default=5000,
+                        help='Anzahl unterschiedlicher Client-IPs (Standard: 5000)')
+    parser.add_argument('--agent-laenge', type=int, default=0,
+                        help='Browser-User-Agents auf mind. N Zeichen verlängern (Standard: aus)')
+    parser.add_argument('--tage', type=int, default=2,
+                        help='Zeitraum der synthetischen Daten in Tagen (Standard: 2)')
+    parser.add_argument('--schiefe', type=float, default=1.0,
+                        help='>1 verdichtet den Traffic zum Ende des Zeitraums (Standard: 1 = gleichmäßig)')
+    parser.add_argument('--seed', type=int, default=42, help='Startwert des Zufallsgenerators')
+    parser.add_argument('--wiederholungen', type=int, default=3,
+                        help='Läufe je Engine, gewertet wird der schnellste (Standard: 3)')
+    parser.add_argument('--zeit', default='gesamter_zeitraum',
+                        choices=['heute', 'diese_woche', 'dieser_monat', 'gesamter_zeitraum'])
+    parser.add_argument('--ohne-stufen', action='store_true',
+                        help='Stufen-Aufschlüsselung der Text-Pipeline überspringen')
+    parser.add_argument('--json', metavar='DATEI',
+                        help='Ergebnis an JSON-Datei anhängen und mit dem letzten Lauf vergleichen')
+    args = parser.parse_args()
+
+    analyzer_module = load_analyzer()
+    Colors = analyzer_module.Colors
+
+    generator_options = {
+        'zeilen': args.zeilen, 'seed': args.seed, 'bot_anteil': args.bot_anteil,
+        'fehlerrate': args.fehlerrate, 'verdaechtig_anteil': args.verdaechtig_anteil,
+        'ips': args.ips, 'agent_laenge': args.agent_laenge, 'tage': args.tage,
+        'schiefe': args.schiefe,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = args.datei
+        if log_file is None:
+            log_file = os.path.join(tmp, 'bench_access.log')
+            print(f"{Colors.INFO}⚙ Erzeuge {args.zeilen:,} synthetische Zeilen...{Colors.RESET}")
+            generate_log(log_file, args.zeilen, seed=args.seed, bot_share=args.bot_anteil,
+                         error_rate=args.fehlerrate, suspicious_share=args.verdaechtig_anteil,
+                         unique_ips=args.ips, agent_length=args.agent_laenge, days=args.tage,
+                         skew=args.schiefe)
+
+        size = os.path.getsize(log_file)
+        print(f"{Colors.INFO}📁 {log_file} ({size / 1024 / 1024:.1f} MB){Colors.RESET}")
+
+        print(f"\n{Colors.HEADER}⏱ Engines (bester von {args.wiederholungen}){Colors.RESET}")
+        results = {}
+        # numpy-Engine nur, wenn numpy installiert ist
+        engines = ('text', 'bytes', 'numpy') if importlib.util.find_spec('numpy') else ('text', 'bytes')
+        for engine in engines:
+            best = None
+            peak = None
+            for _ in range(args.wiederholungen):
+                elapsed, lines, report, rss = measure(run_engine, log_file, engine, args.zeit)
+                best = elapsed if best is None else min(best, elapsed)
+                if rss is not None:
+                    peak = rss if peak is None else max(peak, rss)
+            results[engine] = {
+                'sekunden': round(best, 4),
+                'zeilen': lines,
+                'zeilen_pro_s': round(lines / best),
+                'mb_pro_s': round(size / best / 1024 / 1024, 2),
+                'peak_rss_mb': round(peak, 1) if peak is not None else None,
+                'bericht': report,
+            }
+            rss_text = f"{peak:>8.1f} MB RSS" if peak is not None else ''
+            print(f"   {Colors.BOLD}{engine:<6}{Colors.RESET} {best:>7.2f} s  "
+                  f"{Colors.GREEN}{lines / best:>12,.0f} Zeilen/s{Colors.RESET}  "
+                  f"{size / best / 1024 / 1024:>7.1f} MB/s  {rss_text}")
+
+        stages = None
+        if not args.ohne_stufen:
+            stages, stage_rss = measure(run_stages, log_file, args.zeit)
+            total = sum(stages.values())
+            print(f"\n{Colors.HEADER}⏱ Stufen der Text-Pipeline{Colors.RESET}")
+            for stage, seconds in stages.items():
+                print(f"   {stage:<12} {seconds:>7.2f} s  {seconds / total * 100:>5.1f}%")
+            if stage_rss is not None:
+                print(f"   {Colors.GRAY}Spitzen-RSS (alle Zeilen im Speicher): {stage_rss:.1f} MB{Colors.RESET}")
+            stages = {stage: round(seconds, 4) for stage, seconds in stages.items()}
+
+    identical = all(result['bericht'] == results['text']['bericht'] for result in results.values())
+    print()
+    for engine in engines[1:]:
+        speedup = results['text']['sekunden'] / results[engine]['sekunden']
+        print(f"{Colors.BOLD}Beschleunigung {engine} gegenüber text:{Colors.RESET} {Colors.GREEN}{speedup:.2f}x{Colors.RESET}")
+    if identical:
+        print(f"{Colors.SUCCESS}✓ Berichte identisch{Colors.RESET}")
+    else:
+        print(f"{Colors.ERROR}❌ Berichte unterscheiden sich!{Colors.RESET}")
+
+    if args.json:
+        run = {
+            'zeitpunkt': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plattform': platform.platform(),
+            'cpu': platform.processor() or platform.machine(),
+            'datei': args.datei,
+            'generator': None if args.datei else generator_options,
+            'zeitfilter': args.zeit,
+            'groesse_bytes': size,
+            'engines': {engine: {key: value for key, value in result.items() if key != 'bericht'}
+                        for engine, result in results.items()},
+            'stufen': stages,
+            'berichte_identisch': identical,
+        }
+        history = load_history(args.json)
+        if history:
+            previous = history[-1]
+            print(f"\n{Colors.HEADER}📈 Vergleich mit Lauf vom {previous.get('zeitpunkt', '?')}{Colors.RESET}")
+            for engine, result in run['engines'].items():
+                old = previous.get('engines', {}).get(engine)
+                if not old:
+                    continue
+                line = f"   {engine:<6} {result['zeilen_pro_s']:>12,} Zeilen/s" + \
+                       format_change(Colors, result['zeilen_pro_s'], old.get('zeilen_pro_s'))
+                if result['peak_rss_mb'] is not None and old.get('peak_rss_mb'):
+                    line += f"  {result['peak_rss_mb']:>8.1f} MB RSS" + \
+                            format_change(Colors, result['peak_rss_mb'], old['peak_rss_mb'], higher_is_better=False)
+                print(line)
+            if [previous.get(key) for key in ('generator', 'datei', 'zeitfilter')] != \
+                    [run[key] for key in ('generator', 'datei', 'zeitfilter')]:
+                print(f"   {Colors.WARNING}⚠ Eingabedaten unterscheiden sich vom Vergleichslauf{Colors.RESET}")
+        history.append(run)
+        save_history(args.json, history)
+        print(f"{Colors.SUCCESS}💾 Ergebnis gespeichert: {args.json}{Colors.RESET}")
+
+    if not identical:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
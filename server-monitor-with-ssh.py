@@ -2,13 +2,14 @@
 Benötigte Python Bibliotheken:
 - psutil: System and process utilities
 - requests: HTTP library for Pushover API
+- jeepney (optional): D-Bus, Dienst-Status per Event statt Polling
 
 Installation auf Arch Linux:
-    sudo pacman -S python-psutil python-requests
+    sudo pacman -S python-psutil python-requests python-jeepney
 
 Installation auf Debian/Ubuntu:
     sudo apt update
-    sudo apt install python3-psutil python3-requests
+    sudo apt install python3-psutil python3-requests python3-jeepney
 
 Note: Installing via system package manager (pacman/apt) is preferred
 as it integrates better with the system package management and
@@ -17,7 +18,7 @@ ensures compatibility with system updates.
 Alternative installation mit pip (für den Fall das!):
     sudo pacman -S python-pip  # Arch Linux
     sudo apt install python3-pip  # Debian/Ubuntu
-    pip install psutil requests
+    pip install psutil requests jeepney
 
 
 Funktionen bis jetzt 17.11.24:
@@ -35,35 +36,698 @@ import psutil
 import requests
 import time
 from datetime import datetime
+from collections import Counter, defaultdict
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import subprocess
+import threading
+import queue
+import json
+import os
 import re
 
+try:
+    from jeepney import DBusAddress, HeaderFields, MatchRule, message_bus, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+except ImportError:
+    open_dbus_connection = None  # Kein D-Bus: Dienste werden per systemctl abgefragt
+
+# Übergangszustände (Start/Stop/Reload laufen noch) lösen zunächst keine Meldung
+# aus, sonst würde jeder Neustart als Ausfall + Wiederherstellung gemeldet. Hängt
+# ein Dienst länger als TRANSITION_GRACE Sekunden darin (z.B. Restart= in einer
+# Absturzschleife: activating/auto-restart), gilt er als ausgefallen
+TRANSITIONAL_STATES = ('activating', 'deactivating', 'reloading')
+TRANSITION_GRACE = 60
+
+# Zustand über Neustarts hinweg (Journal-Cursor der SSH-Überwachung)
+STATE_DIR = os.path.expanduser('~/.cache/server-monitor')
+SSH_CURSOR_FILE = os.path.join(STATE_DIR, 'ssh.cursor')
+SSH_UNITS = ['sshd']
+
+# Erfolgreiche Anmeldung, IPv4 und IPv6 (auch ::ffff:1.2.3.4 und fe80::1%eth0)
+SSH_LOGIN_PATTERN = re.compile(r'Accepted ([\w/-]+) for (\S+) from ([0-9A-Fa-f:.]+(?:%\S+)?) port (\d+)')
+
+# Pushover-Versand: Alarme innerhalb von ALERT_COALESCE_WINDOW Sekunden werden
+# zu einer Nachricht zusammengefasst, zwischen zwei Requests liegen mindestens
+# ALERT_MIN_INTERVAL Sekunden, Fehlversuche werden mit exponentiellem Backoff
+# (max. ALERT_BACKOFF_MAX Sekunden) wiederholt
+PUSHOVER_URL = 'https://api.pushover.net/1/messages.json'
+PUSHOVER_MAX_LENGTH = 1024
+ALERT_COALESCE_WINDOW = 2.0
+ALERT_MIN_INTERVAL = 1.0
+ALERT_QUEUE_SIZE = 100
+ALERT_MAX_RETRIES = 5
+ALERT_BACKOFF_MAX = 300
+
+# Messwerte: Ringpuffer je Kennzahl (bei 2 s Takt gut 2 Stunden Verlauf).
+# Eine "Platte voll in N Stunden"-Prognose braucht mindestens DISK_TREND_MIN_SPAN
+# Sekunden Verlauf; Pseudo-Dateisysteme werden nicht überwacht
+METRICS_CAPACITY = 4096
+DISK_TREND_MIN_SPAN = 600
+DISK_IGNORE_FSTYPES = ('squashfs', 'tmpfs', 'devtmpfs', 'overlay', 'iso9660')
+
+# Prometheus/OpenMetrics-Export (/metrics)
+METRICS_PREFIX = 'server_monitor_'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class SystemctlServiceBackend:
+    """Dienst-Status aller Units mit einem einzigen `systemctl show` Aufruf"""
+
+    def states(self, services):
+        """Liefert {Dienst: ActiveState} - ein Prozess, egal wie viele Dienste"""
+        services = list(services)
+        if not services:
+            return {}
+        result = subprocess.run(['systemctl', 'show', '--property=ActiveState', '--', *services],
+                                capture_output=True, text=True, timeout=30)
+        # Ein Block pro Unit in Aufrufreihenfolge, getrennt durch Leerzeilen
+        blocks = result.stdout.strip().split('\n\n') if result.stdout.strip() else []
+        if len(blocks) == len(services):
+            return {service: block.partition('=')[2].strip() for service, block in zip(services, blocks)}
+        if len(services) == 1:
+            raise RuntimeError(result.stderr.strip() or f"no state for {services[0]}")
+        # Ungültiger Unit-Name: einzeln nachfragen, damit ein Tippfehler nicht alle Dienste blind macht
+        states = {}
+        for service in services:
+            try:
+                states.update(self.states([service]))
+            except RuntimeError as e:
+                print(f"Error checking service {service}: {e}")
+                states[service] = 'unknown'
+        return states
+
+    def poll(self, services):
+        """Zustände seit dem letzten Aufruf - beim Polling einfach alle"""
+        return self.states(services)
+
+    def wait(self, timeout):
+        """Wartet bis zum nächsten Durchlauf (Event-Backends wachen bei Änderungen früher auf)"""
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+class EventServiceBackend(SystemctlServiceBackend):
+    """Basis für ereignisgesteuerte Backends: Änderungen kommen über eine Queue"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.pending = threading.Event()
+
+    def listening(self):
+        return True
+
+    def push(self, service, state):
+        self.events.put((service, state))
+        self.pending.set()
+
+    def poll(self, services):
+        """Nur geänderte Dienste (letzter Zustand gewinnt), ohne einen Prozess zu starten"""
+        if not self.listening():
+            return self.states(services)
+        self.pending.clear()
+        changes = {}
+        while True:
+            try:
+                service, state = self.events.get_nowait()
+            except queue.Empty:
+                return changes
+            changes[service] = state
+
+    def wait(self, timeout):
+        if self.listening():
+            self.pending.wait(timeout)
+        else:
+            time.sleep(timeout)
+
+class DbusServiceBackend(EventServiceBackend):
+    """Dienst-Status per D-Bus-Signal (PropertiesChanged) statt Polling
+
+    Ein Hintergrund-Thread abonniert die Statusänderungen bei systemd und legt
+    sie in die Queue. Bricht die Verbindung ab, wird wieder per systemctl gefragt.
+    """
+
+    def __init__(self, services, timeout=5):
+        super().__init__()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._error = None
+        self.thread = threading.Thread(target=self._listen, args=(list(services),),
+                                       name='dbus-services', daemon=True)
+        self.thread.start()
+        if not self._ready.wait(timeout) or self._error:
+            self._stop.set()
+            raise ConnectionError(self._error or 'D-Bus timeout')
+
+    def listening(self):
+        return self.thread.is_alive()
+
+    def _listen(self, services):
+        try:
+            connection = open_dbus_connection(bus='SYSTEM')
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+
+        try:
+            manager = DBusAddress('/org/freedesktop/systemd1', bus_name='org.freedesktop.systemd1',
+                                  interface='org.freedesktop.systemd1.Manager')
+            # Ohne Subscribe verschickt systemd keine Unit-Signale
+            unwrap_msg(connection.send_and_get_reply(new_method_call(manager, 'Subscribe')))
+            # Objektpfad je Unit (Aliase wie sshd.service -> ssh.service teilen sich einen)
+            units = defaultdict(list)
+            for service in services:
+                path, = unwrap_msg(connection.send_and_get_reply(
+                    new_method_call(manager, 'LoadUnit', 's', (service,))))
+                units[path].append(service)
+            rule = MatchRule(type='signal', sender='org.freedesktop.systemd1',
+                             interface='org.freedesktop.DBus.Properties', member='PropertiesChanged',
+                             path_namespace='/org/freedesktop/systemd1/unit')
+            unwrap_msg(connection.send_and_get_reply(message_bus.AddMatch(rule)))
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            connection.close()
+            return
+
+        self._ready.set()
+        try:
+            with connection.filter(rule, bufsize=1024) as matches:
+                while not self._stop.is_set():
+                    try:
+                        message = connection.recv_until_filtered(matches, timeout=1)
+                    except TimeoutError:
+                        continue
+                    interface, changed, _ = message.body
+                    if interface != 'org.freedesktop.systemd1.Unit' or 'ActiveState' not in changed:
+                        continue
+                    for service in units.get(message.header.fields[HeaderFields.path], ()):
+                        self.push(service, changed['ActiveState'][1])
+        except Exception as e:
+            print(f"D-Bus connection lost, falling back to systemctl polling: {e}")
+        finally:
+            connection.close()
+
+    def close(self):
+        self._stop.set()
+        self.thread.join(timeout=2)
+
+class StaticServiceBackend(EventServiceBackend):
+    """Lokaler Ersatz ohne systemd (Tests/Entwicklung): Zustände per set_state"""
+
+    def __init__(self, states=None):
+        super().__init__()
+        self.current = dict(states or {})
+
+    def set_state(self, service, state):
+        self.current[service] = state
+        self.push(service, state)
+
+    def states(self, services):
+        return {service: self.current.get(service, 'inactive') for service in services}
+
+class JournalReader:
+    """Liest nur neue Journal-Einträge ab einem gespeicherten Cursor (journalctl -o json)
+
+    Jeder Eintrag wird genau einmal geliefert, auch über Neustarts hinweg: read()
+    liefert zu jedem Eintrag seine Position, der Aufrufer übernimmt sie nach der
+    Verarbeitung in self.position und speichert sie mit save(). Ist der
+    Cursor ungültig (Journal rotiert/geleert), geht es ab dessen Zeitstempel weiter.
+    """
+
+    def __init__(self, units, cursor_file):
+        self.units = units
+        self.cursor_file = cursor_file
+        # {'cursor': ..., 'realtime': µs seit Epoch} - beim ersten Start erst ab jetzt
+        self.position = self._load() or {'cursor': None, 'realtime': int(time.time() * 1_000_000)}
+
+    def _load(self):
+        try:
+            with open(self.cursor_file) as f:
+                position = json.load(f)
+            return {'cursor': position.get('cursor'), 'realtime': int(position['realtime'])}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable journal cursor {self.cursor_file}: {e}")
+            return None
+
+    def save(self):
+        """Speichert die Position atomar (erst temporäre Datei, dann umbenennen)"""
+        try:
+            os.makedirs(os.path.dirname(self.cursor_file), exist_ok=True)
+            with open(self.cursor_file + '.tmp', 'w') as f:
+                json.dump(self.position, f)
+            os.replace(self.cursor_file + '.tmp', self.cursor_file)
+        except OSError as e:
+            print(f"Error saving journal cursor: {e}")
+
+    def _journalctl(self, *args):
+        command = ['journalctl', '--no-pager', '-o', 'json']
+        for unit in self.units:
+            command += ['-u', unit]
+        return subprocess.run(command + list(args), capture_output=True, text=True, timeout=60)
+
+    def read(self):
+        """Neue Einträge seit self.position als (Eintrag, Position), ältester zuerst
+
+        self.position bleibt unverändert - was nicht übernommen wird, liefert
+        der nächste Aufruf erneut.
+        """
+        result = None
+        if self.position['cursor']:
+            result = self._journalctl('--after-cursor', self.position['cursor'])
+            if result.returncode != 0:
+                print(f"Journal cursor invalid, continuing by timestamp: {result.stderr.strip()}")
+                result = None
+        if result is None:
+            # Ganze Sekunde ab dem letzten Eintrag, bereits gesehene werden unten übersprungen
+            result = self._journalctl('--since', f"@{self.position['realtime'] // 1_000_000}")
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f"journalctl exited with {result.returncode}")
+            skip_until = self.position['realtime']
+        else:
+            skip_until = None
+
+        entries = []
+        for line in result.stdout.splitlines():
+            if not line.startswith('{'):
+                continue
+            entry = json.loads(line)
+            realtime = int(entry.get('__REALTIME_TIMESTAMP', 0))
+            if skip_until is not None and realtime <= skip_until:
+                continue
+            entries.append((entry, {'cursor': entry.get('__CURSOR'), 'realtime': realtime}))
+        return entries
+
+    @staticmethod
+    def message(entry):
+        """MESSAGE als Text (nicht-UTF-8 liefert journalctl als Byte-Liste)"""
+        message = entry.get('MESSAGE') or ''
+        if isinstance(message, list):
+            message = bytes(message).decode('utf-8', errors='replace')
+        return message
+
+class PushoverDispatcher:
+    """Versendet Alarme in einem Hintergrund-Thread statt im Überwachungs-Loop
+
+    submit() blockiert nie. Der Worker fasst Alarme eines kurzen Zeitfensters
+    zu einer Nachricht zusammen, nutzt eine Keep-Alive-Session und wiederholt
+    fehlgeschlagene Requests mit exponentiellem Backoff (inkl. 429/Retry-After).
+    """
+
+    def __init__(self, user_key, api_token, url=PUSHOVER_URL, coalesce_window=ALERT_COALESCE_WINDOW,
+                 min_interval=ALERT_MIN_INTERVAL, queue_size=ALERT_QUEUE_SIZE,
+                 max_retries=ALERT_MAX_RETRIES, timeout=10):
+        self.user_key = user_key
+        self.api_token = api_token
+        self.url = url
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.session = requests.Session()
+        self._stop = threading.Event()
+        self._last_send = 0.0
+        self.thread = threading.Thread(target=self._run, name='pushover', daemon=True)
+        self.thread.start()
+
+    def submit(self, message, priority=1):
+        """Reiht einen Alarm ein - False wenn die Queue voll ist"""
+        try:
+            self.queue.put_nowait((priority, message))
+            return True
+        except queue.Full:
+            print(f"Alert queue full, dropping: {message}")
+            return False
+
+    def close(self, timeout=15):
+        """Verschickt noch Eingereihtes (ohne weitere Wiederholungen) und beendet den Worker"""
+        self._stop.set()
+        self.thread.join(timeout)
+        if not self.queue.empty():
+            print(f"{self.queue.qsize()} alert(s) could not be sent before shutdown")
+        self.session.close()
+
+    def _run(self):
+        while not self._stop.is_set() or not self.queue.empty():
+            batch = self._collect()
+            # Nur gleiche Prioritäten zusammenfassen - ein SSH-Login darf nicht als
+            # Notfall (priority 2, expire/retry) mit einem Dienstausfall mitlaufen
+            for priority in sorted({priority for priority, _ in batch}, reverse=True):
+                group = [item for item in batch if item[0] == priority]
+                # Mindestabstand auch zwischen den Nachrichten eines Fensters
+                self._stop.wait(max(0, self._last_send + self.min_interval - time.monotonic()))
+                try:
+                    self._send(*self._combine(group))
+                except Exception as e:
+                    print(f"Unexpected error sending alert: {e}")
+
+    def _collect(self):
+        """Wartet auf einen Alarm und sammelt weitere bis zum Ende des Fensters"""
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        # Nicht vor Ablauf des Mindestabstands senden - was bis dahin kommt, wird angehängt
+        deadline = max(time.monotonic() + self.coalesce_window, self._last_send + self.min_interval)
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _combine(self, batch):
+        """(Nachricht, Priorität, Titel) für Alarme derselben Priorität"""
+        priority = batch[0][0]
+        if len(batch) == 1:
+            message, title = batch[0][1], 'Server Alert'
+        else:
+            message = "\n".join(f"• {message}" for _, message in batch)
+            title = f'Server Alert ({len(batch)})'
+        if len(message) > PUSHOVER_MAX_LENGTH:
+            message = message[:PUSHOVER_MAX_LENGTH - 1] + '…'
+        return message, priority, title
+
+    def _send(self, message, priority, title):
+        """Send alert via Pushover API with retries, True wenn angenommen"""
+        payload = {
+            'token': self.api_token,
+            'user': self.user_key,
+            'message': message,
+            'priority': priority,
+            'title': title
+        }
+
+        # Füge expire und retry für Emergency-Priorität (2) hinzu
+        if priority == 2:
+            payload.update({
+                'expire': 10800,  # 3 Stunden in Sekunden
+                'retry': 60       # Wiederholung alle 60 Sekunden
+            })
+
+        delay = 1
+        for attempt in range(1, self.max_retries + 2):
+            self._last_send = time.monotonic()
+            try:
+                response = self.session.post(self.url, data=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Network error sending alert: {e}")
+            else:
+                if response.status_code == 200:
+                    print(f"Alert sent successfully: {message}")
+                    remaining = response.headers.get('X-Limit-App-Remaining')
+                    if remaining and remaining.isdigit() and int(remaining) < 100:
+                        print(f"Pushover: only {remaining} messages left this month")
+                    return True
+                print(f"Failed to send alert: {response.status_code}")
+                print(f"Response content: {response.text}")
+                # Ungültige Anfrage (Token, User, ...) - Wiederholen hilft nicht
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    return False
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+
+            # Beim Beenden nicht mehr warten
+            if attempt > self.max_retries or self._stop.wait(min(delay, ALERT_BACKOFF_MAX)):
+                break
+            delay *= 2
+
+        print(f"Giving up on alert after {attempt} attempt(s): {message}")
+        return False
+
+class RingBuffer:
+    """Feste Anzahl (Zeit, Wert)-Paare in array('d'), die ältesten werden überschrieben"""
+
+    def __init__(self, capacity=METRICS_CAPACITY):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, value):
+        index = (self.start + self.size) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def latest(self):
+        """Letztes (Zeit, Wert)-Paar oder None"""
+        if not self.size:
+            return None
+        index = (self.start + self.size - 1) % self.capacity
+        return self.times[index], self.values[index]
+
+    def series(self, seconds=None):
+        """(Zeit, Wert)-Paare der letzten seconds Sekunden (alle ohne Angabe), älteste zuerst"""
+        points = []
+        cutoff = self.latest()[0] - seconds if self.size and seconds is not None else None
+        # Vom neuesten Wert rückwärts, bis das Fenster verlassen wird
+        for offset in range(self.size - 1, -1, -1):
+            index = (self.start + offset) % self.capacity
+            if cutoff is not None and self.times[index] < cutoff:
+                break
+            points.append((self.times[index], self.values[index]))
+        points.reverse()
+        return points
+
+    def mean(self, seconds):
+        """Gleitender Mittelwert der letzten seconds Sekunden"""
+        points = self.series(seconds)
+        return sum(value for _, value in points) / len(points) if points else None
+
+    def rate(self, seconds):
+        """Änderung pro Sekunde (Regressionsgerade) über die letzten seconds Sekunden"""
+        points = self.series(seconds)
+        if len(points) < 2:
+            return None
+        mean_time = sum(t for t, _ in points) / len(points)
+        mean_value = sum(v for _, v in points) / len(points)
+        variance = sum((t - mean_time) ** 2 for t, _ in points)
+        if not variance:
+            return None
+        return sum((t - mean_time) * (v - mean_value) for t, v in points) / variance
+
+class MetricsSampler:
+    """Nimmt Systemwerte ohne Blockieren auf und hält den Verlauf in Ringpuffern
+
+    sample() wird je Durchlauf aufgerufen: CPU (seit dem letzten Aufruf), Speicher,
+    Load, Belegung je Platte sowie Netz- und Platten-I/O als Raten (Bytes/s).
+    Kennzahlen je Platte heißen z.B. 'disk_percent:/' oder 'disk_free:/home'.
+    """
+
+    def __init__(self, capacity=METRICS_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+        self.mountpoints = []
+        self._counters = None
+        # Der erste Aufruf mit interval=None liefert immer 0.0 - Referenz setzen
+        psutil.cpu_percent(interval=None)
+
+    def _record(self, name, timestamp, value):
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            buffer = self.buffers[name] = RingBuffer(self.capacity)
+        buffer.append(timestamp, value)
+
+    def _disks(self):
+        """Ein Mountpoint je Gerät (btrfs-Subvolumes etc. nur einmal)"""
+        mountpoints = {}
+        for partition in psutil.disk_partitions(all=False):
+            if partition.fstype in DISK_IGNORE_FSTYPES or partition.device.startswith('/dev/loop'):
+                continue
+            current = mountpoints.get(partition.device)
+            if current is None or len(partition.mountpoint) < len(current):
+                mountpoints[partition.device] = partition.mountpoint
+        return sorted(mountpoints.values())
+
+    def sample(self):
+        """Nimmt eine Messung aller Kennzahlen auf"""
+        now = time.time()
+        self._record('cpu_percent', now, psutil.cpu_percent(interval=None))
+        self._record('memory_percent', now, psutil.virtual_memory().percent)
+        load1, load5, load15 = psutil.getloadavg()
+        self._record('load1', now, load1)
+        self._record('load5', now, load5)
+        self._record('load15', now, load15)
+
+        self.mountpoints = self._disks()
+        for mountpoint in self.mountpoints:
+            try:
+                disk = psutil.disk_usage(mountpoint)
+            except OSError:
+                continue
+            self._record(f'disk_percent:{mountpoint}', now, disk.percent)
+            self._record(f'disk_used:{mountpoint}', now, disk.used)
+            self._record(f'disk_free:{mountpoint}', now, disk.free)
+
+        # I/O-Zähler laufen hoch - gespeichert wird die Rate seit der letzten Messung
+        net = psutil.net_io_counters()
+        disk_io = psutil.disk_io_counters()
+        counters = {
+            'net_recv_bytes': net.bytes_recv if net else None,
+            'net_sent_bytes': net.bytes_sent if net else None,
+            'disk_read_bytes': disk_io.read_bytes if disk_io else None,
+            'disk_write_bytes': disk_io.write_bytes if disk_io else None,
+        }
+        if self._counters:
+            previous_time, previous = self._counters
+            elapsed = now - previous_time
+            for name, value in counters.items():
+                # Neustart/Überlauf eines Zählers ergibt keine sinnvolle Rate
+                if elapsed > 0 and value is not None and previous[name] is not None and value >= previous[name]:
+                    self._record(f'{name}_per_second', now, (value - previous[name]) / elapsed)
+        self._counters = (now, counters)
+
+    def names(self):
+        return sorted(self.buffers)
+
+    def latest(self, name):
+        """Letzter Wert einer Kennzahl oder None"""
+        point = self.buffers[name].latest() if name in self.buffers else None
+        return point[1] if point else None
+
+    def series(self, name, seconds=None):
+        return self.buffers[name].series(seconds) if name in self.buffers else []
+
+    def mean(self, name, seconds):
+        return self.buffers[name].mean(seconds) if name in self.buffers else None
+
+    def rate(self, name, seconds):
+        return self.buffers[name].rate(seconds) if name in self.buffers else None
+
+    def hours_until_full(self, mountpoint, seconds):
+        """Prognose aus dem Belegungstrend der letzten seconds Sekunden, None wenn nicht wachsend"""
+        series = self.series(f'disk_used:{mountpoint}', seconds)
+        if len(series) < 2 or series[-1][0] - series[0][0] < min(seconds, DISK_TREND_MIN_SPAN):
+            return None
+        growth = self.rate(f'disk_used:{mountpoint}', seconds)
+        free = self.latest(f'disk_free:{mountpoint}')
+        if not growth or growth <= 0 or free is None:
+            return None
+        return free / growth / 3600
+
+def format_labels(labels):
+    """{name="wert",...} im Prometheus-Textformat (Backslash, Anführungszeichen, Zeilenumbruch escaped)"""
+    if not labels:
+        return ''
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for key, value in labels.items()}
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped.items()) + '}'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Liefert nur den zuletzt vorgerenderten Snapshot aus - ein Scrape misst nichts"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.snapshot
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsExporter:
+    """Hintergrund-HTTP-Server für /metrics
+
+    update() ersetzt den Snapshot (fertige Bytes) aus dem Überwachungs-Loop,
+    Scrapes lesen nur diese Referenz - konstante Antwortzeit, egal wie oft.
+    """
+
+    def __init__(self, host='127.0.0.1', port=9110):
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.snapshot = b''
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+
+    def update(self, text):
+        self.server.snapshot = text.encode('utf-8')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def create_service_backend(backend, services):
+    """'dbus', 'systemctl' oder 'auto' (D-Bus wenn jeepney und Systembus verfügbar)"""
+    if backend in ('dbus', 'auto'):
+        try:
+            if open_dbus_connection is None:
+                raise ImportError("jeepney is not installed")
+            return DbusServiceBackend(services)
+        except Exception as e:
+            if backend == 'dbus':
+                raise
+            print(f"D-Bus not available ({e}), polling services with systemctl")
+    return SystemctlServiceBackend()
+
 class ServerMonitor:
-    def __init__(self, pushover_user_key, pushover_api_token):
+    def __init__(self, pushover_user_key, pushover_api_token, service_backend=None, ssh_journal=None,
+                 dispatcher=None, metrics=None, exporter=None):
         self.pushover_user_key = pushover_user_key
         self.pushover_api_token = pushover_api_token
+        # Versand im Hintergrund, damit ein langsames Pushover die Checks nicht aufhält
+        self.alerts = dispatcher or PushoverDispatcher(pushover_user_key, pushover_api_token)
         self.thresholds = {
             'cpu_percent': 80.0,        # Einstellungen für die Obergrenzen
             'memory_percent': 85.0,
-            'disk_percent': 90.0
+            'disk_percent': 90.0,
+            'load_per_cpu': 2.0,        # Load (5 min) je CPU-Kern
+            'memory_rise': 10.0,        # Anstieg Speicher in Prozentpunkten pro Minute
+            'disk_full_hours': 24.0     # Platte läuft laut Trend in weniger Stunden voll
+        }
+        # Zeitfenster in Sekunden: gleitende Mittel statt Einzelwerte, Trends
+        self.windows = {
+            'cpu_percent': 60,
+            'memory_percent': 60,
+            'memory_rise': 300,
+            'disk_trend': 3600
         }
         self.last_alerts = {
             'cpu': 0,
             'memory': 0,
             'disk': 0,
         }
+        # Verlauf aller Messwerte (Ringpuffer), Abfrage z.B. metrics.series('cpu_percent', 300)
+        self.metrics = metrics or MetricsSampler()
+        # Optionaler /metrics-Endpunkt, bekommt je Durchlauf einen neuen Snapshot
+        self.exporter = exporter
+        self.ssh_logins = Counter()  # Anzahl SSH-Logins je Benutzer seit dem Start
         self.service_status = {}
-        self.last_login_check = datetime.now()
-        self.last_ssh_logins = set()  # Speichert die letzten SSH-Logins
+        self.transitional_since = {}  # Dienst -> Beginn des aktuellen Übergangszustands
+        self.service_backend = service_backend or SystemctlServiceBackend()
+        # Neue sshd-Einträge ab dem gespeicherten Cursor (genau eine Meldung pro Login)
+        self.ssh_journal = ssh_journal or JournalReader(SSH_UNITS, SSH_CURSOR_FILE)
         self.alert_cooldown = 60
 
     def check_service_status(self, service_name):
         """Verbesserte Dienst-Überprüfung mit systemctl"""
         try:
-            result = subprocess.run(['systemctl', 'is-active', service_name],
-                                 capture_output=True,
-                                 text=True)
-            return result.stdout.strip() == 'active'
+            return self.service_backend.states([service_name])[service_name] == 'active'
         except Exception as e:
             print(f"Error checking service {service_name}: {e}")
             return False
@@ -73,8 +737,14 @@ class ServerMonitor:
         print("Performing initial service check...")
         offline_services = []
 
+        try:
+            states = self.service_backend.states(services)
+        except Exception as e:
+            print(f"Error checking services: {e}")
+            states = {}
+
         for service in services:
-            if not self.check_service_status(service):
+            if states.get(service) != 'active':
                 offline_services.append(service)
                 self.service_status[service] = False
             else:
@@ -86,46 +756,36 @@ class ServerMonitor:
             print(message)
 
     def send_pushover_alert(self, message, priority=1):
-        """Send alert via Pushover API with improved error handling"""
-        payload = {
-            'token': self.pushover_api_token,
-            'user': self.pushover_user_key,
-            'message': message,
-            'priority': priority,
-            'title': 'Server Alert'
-        }
+        """Reiht einen Alarm für den Pushover-Versand ein (blockiert nicht)"""
+        return self.alerts.submit(message, priority)
 
-        # Füge expire und retry für Emergency-Priorität (2) hinzu
-        if priority == 2:
-            payload.update({
-                'expire': 10800,  # 3 Stunden in Sekunden
-                'retry': 60       # Wiederholung alle 60 Sekunden
-            })
+    def monitor_services(self, services):
+        """Verbesserte Service-Überwachung mit Benachrichtigungen für Wiederherstellung
 
+        Fragt alle Dienste gebündelt ab (bzw. liest beim D-Bus-Backend nur die
+        eingetroffenen Änderungen) - die Kosten hängen nicht von der Anzahl ab.
+        """
         try:
-            response = requests.post(
-                'https://api.pushover.net/1/messages.json',
-                data=payload,
-                timeout=10
-            )
-            if response.status_code == 200:
-                print(f"Alert sent successfully: {message}")
-            else:
-                print(f"Failed to send alert: {response.status_code}")
-                print(f"Response content: {response.text}")
-            return response.status_code == 200
-        except requests.RequestException as e:
-            print(f"Network error sending alert: {e}")
-            return False
+            states = self.service_backend.poll(services)
         except Exception as e:
-            print(f"Unexpected error sending alert: {e}")
-            return False
-
-    def monitor_services(self, services):
-        """Verbesserte Service-Überwachung mit Benachrichtigungen für Wiederherstellung"""
-        for service in services:
+            print(f"Error checking services: {e}")
+            return
+
+        now = time.time()
+        updates = {}
+        for service, state in states.items():
+            if state in TRANSITIONAL_STATES:
+                self.transitional_since.setdefault(service, now)
+            else:
+                self.transitional_since.pop(service, None)
+                updates[service] = state == 'active'
+        # Auch ohne neues Event (D-Bus) prüfen, ob die Karenzzeit abgelaufen ist
+        for service, since in self.transitional_since.items():
+            if now - since > TRANSITION_GRACE:
+                updates[service] = False
+
+        for service, current_status in updates.items():
             try:
-                current_status = self.check_service_status(service)
                 previous_status = self.service_status.get(service, True)
 
                 # Service ist ausgefallen
@@ -134,9 +794,9 @@ class ServerMonitor:
                     alert_sent = self.send_pushover_alert(alert_message, priority=2)
 
                     if alert_sent:
-                        print(f"Service Alert sent! {service} is not running!")
+                        print(f"Service Alert queued! {service} is not running!")
                     else:
-                        print(f"Failed to send alert for {service}")
+                        print(f"Failed to queue alert for {service}")
 
                 # Service ist wieder verfügbar
                 elif current_status and not previous_status:
@@ -144,94 +804,148 @@ class ServerMonitor:
                     alert_sent = self.send_pushover_alert(recovery_message, priority=1)
 
                     if alert_sent:
-                        print(f"Recovery Alert sent! {service} is running again!")
+                        print(f"Recovery Alert queued! {service} is running again!")
                     else:
-                        print(f"Failed to send recovery alert for {service}")
+                        print(f"Failed to queue recovery alert for {service}")
 
                 self.service_status[service] = current_status
 
             except Exception as e:
                 print(f"Error monitoring service {service}: {e}")
 
+    def _resource_alert(self, key, message):
+        """Alarm mit Cooldown je Kennzahl (bzw. je Platte)"""
+        if time.time() - self.last_alerts.get(key, 0) > self.alert_cooldown:
+            self.send_pushover_alert(message)
+            self.last_alerts[key] = time.time()
+
     def check_system_resources(self):
-        """Check system resources and send alerts if thresholds are exceeded"""
+        """Nimmt eine Messung auf und prüft gleitende Mittel, Anstiege und Platten-Prognosen"""
         try:
-            # CPU Usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            if cpu_percent > self.thresholds['cpu_percent'] and time.time() - self.last_alerts['cpu'] > self.alert_cooldown:
-                self.send_pushover_alert(
-                    f'High CPU Usage: {cpu_percent}% (Threshold: {self.thresholds["cpu_percent"]}%)'
+            self.metrics.sample()
+
+            # CPU Usage (Mittel statt Einzelspitze)
+            cpu_percent = self.metrics.mean('cpu_percent', self.windows['cpu_percent'])
+            if cpu_percent > self.thresholds['cpu_percent']:
+                self._resource_alert('cpu',
+                    f'High CPU Usage: {cpu_percent:.1f}% over {self.windows["cpu_percent"]}s (Threshold: {self.thresholds["cpu_percent"]}%)'
                 )
-                self.last_alerts['cpu'] = time.time()
 
             # Memory Usage
-            memory = psutil.virtual_memory()
-            if memory.percent > self.thresholds['memory_percent'] and time.time() - self.last_alerts['memory'] > self.alert_cooldown:
-                self.send_pushover_alert(
-                    f'High Memory Usage: {memory.percent}% (Threshold: {self.thresholds["memory_percent"]}%)'
+            memory_percent = self.metrics.mean('memory_percent', self.windows['memory_percent'])
+            if memory_percent > self.thresholds['memory_percent']:
+                self._resource_alert('memory',
+                    f'High Memory Usage: {memory_percent:.1f}% over {self.windows["memory_percent"]}s (Threshold: {self.thresholds["memory_percent"]}%)'
+                )
+
+            memory_rise = self.metrics.rate('memory_percent', self.windows['memory_rise'])
+            if memory_rise is not None and memory_rise * 60 > self.thresholds['memory_rise']:
+                self._resource_alert('memory_rise',
+                    f'Memory rising fast: +{memory_rise * 60:.1f}%/min (now {self.metrics.latest("memory_percent")}%)'
                 )
-                self.last_alerts['memory'] = time.time()
 
-            # Disk Usage
-            disk = psutil.disk_usage('/')
-            if disk.percent > self.thresholds['disk_percent'] and time.time() - self.last_alerts['disk'] > self.alert_cooldown:
-                self.send_pushover_alert(
-                    f'High Disk Usage: {disk.percent}% (Threshold: {self.thresholds["disk_percent"]}%)'
+            # Load je CPU-Kern (load5 ist bereits ein gleitendes Mittel)
+            load_per_cpu = self.metrics.latest('load5') / (psutil.cpu_count() or 1)
+            if load_per_cpu > self.thresholds['load_per_cpu']:
+                self._resource_alert('load',
+                    f'High Load: {self.metrics.latest("load5"):.2f} (5 min, {load_per_cpu:.2f} per CPU, Threshold: {self.thresholds["load_per_cpu"]})'
                 )
-                self.last_alerts['disk'] = time.time()
+
+            # Disk Usage je Platte: Füllstand und Prognose aus dem Trend
+            for mountpoint in self.metrics.mountpoints:
+                disk_percent = self.metrics.latest(f'disk_percent:{mountpoint}')
+                if disk_percent is None:
+                    continue
+                if disk_percent > self.thresholds['disk_percent']:
+                    self._resource_alert(f'disk:{mountpoint}',
+                        f'High Disk Usage {mountpoint}: {disk_percent}% (Threshold: {self.thresholds["disk_percent"]}%)'
+                    )
+                    continue
+                hours = self.metrics.hours_until_full(mountpoint, self.windows['disk_trend'])
+                if hours is not None and hours < self.thresholds['disk_full_hours']:
+                    self._resource_alert(f'disk:{mountpoint}',
+                        f'Disk {mountpoint} full in ~{hours:.1f}h at current rate (now {disk_percent}%)'
+                    )
 
         except Exception as e:
             print(f"Error checking system resources: {e}")
 
+    def render_metrics(self):
+        """Alle Messwerte im Prometheus-Textformat (nur gespeicherte Werte, keine neue Messung)"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{METRICS_PREFIX}{name}{format_labels(labels)} {value}")
+
+        latest = self.metrics.latest
+        metric('cpu_percent', 'gauge', 'CPU usage in percent', [({}, latest('cpu_percent'))])
+        metric('memory_percent', 'gauge', 'Memory usage in percent', [({}, latest('memory_percent'))])
+        metric('load', 'gauge', 'System load average',
+               [({'period': period}, latest(f'load{period}')) for period in ('1', '5', '15')])
+        for name, help_text in (('disk_percent', 'Disk usage in percent'),
+                                ('disk_used', 'Used disk space in bytes'),
+                                ('disk_free', 'Free disk space in bytes')):
+            suffix = '' if name == 'disk_percent' else '_bytes'
+            metric(name + suffix, 'gauge', help_text,
+                   [({'mountpoint': mountpoint}, latest(f'{name}:{mountpoint}'))
+                    for mountpoint in self.metrics.mountpoints])
+        for name, help_text in (('net_recv_bytes', 'Network receive rate'),
+                                ('net_sent_bytes', 'Network transmit rate'),
+                                ('disk_read_bytes', 'Disk read rate'),
+                                ('disk_write_bytes', 'Disk write rate')):
+            metric(f'{name}_per_second', 'gauge', f'{help_text} in bytes per second',
+                   [({}, latest(f'{name}_per_second'))])
+        metric('service_up', 'gauge', 'Whether the systemd unit is active (1) or not (0)',
+               [({'service': service}, int(status)) for service, status in sorted(self.service_status.items())])
+        metric('ssh_logins_total', 'counter', 'Successful SSH logins since monitor start',
+               [({'user': user}, count) for user, count in sorted(self.ssh_logins.items())])
+        metric('last_update_timestamp_seconds', 'gauge', 'Time of the last monitoring pass',
+               [({}, round(time.time(), 3))])
+        return "\n".join(lines) + "\n"
+
+    def publish_metrics(self):
+        """Rendert den Snapshot für /metrics (einmal pro Durchlauf statt pro Scrape)"""
+        if self.exporter:
+            try:
+                self.exporter.update(self.render_metrics())
+            except Exception as e:
+                print(f"Error rendering metrics: {e}")
+
     def check_ssh_logins(self):
-        """Überwacht SSH-Logins durch Prüfung der Auth-Log mit Deduplizierung"""
+        """Überwacht SSH-Logins über neue Journal-Einträge seit dem letzten Cursor"""
         try:
-            current_time = datetime.now()
-            # Benutze die Zeit seit der letzten Prüfung
-            time_diff = (current_time - self.last_login_check).total_seconds()
-            since_param = f"{int(time_diff + 5)}s ago"  # +5 Sekunden Überlappung zur Sicherheit
-
-            output = subprocess.check_output(
-                ['journalctl', '-u', 'sshd', '--since', since_param],
-                universal_newlines=True
-            )
-
-            login_pattern = r'Accepted (?:password|publickey) for (\w+) from ([\d\.]+)'
-            matches = re.finditer(login_pattern, output)
-
-            current_logins = set()
-            for match in matches:
-                username = match.group(1)
-                ip = match.group(2)
-                login_info = f"{username}:{ip}"
-                current_logins.add(login_info)
-
-            # Finde nur neue Logins
-            new_logins = current_logins - self.last_ssh_logins
-
-            # Sende Benachrichtigungen nur für neue Logins
-            for login_info in new_logins:
-                username, ip = login_info.split(':')
-                message = f'SSH Login: User {username} from IP {ip}'
-                self.send_pushover_alert(message, priority=1)
-                print(f"SSH Alert sent! {message}")
-
-            # Aktualisiere den Zustand
-            self.last_ssh_logins = current_logins
-            self.last_login_check = current_time
+            for entry, position in self.ssh_journal.read():
+                match = SSH_LOGIN_PATTERN.search(self.ssh_journal.message(entry))
+                if match:
+                    username, ip = match.group(2, 3)
+                    message = f'SSH Login: User {username} from IP {ip}'
+                    if not self.send_pushover_alert(message, priority=1):
+                        # Queue voll: hier stehen bleiben, der nächste Durchlauf liest den Login erneut
+                        break
+                    self.ssh_logins[username] += 1
+                    print(f"SSH Alert queued! {message}")
+                # Erst nach dem Einreihen weiterrücken - ein Absturz meldet eher doppelt als gar nicht
+                self.ssh_journal.position = position
+
+            self.ssh_journal.save()
 
         except Exception as e:
             print(f"Error checking SSH logins: {str(e)}")
 
 def main():
-
-"""
+    """
     !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 
     # Replace with your Pushover credentials
 
     !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
-"""
+    """
 
     PUSHOVER_USER_KEY = 'xxxxxxxxxxxxxxxxxxxx'
     PUSHOVER_API_TOKEN = 'xxxxxxxxxxxxxxxxxxxxxx'
@@ -241,7 +955,22 @@ def main():
         'mysqld.service'
     ]
 
-    monitor = ServerMonitor(PUSHOVER_USER_KEY, PUSHOVER_API_TOKEN)
+    # 'auto': D-Bus-Events wenn möglich, sonst gebündeltes systemctl-Polling
+    SERVICE_BACKEND = 'auto'
+
+    # Prometheus-Endpunkt http://METRICS_HOST:METRICS_PORT/metrics (None = aus)
+    METRICS_HOST = '127.0.0.1'
+    METRICS_PORT = 9110
+
+    service_backend = create_service_backend(SERVICE_BACKEND, SERVICES_TO_MONITOR)
+    exporter = None
+    if METRICS_PORT:
+        try:
+            exporter = MetricsExporter(METRICS_HOST, METRICS_PORT)
+            print(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Metrics endpoint not available: {e}")
+    monitor = ServerMonitor(PUSHOVER_USER_KEY, PUSHOVER_API_TOKEN, service_backend, exporter=exporter)
 
     try:
         # Send test notification on startup
@@ -256,7 +985,8 @@ def main():
                 monitor.check_system_resources()
                 monitor.monitor_services(SERVICES_TO_MONITOR)
                 monitor.check_ssh_logins()
-                time.sleep(2)
+                monitor.publish_metrics()
+                service_backend.wait(2)
 
             except Exception as e:
                 error_msg = f'Monitoring error: {str(e)}'
@@ -268,6 +998,11 @@ def main():
         print("\nMonitoring stopped by user")
     except Exception as e:
         print(f"Critical error in main loop: {e}")
+    finally:
+        service_backend.close()
+        monitor.alerts.close()
+        if exporter:
+            exporter.close()
 
 if __name__ == "__main__":
     main()